@@ -4,22 +4,22 @@ import os
 import shutil
 import zipfile
 from datetime import datetime, timedelta
+from fs_walker import scan_tree, iter_file_paths
 
 # ----- 硬盘局部区域文件夹压缩 ----- #
 
 def compress_and_remove_folders(root_dir):
-    for item in os.listdir(root_dir):
-        item_path = os.path.join(root_dir, item)
-        if os.path.isdir(item_path):
+    # 先列出一级目录再处理，避免边遍历边新建 zip 文件；压缩后整个文件夹会被删除，因此不做任何排除
+    for entry, _ in list(scan_tree(root_dir, max_depth=0, exclude=None)):
+        item, item_path = entry.name, entry.path
+        if entry.is_dir():
             zip_path = os.path.join(root_dir, f"{item}.zip")
             # 创建zip文件
             with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for foldername, subfolders, filenames in os.walk(item_path):
-                    for filename in filenames:
-                        file_path = os.path.join(foldername, filename)
-                        # 添加文件到zip，保留相对路径
-                        arcname = os.path.relpath(file_path, start=item_path)
-                        zipf.write(file_path, arcname)
+                for file_path in iter_file_paths(item_path, exclude=None):
+                    # 添加文件到zip，保留相对路径
+                    arcname = os.path.relpath(file_path, start=item_path)
+                    zipf.write(file_path, arcname)
             # 删除原始文件夹
             shutil.rmtree(item_path)
             print(f"✅ 已压缩并删除文件夹：{item_path}")
@@ -34,33 +34,13 @@ def scan_directory(base_dir, output_file):
     扫描 base_dir 目录下的所有文件，包括子目录中的文件，
     严格跳过 $RECYCLE.BIN 及其内部所有文件，并排除 desktop.ini 文件
     """
-    # 排除目录前缀，注意：路径分隔符需标准化
-    EXCLUDE_PREFIX = os.path.join(base_dir, "$RECYCLE.BIN").lower()
-    # 排除文件名，不区分大小写
-    EXCLUDE_FILES = {"desktop.ini"}
-
     try:
         with open(output_file, 'w', encoding='utf-8') as file:
-            for root, _, files in os.walk(base_dir):
-
-                # 标准化路径并转换为小写
-                normalized_root = os.path.normpath(root).lower()
-
-                # 如果当前路径是 $RECYCLE.BIN 或其子路径，则跳过
-                if normalized_root.startswith(EXCLUDE_PREFIX):
-                    continue
-
-                for filename in files:
-                    # 排除 desktop.ini 文件（忽略大小写）
-                    if filename.lower() in EXCLUDE_FILES:
-                        continue
-
-                    # 获取完整路径，并生成相对路径
-                    file_path = os.path.join(root, filename)
-                    relative_path = os.path.relpath(file_path, base_dir)
-
-                    # 写入文件路径
-                    file.write(relative_path + '\n')
+            # $RECYCLE.BIN、desktop.ini 等由 fs_walker 的默认排除规则跳过，回收站目录不会被打开
+            for file_path in iter_file_paths(base_dir):
+                # 生成相对路径并写入
+                relative_path = os.path.relpath(file_path, base_dir)
+                file.write(relative_path + '\n')
 
         # print(f"扫描完成，文件路径已保存到 {output_file}")
     except Exception as e:
@@ -254,42 +234,17 @@ def get_files_within_depth(base_dir, output_file, max_depth=3):
     """
     try:
         with open(output_file, 'w', encoding='utf-8') as file:
-            # 用于记录第三级别文件夹是否已展示文件
-            displayed_folders = set()
-
-            # 遍历起始目录
-            for root, dirs, files in os.walk(base_dir):
-                # 计算当前路径的深度（基于分隔符数量）
-                depth = root[len(base_dir):].count(os.sep)
-
-                # 处理符合深度要求的文件
-                if depth <= max_depth:
-                    for file_name in files:
-                        # 获取完整路径
-                        file_path = os.path.join(root, file_name)
-                        # 生成相对路径
-                        relative_path = os.path.relpath(file_path, base_dir)
-
-                        # 第三级别的文件路径
-                        if depth == max_depth:
-                            # 标记该文件所在的文件夹为已展示文件
-                            displayed_folders.add(root)
-                            # 写入文件路径
-                            file.write(relative_path + '\n')
-
-                        # 第二级及以下的文件路径，直接展示
-                        elif depth < max_depth:
-                            file.write(relative_path + '\n')
-
-                # 对于第三级别文件夹，如果未展示任何内部文件，则展示文件夹路径
-                if depth == max_depth:
-                    for dir_name in dirs:
-                        dir_path = os.path.join(root, dir_name)
-
-                        # 如果该文件夹未展示任何文件，则展示文件夹路径
-                        if dir_path not in displayed_folders:
-                            relative_dir_path = os.path.relpath(dir_path, base_dir)
-                            file.write(f"{relative_dir_path}/\n")
+            # 深度超过 max_depth 的目录不会被打开（depth 为所在目录相对 base_dir 的层级）
+            for entry, depth in scan_tree(base_dir, max_depth=max_depth):
+                relative_path = os.path.relpath(entry.path, base_dir)
+
+                # 文件夹：只展示第三级别下的文件夹路径（其内部文件不展示）
+                if entry.is_dir():
+                    if depth == max_depth:
+                        file.write(f"{relative_path}/\n")
+                # 文件：三层以内直接展示
+                else:
+                    file.write(relative_path + '\n')
 
     except Exception as e:
         print(f"[Error] {e}")
@@ -560,13 +515,13 @@ def move_recent_items(src_dir, dst_dir, n_days=3):
 
     moved_items = []
 
-    # 遍历源目录
-    for item in os.listdir(src_dir):
-        item_path = os.path.join(src_dir, item)
+    # 遍历源目录（先列出再移动；移动时不做排除，保证所有近期项目都被搬走）
+    for entry, _ in list(scan_tree(src_dir, max_depth=0, exclude=None)):
+        item, item_path = entry.name, entry.path
         dst_path = os.path.join(dst_dir, item)
 
-        # 获取最后修改时间
-        mtime = datetime.fromtimestamp(os.path.getmtime(item_path))
+        # 获取最后修改时间（复用 scandir 的 stat 结果）
+        mtime = datetime.fromtimestamp(entry.stat().st_mtime)
 
         if mtime >= cutoff_time:
             # 移动项目
@@ -577,10 +532,8 @@ def move_recent_items(src_dir, dst_dir, n_days=3):
 
             # 如果是文件夹，递归处理其内容
             if os.path.isdir(dst_path):
-                for root, dirs, files in os.walk(dst_path):
-                    for name in files + dirs:
-                        full_path = os.path.join(root, name)
-                        moved_items.append((name, full_path))
+                for sub_entry, _ in scan_tree(dst_path, exclude=None):
+                    moved_items.append((sub_entry.name, sub_entry.path))
 
     return moved_items
 
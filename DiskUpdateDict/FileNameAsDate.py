@@ -1,6 +1,7 @@
 import os
 import shutil
 from datetime import datetime
+from fs_walker import scan_tree
 
 MAX_PATH_LENGTH = 260  # Maximum path length for Windows
 MAX_FILENAME_LENGTH = 100  # Maximum length for filenames to avoid path length issues
@@ -76,13 +77,14 @@ def move_files_with_new_names(src_dir, dst_dir):
     """
     将文件从 src_dir 移动到 dst_dir，并更新文件名。
     """
-    for filename in os.listdir(src_dir):
-        src_path = os.path.join(src_dir, filename)
+    # 先列出再移动，避免边遍历边往同一目录（的临时子目录）里搬文件
+    for entry, _ in list(scan_tree(src_dir, max_depth=0)):
+        filename, src_path = entry.name, entry.path
 
-        if not os.path.isfile(src_path) or filename in ['..', '.']:
+        if not entry.is_file():
             continue
 
-        file_mod_time = datetime.fromtimestamp(os.path.getmtime(src_path))
+        file_mod_time = datetime.fromtimestamp(entry.stat().st_mtime)
         new_filename = sanitize_filename(filename)
         new_filename = prepend_date_to_filename(new_filename, file_mod_time)
         new_filename = shorten_filename(new_filename)
@@ -99,13 +101,13 @@ def move_directories_with_new_names(src_dir, dst_dir):
     """
     将目录从 src_dir 移动到 dst_dir，并更新目录名。
     """
-    for dirname in os.listdir(src_dir):
-        src_path = os.path.join(src_dir, dirname)
+    for entry, _ in list(scan_tree(src_dir, max_depth=0)):
+        dirname, src_path = entry.name, entry.path
 
-        if not os.path.isdir(src_path) or dirname in ['..', '.', 'TempDirForDeleteJustTemp']:
+        if not entry.is_dir() or dirname == 'TempDirForDeleteJustTemp':
             continue
 
-        dir_mod_time = datetime.fromtimestamp(os.path.getmtime(src_path))
+        dir_mod_time = datetime.fromtimestamp(entry.stat().st_mtime)
         new_dirname = sanitize_filename(dirname)
         new_dirname = prepend_date_to_filename(new_dirname, dir_mod_time)
         new_dirname = shorten_filename(new_dirname)
@@ -1,21 +1,20 @@
 import os
 import shutil
 import win32com.client
+from fs_walker import scan_tree, iter_file_paths
 
 def remove_shortcuts(directory):
     """
     遍历给定目录及其所有子目录，删除所有扩展名为 .lnk 的文件（快捷方式）。
     """
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            # 判断文件扩展名是否为 .lnk（忽略大小写）
-            if file.lower().endswith('.lnk'):
-                shortcut_path = os.path.join(root, file)
-                try:
-                    os.remove(shortcut_path)
-                    print(f"已删除快捷方式：{shortcut_path}")
-                except Exception as e:
-                    print(f"删除 {shortcut_path} 时出错：{e}")
+    for shortcut_path in iter_file_paths(directory):
+        # 判断文件扩展名是否为 .lnk（忽略大小写）
+        if shortcut_path.lower().endswith('.lnk'):
+            try:
+                os.remove(shortcut_path)
+                print(f"已删除快捷方式：{shortcut_path}")
+            except Exception as e:
+                print(f"删除 {shortcut_path} 时出错：{e}")
 
 def create_shortcut(target, shortcut_path, description=""):
     """
@@ -28,25 +27,30 @@ def create_shortcut(target, shortcut_path, description=""):
     shortcut.Description = description
     shortcut.save()
 
+def iter_second_level_dirs(base_dir):
+    """
+    产出 base_dir 下一级目录中的二级目录（不会进入更深的层级）
+    """
+    for entry, depth in scan_tree(base_dir, max_depth=1):
+        if depth == 1 and entry.is_dir():
+            yield entry, depth
+
+
 def collect_shortcut(source_dir, shortcut_dir):
 
     # 如果目标目录不存在则创建
     if not os.path.exists(shortcut_dir):
         os.makedirs(shortcut_dir)
 
-    # 遍历源目录下的一级目录
-    for first_level in os.listdir(source_dir):
-        first_level_path = os.path.join(source_dir, first_level)
-        if os.path.isdir(first_level_path):
-            # 遍历一级目录中的二级目录
-            for second_level in os.listdir(first_level_path):
-                second_level_path = os.path.join(first_level_path, second_level)
-                if os.path.isdir(second_level_path):
-                    # 为二级目录创建快捷方式（可根据需要自定义命名规则）
-                    shortcut_name = f"{second_level}_{first_level}.lnk"
-                    shortcut_path = os.path.join(shortcut_dir, shortcut_name)
-                    create_shortcut(second_level_path, shortcut_path, description=second_level_path)
-                    print(f"已创建快捷方式: {shortcut_path}")
+    # 遍历源目录下一级目录中的二级目录
+    for entry, depth in iter_second_level_dirs(source_dir):
+        first_level = os.path.basename(os.path.dirname(entry.path))
+        second_level, second_level_path = entry.name, entry.path
+        # 为二级目录创建快捷方式（可根据需要自定义命名规则）
+        shortcut_name = f"{second_level}_{first_level}.lnk"
+        shortcut_path = os.path.join(shortcut_dir, shortcut_name)
+        create_shortcut(second_level_path, shortcut_path, description=second_level_path)
+        print(f"已创建快捷方式: {shortcut_path}")
 
 
 
@@ -64,36 +68,27 @@ def create_task_folders(base_path, folder_names_vec):
 
 def move_shortcuts_into_dirs(shortcut_source, target_folder):
 
+    # 目标文件夹下的二级目录只扫描一次：名称 -> 路径（同名时保留第一个）
+    second_level_dirs = {}
+    for entry, _ in iter_second_level_dirs(target_folder):
+        second_level_dirs.setdefault(entry.name, entry.path)
+
     # 遍历快捷方式文件夹内的所有文件
-    for file in os.listdir(shortcut_source):
+    for entry, _ in list(scan_tree(shortcut_source, max_depth=0)):
+        file = entry.name
         if file.lower().endswith('.lnk'):
             # 获取不含扩展名的文件名
             base_name = os.path.splitext(file)[0]
             # 去掉后15个字符，如果长度不足15则取全部
             compare_name = base_name[:-10] if len(base_name) > 10 else base_name
 
-            # 标记是否已匹配到对应的二级目录
-            found = False
-
-            # 遍历目标文件夹下的一级目录
-            for first_level in os.listdir(target_folder):
-                first_level_path = os.path.join(target_folder, first_level)
-                if os.path.isdir(first_level_path):
-                    # 遍历一级目录下的二级目录
-                    for second_level in os.listdir(first_level_path):
-                        second_level_path = os.path.join(first_level_path, second_level)
-                        if os.path.isdir(second_level_path):
-                            # 如果二级目录的名称与处理后的快捷方式名称相同，则移动该快捷方式文件
-                            if second_level == compare_name:
-                                src_path = os.path.join(shortcut_source, file)
-                                dst_path = os.path.join(second_level_path, file)
-                                shutil.move(src_path, dst_path)
-                                print(f"已将 {file} 移动到 {second_level_path}")
-                                found = True
-                                break
-                    if found:
-                        break
-            if not found:
+            # 如果二级目录的名称与处理后的快捷方式名称相同，则移动该快捷方式文件
+            second_level_path = second_level_dirs.get(compare_name)
+            if second_level_path is not None:
+                dst_path = os.path.join(second_level_path, file)
+                shutil.move(entry.path, dst_path)
+                print(f"已将 {file} 移动到 {second_level_path}")
+            else:
                 print(f"未找到匹配的二级目录，快捷方式 {file} 未移动。")
 
 
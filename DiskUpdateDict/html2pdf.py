@@ -2,6 +2,7 @@ import os
 import asyncio
 from pathlib import Path
 from playwright.async_api import async_playwright
+from fs_walker import iter_file_paths
 
 # ====== 使用 Playwright 将本地 HTML（含微信图片）渲染为 PDF ======
 
@@ -64,11 +65,7 @@ async def convert_html_to_pdf_with_playwright(html_path, pdf_path):
 # ========= 批处理主函数（保持你的原始命名） =========
 
 def convert_html_files_in_directory(directory):
-    html_files = []
-    for root, dirs, files in os.walk(directory):
-        for f in files:
-            if f.lower().endswith(('.html', '.htm')):
-                html_files.append(os.path.join(root, f))
+    html_files = [p for p in iter_file_paths(directory) if p.lower().endswith(('.html', '.htm'))]
 
     if not html_files:
         print("目录下没有 HTML 文件")
@@ -1,32 +1,24 @@
 # collect_text_features_by_year.py
 import os
-import string
 import pickle
 import sys
-import nltk
-import pandas as pd
+import time
 
 # 增加递归深度限制
 sys.setrecursionlimit(2000)
 
-# 下载 NLTK 的停用词数据
-try:
-    nltk.download('stopwords', quiet=True)
-except Exception as e:
-    print("下载 stopwords 出现错误：", e)
-
-from nltk.corpus import stopwords
-from docx import Document
-from pptx import Presentation
-
-# 预处理文本：小写、去标点、去停用词
-def preprocess_text(text):
-    text = text.lower()
-    text = ''.join(char for char in text if char not in string.punctuation)
-    stop_words = set(stopwords.words('english'))
-    words = text.split()
-    words = [word for word in words if word not in stop_words]
-    return ' '.join(words)
+from ooxml_stream import extract_text_from_docx_stream, extract_text_from_pptx_stream
+from sheet_stream import extract_text_from_sheet_stream
+from archive_extract import extract_text_from_zip_stream, extract_text_from_rar_stream
+from feature_cache import (open_feature_cache, entry_stat_key, lookup_feature, store_feature,
+                           partition_signature, get_partition_signature, set_partition_signature,
+                           prune_missing, lookup_digest, lookup_content_text, store_content_text)
+from content_hash import get_digest
+from parallel_extract import extract_features_parallel
+from text_normalize import normalize_text, normalize_many
+from fs_walker import scan_tree
+from columnar_dataset import OTHER_CODE, ensure_dataset, read_partition_meta, write_partition
+from extract_profiler import ExtractionProfiler, note_extract_failure
 
 # 提取各类型文件的前 len_doc 个字符
 def extract_text_from_txt(file_path, len_doc):
@@ -36,89 +28,213 @@ def extract_text_from_txt(file_path, len_doc):
         return content
     except Exception as e:
         print(f"读取 txt 文件 {file_path} 出错: {e}")
+        note_extract_failure(file_path, e)
         return ""
 
+# docx/pptx 走流式解析（ooxml_stream），字符数够了就停止读取 XML
 def extract_text_from_docx(file_path, len_doc):
     try:
-        doc = Document(file_path)
-        full_text = [para.text for para in doc.paragraphs]
-        content = "\n".join(full_text)[:len_doc]
-        return content
+        return extract_text_from_docx_stream(file_path, len_doc)
     except Exception as e:
         print(f"读取 docx 文件 {file_path} 出错: {e}")
+        note_extract_failure(file_path, e)
         return ""
 
 def extract_text_from_pptx(file_path, len_doc):
     try:
-        prs = Presentation(file_path)
-        full_text = []
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    full_text.append(shape.text)
-        content = "\n".join(full_text)[:len_doc]
-        return content
+        return extract_text_from_pptx_stream(file_path, len_doc)
     except Exception as e:
         print(f"读取 pptx 文件 {file_path} 出错: {e}")
+        note_extract_failure(file_path, e)
         return ""
 
+# xls/xlsx 走只读流式读取（sheet_stream），逐行读取，字符数或单元格数够了就停止
 def extract_text_from_xlsx(file_path, len_doc):
     try:
-        df_dict = pd.read_excel(file_path, sheet_name=None)
-        texts = []
-        for sheet_name, df in df_dict.items():
-            texts.append(df.to_string())
-        content = "\n".join(texts)[:len_doc]
-        return content
+        return extract_text_from_sheet_stream(file_path, len_doc)
     except Exception as e:
         print(f"读取 xlsx 文件 {file_path} 出错: {e}")
+        note_extract_failure(file_path, e)
         return ""
 
-# 核心特征提取函数
-def extract_features_from_file(filepath, len_doc):
+# 压缩包：直接从压缩流中提取内部 docx/pptx/txt/xlsx 的文本，不解压到磁盘
+def extract_text_from_archive(file_path, len_doc):
+    try:
+        if file_path.lower().endswith('.rar'):
+            return extract_text_from_rar_stream(file_path, len_doc)
+        return extract_text_from_zip_stream(file_path, len_doc)
+    except Exception as e:
+        print(f"读取压缩包 {file_path} 出错: {e}")
+        note_extract_failure(file_path, e)
+        return ""
+
+# 扩展名 -> (提取器名称, 提取函数)，提取器名称用于性能剖析报告
+FILE_EXTRACTORS = {
+    '.txt': ('txt_read', extract_text_from_txt),
+    '.docx': ('docx_stream', extract_text_from_docx),
+    '.pptx': ('pptx_stream', extract_text_from_pptx),
+    '.xls': ('sheet_stream', extract_text_from_xlsx),
+    '.xlsx': ('sheet_stream', extract_text_from_xlsx),
+    '.zip': ('zip_stream', extract_text_from_archive),
+    '.rar': ('rar_stream', extract_text_from_archive),
+}
+
+# 提取单个文件的原始文本（未规范化）；传入 profiler 时记录耗时/字节数/失败
+def extract_raw_text_from_file(filepath, len_doc, profiler=None):
     ext = os.path.splitext(filepath)[1].lower()
-    if ext == '.txt':
-        content = extract_text_from_txt(filepath, len_doc)
-    elif ext == '.docx':
-        content = extract_text_from_docx(filepath, len_doc)
-    elif ext == '.pptx':
-        content = extract_text_from_pptx(filepath, len_doc)
-    elif ext in ['.xls', '.xlsx']:
-        content = extract_text_from_xlsx(filepath, len_doc)
-    else:
-        content = os.path.basename(filepath)
-    content = content[:len_doc]
-    return preprocess_text(content)
+    extractor, func = FILE_EXTRACTORS.get(ext, (None, None))
+    if func is None:
+        return os.path.basename(filepath)[:len_doc]
+    if profiler is None:
+        return func(filepath, len_doc)[:len_doc]
+    with profiler.track(filepath, ext, extractor):
+        content = func(filepath, len_doc)
+    return content[:len_doc]
+
+# 核心特征提取函数
+def extract_features_from_file(filepath, len_doc, profiler=None):
+    raw = extract_raw_text_from_file(filepath, len_doc, profiler)
+    if profiler is None:
+        return normalize_text(raw)
+    t0 = time.perf_counter()
+    text = normalize_text(raw)
+    profiler.record_stage('normalize', time.perf_counter() - t0)
+    return text
+
+# 遍历目录获取所有文件和文件夹（目录本身及其下一层），返回 os.DirEntry 列表
+def get_all_file_entries(directories):
+    entries = []
+    for directory in directories:
+        for entry, _ in scan_tree(directory, max_depth=1, follow_symlinks=True):
+            try:
+                if entry.is_file() or entry.is_dir():
+                    entries.append(entry)
+            except OSError:
+                continue
+    return entries
 
 # 遍历目录获取所有文件路径
 def get_all_file_paths(directories):
-    file_paths = []
-    for directory in directories:
-        for entry in os.listdir(directory):
-            path = os.path.join(directory, entry)
-            if os.path.isfile(path):
-                file_paths.append(path)
-            elif os.path.isdir(path):
-                file_paths.append(path)
-                for sub_entry in os.listdir(path):
-                    sub_path = os.path.join(path, sub_entry)
-                    if os.path.isfile(sub_path) or os.path.isdir(sub_path):
-                        file_paths.append(sub_path)
-    return file_paths
+    return [entry.path for entry in get_all_file_entries(directories)]
+
+# 批量提取特征：n_workers 为 0 时串行，否则用进程池并行（单文件超时/内存上限），返回 (texts, failures)
+def extract_features_batch(file_paths, len_doc, n_workers=0, timeout=120, max_memory_mb=None, profiler=None):
+    if n_workers and len(file_paths) > 1:
+        return extract_features_parallel(file_paths, len_doc, extract_features_from_file,
+                                         n_workers=n_workers, timeout=timeout,
+                                         max_memory_mb=max_memory_mb, profiler=profiler)
+    raw_texts = [extract_raw_text_from_file(file_path, len_doc, profiler) for file_path in file_paths]
+    t0 = time.perf_counter()
+    texts = normalize_many(raw_texts)
+    if profiler is not None:
+        profiler.record_stage('normalize', time.perf_counter() - t0, len(raw_texts))
+    return texts, []
 
 # 按年份分别提取文本特征并保存到 file_embed_pkl_history 文件夹
-def collect_data_and_features_by_year(directories_by_year, len_doc, save_folder):
+# 借助 feature_cache.sqlite 增量缓存：只有新增或修改过（大小/修改时间变化）的文件才会重新解析
+# dedup=True 时按内容哈希去重：字节相同的副本只解析一次，文本由所有副本共享
+# profile=True 时记录各扩展名/提取器的耗时分布，结束后写出 extract_profile.json / .csv
+def collect_data_and_features_by_year(directories_by_year, len_doc, save_folder, use_cache=True,
+                                      n_workers=0, timeout=120, max_memory_mb=None, dedup=True,
+                                      profile=True):
     os.makedirs(save_folder, exist_ok=True)
-    for year, directories in directories_by_year.items():
-        file_paths = get_all_file_paths(directories)
-        texts = []
-        for file_path in file_paths:
-            text = extract_features_from_file(file_path, len_doc)
-            texts.append(text)
-        save_file_str = os.path.join(save_folder, f'file_paths_and_texts_{year}.pkl')
-        with open(save_file_str, 'wb') as f:
-            pickle.dump((file_paths, texts), f)
-        print(f"[{year}] 文件路径和文本特征已成功保存到 {save_file_str}")
+    conn = open_feature_cache(os.path.join(save_folder, 'feature_cache.sqlite')) if use_cache else None
+    profiler = ExtractionProfiler() if profile else None
+    try:
+        for year, directories in directories_by_year.items():
+            t0 = time.perf_counter()
+            entries = get_all_file_entries(directories)
+            file_paths = [entry.path for entry in entries]
+            save_file_str = os.path.join(save_folder, f'file_paths_and_texts_{year}.pkl')
+
+            keys = [None] * len(file_paths)
+            signature = None
+            if conn is not None:
+                keys = [entry_stat_key(entry) for entry in entries]
+                signature = partition_signature(file_paths, keys, len_doc)
+                if os.path.exists(save_file_str) and get_partition_signature(conn, year) == signature:
+                    print(f"[{year}] 文件清单未变化，沿用 {save_file_str}")
+                    continue
+
+            if profiler is not None:
+                profiler.record_stage('scan', time.perf_counter() - t0, len(file_paths))
+
+            t0 = time.perf_counter()
+            texts = [None] * len(file_paths)
+            todo = []
+            for i, (file_path, key) in enumerate(zip(file_paths, keys)):
+                if conn is not None and key is not None:
+                    texts[i] = lookup_feature(conn, file_path, len_doc, *key)
+                if texts[i] is None:
+                    todo.append(i)
+
+            # 内容去重：已知内容直接复用文本；本批次内的重复副本只解析第一个
+            digests = {}
+            duplicate_of = {}
+            extract_idx = todo
+            if conn is not None and dedup:
+                extract_idx = []
+                first_of = {}
+                for i in todo:
+                    digest = get_digest(conn, file_paths[i], keys[i])
+                    if digest is None:
+                        extract_idx.append(i)
+                        continue
+                    digests[i] = digest
+                    known = lookup_content_text(conn, digest, len_doc)
+                    if known is not None:
+                        texts[i] = known
+                    elif digest in first_of:
+                        duplicate_of[i] = first_of[digest]
+                    else:
+                        first_of[digest] = i
+                        extract_idx.append(i)
+            if profiler is not None:
+                profiler.record_stage('cache_and_digest', time.perf_counter() - t0, len(file_paths))
+
+            new_texts, failures = extract_features_batch([file_paths[i] for i in extract_idx], len_doc,
+                                                         n_workers, timeout, max_memory_mb, profiler)
+            failed_paths = set(path for path, _ in failures)
+            for i, text in zip(extract_idx, new_texts):
+                texts[i] = text
+                # 超时/失败的文件不写缓存，下次运行会重试
+                if conn is not None and i in digests and file_paths[i] not in failed_paths:
+                    store_content_text(conn, digests[i], len_doc, text)
+            for i, j in duplicate_of.items():
+                texts[i] = texts[j]
+                if file_paths[j] in failed_paths:
+                    failed_paths.add(file_paths[i])
+            for i in todo:
+                if conn is not None and keys[i] is not None and file_paths[i] not in failed_paths:
+                    store_feature(conn, file_paths[i], len_doc, *keys[i], texts[i])
+
+            if failures:
+                fail_file_str = os.path.join(save_folder, f'extract_failures_{year}.txt')
+                with open(fail_file_str, 'w', encoding='utf-8') as f:
+                    f.write("\n".join(f"{path}  |  {reason}" for path, reason in failures))
+                print(f"[{year}] {len(failures)} 个文件提取失败或超时，详情见 {fail_file_str}")
+
+            if conn is not None:
+                n_removed = prune_missing(conn, file_paths, len_doc, directories)
+                # 有失败的文件时不记录签名，保证下次运行会重试它们
+                if not failures:
+                    set_partition_signature(conn, year, signature)
+                conn.commit()
+                print(f"[{year}] 共 {len(file_paths)} 个文件，缓存命中 {len(file_paths) - len(todo)} 个，"
+                      f"内容重复复用 {len(todo) - len(extract_idx)} 个，重新解析 {len(extract_idx)} 个，"
+                      f"清理失效记录 {n_removed} 条")
+
+            with open(save_file_str, 'wb') as f:
+                pickle.dump((file_paths, texts), f)
+            print(f"[{year}] 文件路径和文本特征已成功保存到 {save_file_str}")
+    finally:
+        if conn is not None:
+            conn.close()
+        if profiler is not None and profiler.groups:
+            profile_str = os.path.join(save_folder, 'extract_profile.json')
+            profiler.write_report(profile_str, os.path.join(save_folder, 'extract_profile.csv'))
+            print(f"提取耗时统计（按总耗时排序），完整报告见 {profile_str}")
+            profiler.print_summary()
 
 # 标签生成与过滤
 def generate_labels_and_filter(file_paths, texts, target_categories):
@@ -163,6 +279,39 @@ def combine_yearly_pkl_and_add_labels(years, target_categories, save_folder, fin
         pickle.dump((filtered_file_paths, filtered_texts, labels), f)
     print(f"最终拼接后的数据和标签已保存到 {final_save_path}")
 
+# 按年份写入列式数据集分区（dataset/year=XXXX），标签存为 target_categories 中的下标，“其他”为 -1
+# 只有年度 pkl 比分区新（或分区不存在）时才重写该年份，新增年份只需追加一个分区
+# 每行同时记录内容哈希（来自 feature_cache.sqlite，未参与去重的行为空），供 P02 合并/加权重复样本
+def build_year_partitions(years, target_categories, save_folder, dataset_dir):
+    ensure_dataset(dataset_dir, target_categories)
+    cache_path = os.path.join(save_folder, 'feature_cache.sqlite')
+    conn = open_feature_cache(cache_path) if os.path.exists(cache_path) else None
+    code_of = {os.path.normcase(os.path.normpath(cat)): i for i, cat in enumerate(target_categories)}
+
+    for year in years:
+        file_str = os.path.join(save_folder, f'file_paths_and_texts_{year}.pkl')
+        source_mtime_ns = os.stat(file_str).st_mtime_ns
+        meta = read_partition_meta(dataset_dir, year)
+        if meta is not None and meta.get('source_mtime_ns') == source_mtime_ns:
+            print(f"[{year}] 数据集分区已是最新，跳过")
+            continue
+
+        with open(file_str, 'rb') as f:
+            file_paths, texts = pickle.load(f)
+        filtered_file_paths, filtered_texts, labels = generate_labels_and_filter(
+            file_paths, texts, target_categories
+        )
+        codes = [code_of.get(label, OTHER_CODE) for label in labels]
+        digests = None
+        if conn is not None:
+            digests = [lookup_digest(conn, path) or b'' for path in filtered_file_paths]
+        write_partition(dataset_dir, year, filtered_file_paths, filtered_texts, codes,
+                        digests=digests, extra_meta={'source_mtime_ns': source_mtime_ns})
+        print(f"[{year}] 已写入数据集分区，共 {len(filtered_file_paths)} 条")
+
+    if conn is not None:
+        conn.close()
+
 # ========== 主流程 ========== #
 if __name__ == "__main__":
     # 每年的目录
@@ -210,9 +359,15 @@ if __name__ == "__main__":
     # 统一保存文件夹
     save_folder = 'file_embed_pkl_history'
 
+    # 并行提取的进程数（0 为串行）、单文件超时秒数、单进程内存上限（MB）
+    n_workers = os.cpu_count() or 1
+    timeout = 120
+    max_memory_mb = 2048
+
     # 第一步：按年份分别提取并保存
-    collect_data_and_features_by_year(directories_by_year, 200, save_folder)
+    collect_data_and_features_by_year(directories_by_year, 200, save_folder,
+                                      n_workers=n_workers, timeout=timeout, max_memory_mb=max_memory_mb)
 
-    # 第二步：拼接所有年份并生成最终数据集
-    final_save_file = 'file_paths_texts_and_labels_final.pkl'
-    combine_yearly_pkl_and_add_labels(['2022', '2023', '2024', '2025'], target_categories, save_folder, final_save_file)
+    # 第二步：按年份写入列式数据集分区（P02_training 直接 mmap 读取）
+    dataset_dir = os.path.join(save_folder, 'dataset')
+    build_year_partitions(['2022', '2023', '2024', '2025'], target_categories, save_folder, dataset_dir)
@@ -1,11 +1,17 @@
+import os
 import pickle
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.multioutput import MultiOutputClassifier
 from sklearn.preprocessing import MultiLabelBinarizer
-from sklearn.model_selection import KFold
-from sklearn.metrics import accuracy_score, f1_score
+from columnar_dataset import ColumnarDataset, read_dataset_meta
+from embedding_store import EmbeddingStore, EMBED_STORE_DIR
+from classifier_backends import BACKENDS, make_classifier, supports_added_trees, add_label_trees
+from cv_runner import run_cross_validation
+from archive_manifest import MANIFEST_PATH, read_new_records, commit_cursor
+from model_versions import MODEL_PATH, save_model_version, atomic_pickle
+from model_bundle import BUNDLE_DIR, export_bundle
+from feature_reducer import FeatureReducer, attach_reducer, apply_reducer
+from hparam_search import run_halving_search, load_best_params, BEST_PARAMS_PATH
+from embedder import load_embedder
 
 # 你提供的 22 个标签，顺序固定
 TARGET_CATEGORIES = [
@@ -32,57 +38,218 @@ TARGET_CATEGORIES = [
     "财务_经费提醒"
 ]
 
-# 1. 加载数据
-with open('./file_embed_pkl_history/file_paths_texts_and_labels_final.pkl', 'rb') as f:
-    file_paths, texts, multi_labels = pickle.load(f)
-
-# 2. 规范化 multi_labels：确保每个样本标签都只保留在 TARGET_CATEGORIES 里
-normalized = []
-for lab in multi_labels:
-    # 如果原来是列表，遍历；否则当作单个字符串
-    labs = lab if isinstance(lab, (list,tuple)) else [lab]
-    # 过滤，只保留 TARGET_CATEGORIES 中的
-    cleaned = [x for x in labs if x in TARGET_CATEGORIES]
-    # 如果一个都不在，就保留空列表，让它在训练时对应全零向量
-    normalized.append(cleaned)
-
-# 3. 初始化好 classes 的 ML-Binarizer，先 fit 再 transform
-mlb = MultiLabelBinarizer(classes=TARGET_CATEGORIES)
-mlb.fit([])                 # 此处不传数据，只定死 classes_
-Y = mlb.transform(normalized)  # 绝不会再报 unknown class
-
-# 4. SBERT 嵌入
-embedder = SentenceTransformer('all-MiniLM-L6-v2')
-X = embedder.encode(texts, batch_size=32, show_progress_bar=True)
-
-# 5. 定义多标签随机森林
-base_rf = RandomForestClassifier(
-    n_estimators=200,
-    class_weight='balanced',
-    n_jobs=-1,
-    random_state=42
-)
-model = MultiOutputClassifier(base_rf, n_jobs=-1)
-
-# 6. 五折交叉验证评估
-kf = KFold(n_splits=5, shuffle=True, random_state=42)
-accs, f1s = [], []
-for tr_idx, te_idx in kf.split(X):
-    model.fit(X[tr_idx], Y[tr_idx])
-    Yp = model.predict(X[te_idx])
-    accs.append(accuracy_score(Y[te_idx], Yp))
-    f1s.append(f1_score(Y[te_idx], Yp, average='micro'))
-
-print("CV 准确率：", accs, "平均：", np.mean(accs))
-print("CV 微平均 F1：", f1s, "平均：", np.mean(f1s))
-
-# 7. 全量训练并保存
-model.fit(X, Y)
-with open('rf_model.pkl', 'wb') as fm:
-    pickle.dump(model, fm)
-with open('label_binarizer.pkl', 'wb') as fb:
-    pickle.dump(mlb, fb)
-
-print("训练完成，已保存多标签模型和标签映射：")
-print("  - rf_model.pkl")
-print("  - label_binarizer.pkl (classes = TARGET_CATEGORIES)")
+DATASET_DIR = './file_embed_pkl_history/dataset'
+LEGACY_PKL = './file_embed_pkl_history/file_paths_texts_and_labels_final.pkl'
+MODEL_ID = 'all-MiniLM-L6-v2'
+EMBED_BACKEND = 'auto'   # 'auto' / 'onnx' / 'torch'，见 embedder.py
+LEN_DOC = 200   # 与 P01 采集时的 len_doc 保持一致
+
+_embedder = None
+
+
+def get_embedder():
+    # 首次需要编码时才加载 SBERT 模型；向量全部命中向量库时不加载
+    global _embedder
+    if _embedder is None:
+        _embedder = load_embedder(MODEL_ID, EMBED_BACKEND)
+    return _embedder
+
+
+def make_label_binarizer():
+    # 初始化好 classes 的 ML-Binarizer，先 fit 再 transform
+    mlb = MultiLabelBinarizer(classes=TARGET_CATEGORIES)
+    mlb.fit([])                 # 此处不传数据，只定死 classes_
+    return mlb
+
+
+def export_model_bundle(model, version, bundle_dir=BUNDLE_DIR):
+    # 导出 P03 使用的 mmap 模型包；不支持的后端（如 hist_gb）只保留 pickle 模型
+    try:
+        export_bundle(model, TARGET_CATEGORIES, bundle_dir, extra_meta={'model_version': version})
+        print(f"  - {bundle_dir} (模型包，P03 优先加载)")
+    except TypeError as e:
+        print(f"未导出模型包：{e}")
+
+
+def load_training_data(dataset_dir=DATASET_DIR, legacy_pkl=LEGACY_PKL, dedup=None):
+    """
+    加载训练数据，返回 (texts, Y, sample_weight)
+    - 优先读取列式数据集（texts 为 mmap 的惰性字符串列，标签直接由整数编码展开）
+    - 数据集不存在时退回旧的 file_paths_texts_and_labels_final.pkl
+    - dedup: None 保留全部副本；'collapse' 内容相同且标签相同的副本只保留一条；
+      'weight' 同样只保留一条，但以副本数作为样本权重（保持原有分布，只省去重复计算）
+    """
+    if read_dataset_meta(dataset_dir) is not None:
+        ds = ColumnarDataset(dataset_dir)
+        if ds.categories != TARGET_CATEGORIES:
+            raise ValueError(f"数据集标签列表与 TARGET_CATEGORIES 不一致：{dataset_dir}")
+        print(f"已加载列式数据集 {dataset_dir}：{len(ds)} 条，年份 {ds.years}")
+        Y = ds.label_matrix()
+        if dedup is None:
+            return ds.texts, Y, None
+        keep, counts = ds.dedup_rows()
+        print(f"内容去重：{len(ds)} 条 -> {len(keep)} 条（模式 {dedup}）")
+        weights = counts.astype(np.float64) if dedup == 'weight' else None
+        return ds.texts.take(keep), Y[keep], weights
+
+    with open(legacy_pkl, 'rb') as f:
+        file_paths, texts, multi_labels = pickle.load(f)
+
+    # 规范化 multi_labels：确保每个样本标签都只保留在 TARGET_CATEGORIES 里
+    normalized = []
+    for lab in multi_labels:
+        # 如果原来是列表，遍历；否则当作单个字符串
+        labs = lab if isinstance(lab, (list,tuple)) else [lab]
+        # 过滤，只保留 TARGET_CATEGORIES 中的
+        cleaned = [x for x in labs if x in TARGET_CATEGORIES]
+        # 如果一个都不在，就保留空列表，让它在训练时对应全零向量
+        normalized.append(cleaned)
+
+    Y = make_label_binarizer().transform(normalized)  # 绝不会再报 unknown class
+    return texts, Y, None
+
+
+def encode_texts(texts, batch_size=32, chunk_size=4096, store=None):
+    """
+    SBERT 嵌入；列式数据集按块流式编码，避免一次性把全部文本解码成 Python 字符串
+    给出 store（EmbeddingStore）时只编码向量库中没有的文本，新向量追加入库
+    """
+    def encode(batch):
+        return get_embedder().encode(batch, batch_size=batch_size, show_progress_bar=False)
+
+    if hasattr(texts, 'iter_chunks'):
+        chunks = texts.iter_chunks(chunk_size)
+    else:
+        chunks = (list(texts[i:i + chunk_size]) for i in range(0, len(texts), chunk_size))
+
+    n_before = len(store) if store is not None else 0
+    blocks = [store.encode(chunk, encode) if store is not None else encode(chunk) for chunk in chunks]
+    if store is not None:
+        print(f"向量库：新编码 {len(store) - n_before} 条，库中共 {len(store)} 条")
+    return np.vstack(blocks)
+
+
+def incremental_update(manifest_path=MANIFEST_PATH, model_path=MODEL_PATH, len_doc=LEN_DOC, n_new_trees=50):
+    """
+    增量训练：只读取归档清单中上次更新之后新移动的文件，更新当前模型并保存为新版本
+    标签取文件所在的分类文件夹（不在 TARGET_CATEGORIES 中的记为“其他”，即全零标签）
+    - 支持 partial_fit 的模型（BACKEND='sgd_linear'）在新样本上继续训练
+    - 逐标签随机森林（默认的 BACKEND='multioutput_rf'）每个标签在新样本上追加 n_new_trees 棵树，原有的树不变
+    """
+    from P01_collect_name import extract_features_from_file
+
+    records, end = read_new_records(manifest_path)
+    # 同一文件多次移动时以最后一次为准
+    latest = {}
+    for record in records:
+        latest[os.path.normcase(os.path.abspath(record['path']))] = record
+    samples = [r for r in latest.values()
+               if not r['path'].lower().endswith('.lnk') and os.path.isfile(r['path'])]
+    if not samples:
+        print(f"归档清单中没有新的文件（已处理到第 {end} 字节）")
+        commit_cursor(end, manifest_path)
+        return None
+
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    if not hasattr(model, 'partial_fit') and not supports_added_trees(model):
+        raise TypeError(f"当前模型 {type(model).__name__} 不支持增量更新，"
+                        f"请先以 BACKEND='multioutput_rf' 或 'sgd_linear' 全量训练一次")
+
+    texts = [extract_features_from_file(r['path'], len_doc) for r in samples]
+    Y = make_label_binarizer().transform([[r['label']] if r['label'] in TARGET_CATEGORIES else []
+                                          for r in samples])
+    store = EmbeddingStore(EMBED_STORE_DIR, MODEL_ID)
+    X = encode_texts(texts, store=store)
+    store.close()
+
+    # 全量训练时拟合的降维器随模型保存，增量数据按同一变换处理
+    X = apply_reducer(model, X)
+    meta = {'mode': 'incremental', 'n_new': len(samples), 'manifest_offset': end}
+    if hasattr(model, 'partial_fit'):
+        model.partial_fit(X, Y)
+    else:
+        # 每次更新的新树用不同的随机种子（清单偏移量），同一批数据重跑时结果相同
+        n_updated = add_label_trees(model, X, Y, n_new=n_new_trees, random_state=end % 2 ** 31)
+        print(f"随机森林增量更新：{n_updated}/{Y.shape[1]} 个标签各追加 {n_new_trees} 棵树"
+              f"（其余标签的新样本只有一个取值或与原森林类别不一致，保持原样）")
+        meta.update({'n_new_trees': n_new_trees, 'labels_updated': n_updated})
+    version = save_model_version(model, meta, model_path=model_path)
+    # 模型保存成功后才推进游标
+    commit_cursor(end, manifest_path)
+    print(f"增量更新完成：新增样本 {len(samples)} 个，已保存模型版本 v{version:04d} -> {model_path}")
+    export_model_bundle(model, version)
+    return version
+
+
+if __name__ == "__main__":
+    # 'full'：全量训练；'incremental'：只用 P04 归档清单中的新文件增量更新
+    #        （multioutput_rf 为每个标签追加一批树，sgd_linear 用 partial_fit）
+    # 'search'：在缓存的嵌入上做逐次减半超参数搜索，结果写入 hparam_best.json，之后 'full' 训练自动使用
+    MODE = 'full'
+    if MODE == 'incremental':
+        incremental_update()
+        raise SystemExit
+
+    # 重复副本处理：None / 'collapse' / 'weight'
+    DEDUP = 'weight'
+    # 分类器后端：multioutput_rf（支持增量更新）/ native_rf / ovr_linear / hist_gb / sgd_linear（支持增量更新）/
+    #           hier_rf（按类别名前缀分组的两级森林，预测时只评估可能的组内标签）
+    # 各后端的速度和精度对比见 benchmarks/bench_classifiers.py
+    BACKEND = 'multioutput_rf'
+    # 嵌入降维/量化：None 为直接使用 384 维 float32 向量；
+    # 例如 {'method': 'pca', 'n_components': 128, 'quantize': 'int8'}，效果对比见 benchmarks/bench_reducer.py
+    REDUCER = None
+
+    # 1. 加载数据（列式数据集或旧 pkl）
+    texts, Y, sample_weight = load_training_data(dedup=DEDUP)
+    mlb = make_label_binarizer()
+
+    # 2. SBERT 嵌入（已编码过的文本直接从向量库读取）
+    store = EmbeddingStore(EMBED_STORE_DIR, MODEL_ID)
+    X = encode_texts(texts, batch_size=32, store=store)
+    store.close()
+
+    # 2.1 降维/量化（无监督，在全部样本上拟合一次，交叉验证和最终模型共用）
+    reducer = None
+    if REDUCER:
+        reducer = FeatureReducer(**REDUCER).fit(X)
+        raw_mb = X.nbytes / 1024 / 1024
+        X = reducer.transform(X)
+        print(f"特征降维：{raw_mb:.1f} MB -> {X.nbytes / 1024 / 1024:.1f} MB（{reducer.describe()}）")
+
+    if MODE == 'search':
+        # 搜索空间见 hparam_search.PARAM_SPACES；随机森林也可以 resource='n_estimators' 按树数逐轮加码
+        run_halving_search(X, Y, BACKEND, sample_weight=sample_weight, n_candidates=48, factor=3,
+                           label_names=TARGET_CATEGORIES)
+        raise SystemExit
+
+    # 3. 定义多标签分类器（有该后端的搜索结果时使用最优参数）
+    assert BACKEND in BACKENDS, BACKEND
+    params = load_best_params(BACKEND)
+    if params:
+        print(f"使用 {BEST_PARAMS_PATH} 中的超参数：{params}")
+    model = make_classifier(BACKEND, params=params, label_names=TARGET_CATEGORIES)
+
+    # 4. 五折交叉验证评估（所有折/标签的训练共用一个进程池，每折完成即打印）
+    cv = run_cross_validation(X, Y, BACKEND, n_splits=5, sample_weight=sample_weight, params=params,
+                              label_names=TARGET_CATEGORIES)
+    accs = [m['accuracy'] for m in cv]
+    f1s = [m['micro_f1'] for m in cv]
+
+    print("CV 准确率：", accs, "平均：", np.mean(accs))
+    print("CV 微平均 F1：", f1s, "平均：", np.mean(f1s))
+
+    # 5. 全量训练并保存（新版本写入 model_versions/，再原子替换 rf_model.pkl）
+    model.fit(X, Y, **({} if sample_weight is None else {'sample_weight': sample_weight}))
+    if reducer is not None:
+        attach_reducer(model, reducer)
+    version = save_model_version(model, {'mode': 'full', 'backend': BACKEND, 'n_samples': len(Y),
+                                         'cv_micro_f1': float(np.mean(f1s)), 'params': params,
+                                         'reducer': None if reducer is None else reducer.describe()})
+    atomic_pickle(mlb, 'label_binarizer.pkl')
+
+    print(f"训练完成（后端 {BACKEND}），已保存多标签模型和标签映射：")
+    print(f"  - {MODEL_PATH} (版本 v{version:04d})")
+    print("  - label_binarizer.pkl (classes = TARGET_CATEGORIES)")
+    export_model_bundle(model, version)
@@ -1,149 +1,363 @@
 import os
-import string
-import shutil
 import pickle
 import sys
-import zipfile
-import rarfile
-import pandas as pd
-import numpy as np
-from docx import Document
-from pptx import Presentation
-from sentence_transformers import SentenceTransformer
+import time
+import queue
+import threading
+from ooxml_stream import extract_text_from_docx_stream, extract_text_from_pptx_stream
+from sheet_stream import extract_text_from_sheet_stream
+from archive_extract import extract_text_from_zip_stream, extract_text_from_rar_stream
+from text_normalize import normalize_text, normalize_many, strip_punctuation
+from fs_walker import iter_file_paths
+from extract_profiler import ExtractionProfiler, note_extract_failure
+from parallel_extract import iter_extract_parallel, pool_start_method
+from embedding_store import EmbeddingStore, EMBED_STORE_DIR
+from model_bundle import load_classifier, ModelBundle
+from embedder import load_embedder
+from classify_client import connect_service
+from move_planner import plan_moves, execute_plan, new_batch_id, MOVE_JOURNAL_PATH
 
 sys.setrecursionlimit(2000)
 
-# 下载 NLTK 停用词
-"""
-try:
-    nltk.download('stopwords', quiet=True)
-except:
-    pass
-"""
-from nltk.corpus import stopwords
-
-def preprocess_text(text):
-    text = text.lower()
-    text = ''.join(c for c in text if c not in string.punctuation)
-    stops = set(stopwords.words('english'))
-    return ' '.join(w for w in text.split() if w not in stops)
+MODEL_ID = 'all-MiniLM-L6-v2'
+EMBED_BACKEND = 'auto'   # 'auto' / 'onnx' / 'torch'，见 embedder.py
 
 def extract_text_from_txt(fp, L):
     try:
         with open(fp,'r',encoding='utf-8') as f:
             return f.read(L)
-    except:
+    except Exception as e:
+        note_extract_failure(fp, e)
         return ""
 
 def extract_text_from_docx(fp, L):
     try:
-        doc = Document(fp)
-        return "\n".join(p.text for p in doc.paragraphs)[:L]
-    except:
+        return extract_text_from_docx_stream(fp, L)
+    except Exception as e:
+        note_extract_failure(fp, e)
         return ""
 
 def extract_text_from_pptx(fp, L):
     try:
-        prs = Presentation(fp)
-        txt = []
-        for s in prs.slides:
-            for sh in s.shapes:
-                if hasattr(sh, 'text'):
-                    txt.append(sh.text)
-        return "\n".join(txt)[:L]
-    except:
+        return extract_text_from_pptx_stream(fp, L)
+    except Exception as e:
+        note_extract_failure(fp, e)
         return ""
 
 def extract_text_from_excel(fp, L):
     try:
-        sheets = pd.read_excel(fp, sheet_name=None)
-        return "\n".join(df.to_string() for df in sheets.values())[:L]
-    except:
+        return extract_text_from_sheet_stream(fp, L)
+    except Exception as e:
+        note_extract_failure(fp, e)
         return ""
 
 def extract_text_from_zip(fp, L):
     try:
-        with zipfile.ZipFile(fp) as z:
-            names = z.namelist()
-        return " ".join(preprocess_text(n) for n in names)[:L]
-    except:
+        return extract_text_from_zip_stream(fp, L)
+    except Exception as e:
+        note_extract_failure(fp, e)
         return ""
 
 def extract_text_from_rar(fp, L):
     try:
-        with rarfile.RarFile(fp) as r:
-            names = r.namelist()
-        return " ".join(preprocess_text(n) for n in names)[:L]
-    except:
+        return extract_text_from_rar_stream(fp, L)
+    except Exception as e:
+        note_extract_failure(fp, e)
         return ""
 
-def extract_features_from_file(fp, L):
+# 扩展名 -> (提取器名称, 提取函数)
+FILE_EXTRACTORS = {
+    '.txt': ('txt_read', extract_text_from_txt),
+    '.docx': ('docx_stream', extract_text_from_docx),
+    '.pptx': ('pptx_stream', extract_text_from_pptx),
+    '.xls': ('sheet_stream', extract_text_from_excel),
+    '.xlsx': ('sheet_stream', extract_text_from_excel),
+    '.zip': ('zip_stream', extract_text_from_zip),
+    '.rar': ('rar_stream', extract_text_from_rar),
+}
+
+def extract_raw_text_from_file(fp, L, profiler=None):
     ext = os.path.splitext(fp)[1].lower()
-    if ext == '.txt':
-        c = extract_text_from_txt(fp, L)
-    elif ext == '.docx':
-        c = extract_text_from_docx(fp, L)
-    elif ext == '.pptx':
-        c = extract_text_from_pptx(fp, L)
-    elif ext in ('.xls', '.xlsx'):
-        c = extract_text_from_excel(fp, L)
-    elif ext == '.zip':
-        c = extract_text_from_zip(fp, L)
-    elif ext == '.rar':
-        c = extract_text_from_rar(fp, L)
-    else:
-        c = ""
-    name = os.path.basename(fp).lower().translate(str.maketrans('', '', string.punctuation))
-    return (name + " " + preprocess_text(c))[:L]
+    extractor, func = FILE_EXTRACTORS.get(ext, (None, None))
+    if func is None:
+        return ""
+    if profiler is None:
+        return func(fp, L)
+    with profiler.track(fp, ext, extractor):
+        return func(fp, L)
+
+def extract_features_from_file(fp, L):
+    name = strip_punctuation(os.path.basename(fp).lower())
+    return (name + " " + normalize_text(extract_raw_text_from_file(fp, L)))[:L]
+
+def extract_features_batch(fps, L, profiler=None):
+    raw = [extract_raw_text_from_file(fp, L, profiler) for fp in fps]
+    return make_features(fps, raw, L, profiler)
+
+def make_features(fps, raw, L, profiler=None):
+    # 批量规范化原始文本，拼上文件名得到分类用的特征文本
+    t0 = time.perf_counter()
+    contents = normalize_many(raw)
+    if profiler is not None:
+        profiler.record_stage('normalize', time.perf_counter() - t0, len(raw))
+    return [(strip_punctuation(os.path.basename(fp).lower()) + " " + c)[:L] for fp, c in zip(fps, contents)]
 
 def get_all_file_paths(dir_):
-    paths = []
-    for root, _, files in os.walk(dir_):
-        for f in files:
-            paths.append(os.path.join(root, f))
-    return paths
-
-def classify_files(src_dir, dst_root, L, thresh=0.5):
-    # 获取所有文件
-    fps = get_all_file_paths(src_dir)
-    # 若目录为空，直接跳过
-    if not fps:
-        print(f"输入目录 '{src_dir}' 中没有文件，跳过分类。")
-        return
+    return list(iter_file_paths(dir_))
+
+_embedder = None
 
-    # 提取特征文本
-    texts = [extract_features_from_file(fp, L) for fp in fps]
+def get_embedder():
+    # 首次需要编码时才加载 SBERT 模型
+    global _embedder
+    if _embedder is None:
+        _embedder = load_embedder(MODEL_ID, EMBED_BACKEND)
+    return _embedder
 
-    # SBERT 嵌入
-    embedder = SentenceTransformer('all-MiniLM-L6-v2')
-    X = embedder.encode(texts, batch_size=32, show_progress_bar=False)
+def embed_texts(texts, store_dir=EMBED_STORE_DIR):
+    # 先查向量库，只有没见过的文本才加载模型编码；store_dir 为 None 时不使用向量库
+    def encode(batch):
+        return get_embedder().encode(batch, batch_size=32, show_progress_bar=False)
+
+    if store_dir is None:
+        return encode(texts)
+    store = EmbeddingStore(store_dir, MODEL_ID)
+    try:
+        return store.encode(texts, encode)
+    finally:
+        store.close()
 
-    # 加载模型和标签转换器
-    with open('rf_model.pkl', 'rb') as f:
-        model = pickle.load(f)
+def load_model_and_labels(model_path='rf_model.pkl'):
+    # 加载模型和标签：优先使用 mmap 模型包（标签列表在包内），否则反序列化 pickle 模型
+    model = load_classifier(model_path)
+    if isinstance(model, ModelBundle):
+        return model, list(model.classes_)
     with open('label_binarizer.pkl', 'rb') as f:
         mlb = pickle.load(f)
     labels = mlb.classes_.tolist()
+    # 随机森林/线性模型转成内存中的模型包，走同一个批量推理引擎；其他模型仍按 sklearn 接口预测
+    try:
+        model = ModelBundle.from_model(model, labels)
+    except TypeError:
+        pass
+    return model, labels
 
-    # 预测概率
-    probas = model.predict_proba(X)
-    P = np.vstack([p[:, 1] for p in probas]).T
+def predict_proba(model, X):
+    if isinstance(model, ModelBundle):
+        return model.predict_proba(X)
+    from classifier_backends import predict_label_proba
+    from feature_reducer import apply_reducer
+    return predict_label_proba(model, apply_reducer(model, X))
 
+def move_classified(fps, P, labels, dst_root, thresh=0.5, makedirs=True, dry_run=False,
+                    journal=MOVE_JOURNAL_PATH, link='hardlink', run=None):
+    # 按概率把文件移动到 dst_root/<标签>：取所有不低于 thresh 的标签，没有时取概率最大的标签
+    # 每个文件只移动一次（概率最高的标签），其余标签用硬链接生成；操作记入移动日志，可用 move_planner.rollback 撤销
     # 创建分类目录
-    for lbl in labels:
-        os.makedirs(os.path.join(dst_root, lbl), exist_ok=True)
-
-    # 移动文件
-    for fp, row in zip(fps, P):
-        idxs = np.where(row >= thresh)[0].tolist()
-        if not idxs:
-            idxs = [int(np.argmax(row))]
-        picked = [labels[i] for i in idxs]
-
-        for lbl in picked:
-            dst = os.path.join(dst_root, lbl, os.path.basename(fp))
-            print(f"移动文件 {fp} 到 {dst} （分类：{lbl}）")
-            shutil.move(fp, dst)
+    if makedirs and not dry_run:
+        for lbl in labels:
+            os.makedirs(os.path.join(dst_root, lbl), exist_ok=True)
+
+    plan = plan_moves(fps, P, labels, dst_root, thresh)
+    return execute_plan(plan, journal, link=link, dry_run=dry_run, run=run)
+
+_DONE = object()   # 流水线各阶段之间的结束标记
+
+def _put(q, item, stop):
+    # 有界队列满时阻塞（反压）；流水线出错停止时放弃，返回 False
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def _get(q, stop, timeout=None):
+    # 流水线停止时返回 _DONE；给出 timeout 且超时时抛出 queue.Empty
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while not stop.is_set():
+        wait = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+        if wait <= 0:
+            raise queue.Empty
+        try:
+            return q.get(timeout=wait)
+        except queue.Empty:
+            pass
+    return _DONE
+
+# 流式分类：遍历 -> 提取（n_workers 个进程）-> 规范化 + 嵌入（按批）-> 预测 -> 移动，各阶段由有界队列连接
+# - 提取用 parallel_extract 的进程池（docx/xlsx 的 XML 解析受 GIL 限制，线程并行不起来），单文件超时 timeout 秒；
+#   n_workers=0 时在提取线程中串行提取（文件很少时省去启动进程的开销）
+# - 提取超时/崩溃的文件不参与分类，留在输入目录，结束时列出
+# - 队列满时上游阻塞，内存占用与待处理文件总数无关；第一批文件提取完就会被分类和移动，不必等全部提取结束
+# - 嵌入批在凑满 batch_size 条或上游 max_delay 秒没有新文本时提交
+# - 预测和移动在调用线程中进行（模型在这里加载，与遍历/提取并行）；向量库只在嵌入线程中打开
+# profile_path 给出时记录提取/嵌入/预测/移动各阶段耗时，写出 JSON（同名 .csv 为按提取器汇总）
+# use_service 时若常驻分类服务（classify_service.py）在运行，嵌入和预测交给服务，本进程不加载模型
+def classify_files(src_dir, dst_root, L, thresh=0.5, profile_path=None, embed_store_dir=EMBED_STORE_DIR,
+                   use_service=True, n_workers=4, batch_size=256, max_delay=0.5, dry_run=False, timeout=120):
+    t_start = time.perf_counter()
+    profiler = ExtractionProfiler() if profile_path else None
+    client = connect_service() if use_service else None
+    dst_abs = os.path.abspath(dst_root) + os.sep
+    q_paths = queue.Queue(maxsize=batch_size * 4)
+    q_raw = queue.Queue(maxsize=batch_size * 2)
+    q_batches = queue.Queue(maxsize=2)
+    stop = threading.Event()
+    errors = []
+    failures = []   # 提取超时/崩溃的文件 (路径, 原因)：留在原位置，不按文件名猜类别移动
+
+    def walk():
+        for fp in iter_file_paths(src_dir):
+            # 目标目录在输入目录下时，跳过已经移动过去的文件
+            if not os.path.abspath(fp).startswith(dst_abs) and not _put(q_paths, fp, stop):
+                return
+        _put(q_paths, _DONE, stop)
+
+    def pending_paths():
+        # 供进程池按需取用；None 表示遍历暂时没有新文件
+        while True:
+            try:
+                fp = _get(q_paths, stop, timeout=0.1)
+            except queue.Empty:
+                yield None
+                continue
+            if fp is _DONE:
+                return
+            yield fp
+
+    # 进程池在启动各阶段线程之前建好；不从本进程 fork（预测用的 numba 线程池初始化后再 fork 会导致退出时挂起）
+    if n_workers:
+        results = iter_extract_parallel(pending_paths(), L, extract_raw_text_from_file, n_workers, timeout,
+                                        profiler=profiler, start_method=pool_start_method())
+    else:
+        results = ((None, fp, extract_raw_text_from_file(fp, L, profiler), 'ok') for fp in pending_paths()
+                   if fp is not None)
+
+    def extract():
+        try:
+            for _, fp, raw, status in results:
+                if status != 'ok':
+                    failures.append((fp, status))
+                    continue
+                if not _put(q_raw, (fp, raw), stop):
+                    return
+            _put(q_raw, _DONE, stop)
+        finally:
+            results.close()
+
+    def embed():
+        store = EmbeddingStore(embed_store_dir, MODEL_ID) if embed_store_dir and client is None else None
+
+        def encode(texts):
+            return get_embedder().encode(texts, batch_size=32, show_progress_bar=False)
+
+        def flush(batch):
+            fps = [fp for fp, _ in batch]
+            texts = make_features(fps, [raw for _, raw in batch], L, profiler)
+            X = None
+            if client is None:
+                t0 = time.perf_counter()
+                X = store.encode(texts, encode) if store is not None else encode(texts)
+                if profiler is not None:
+                    profiler.record_stage('embed', time.perf_counter() - t0, len(texts))
+            return _put(q_batches, (fps, texts, X), stop)
+
+        try:
+            batch = []
+            while not stop.is_set():
+                try:
+                    item = _get(q_raw, stop, timeout=max_delay)
+                except queue.Empty:
+                    item = None
+                if item is not None and item is not _DONE:
+                    batch.append(item)
+                if batch and (len(batch) >= batch_size or item is None or item is _DONE):
+                    if not flush(batch):
+                        return
+                    batch = []
+                if item is _DONE:
+                    break
+            _put(q_batches, _DONE, stop)
+        finally:
+            if store is not None:
+                store.close()
+
+    def start(func):
+        def run():
+            try:
+                func()
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    threads = [start(walk), start(extract), start(embed)]
+    n_done = 0
+    # 一次运行的所有移动带同一个 run 编号，可以用 move_planner.rollback() 整体撤销；
+    # 每个流水线批单独加日志锁，其他进程（如 inbox_watcher）的移动可以穿插在批之间进行
+    run = new_batch_id()
+    try:
+        if client is None:
+            # 加载模型和标签（与遍历/提取并行）
+            t0 = time.perf_counter()
+            model, labels = load_model_and_labels()
+            if profiler is not None:
+                profiler.record_stage('load_model', time.perf_counter() - t0)
+        created = False
+        totals = {}
+        while True:
+            item = _get(q_batches, stop)
+            if item is _DONE:
+                break
+            fps, texts, X = item
+            # 预测概率
+            t0 = time.perf_counter()
+            if client is not None:
+                labels, P = client.classify_texts(texts)
+            else:
+                P = predict_proba(model, X)
+            if profiler is not None:
+                profiler.record_stage('service' if client is not None else 'predict',
+                                      time.perf_counter() - t0, len(fps))
+            # 移动文件
+            t0 = time.perf_counter()
+            stats = move_classified(fps, P, labels, dst_root, thresh, makedirs=not created, dry_run=dry_run,
+                                    run=run)
+            for k, v in stats.items():
+                totals[k] = totals.get(k, 0) + v
+            created = True
+            n_done += len(fps)
+            if profiler is not None:
+                profiler.record_stage('move', time.perf_counter() - t0, len(fps))
+    finally:
+        # 正常结束时各阶段都已退出；出错或中断时通知其余阶段停止
+        stop.set()
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+    if failures:
+        print(f"提取失败 {len(failures)} 个文件，未分类、留在原位置：")
+        for fp, status in failures:
+            print(f"  - {fp}（{status}）")
+
+    # 若目录为空，直接跳过
+    if not n_done:
+        if not failures:
+            print(f"输入目录 '{src_dir}' 中没有文件，跳过分类。")
+        return
+    print(f"共分类 {n_done} 个文件，用时 {time.perf_counter() - t_start:.2f}s；"
+          f"{'[演练] ' if dry_run else ''}改名 {totals['renamed']}，跨盘复制 {totals['copied']}，"
+          f"硬链接 {totals['linked']}，附加副本 {totals['extra_copies']}，"
+          f"复制 {totals['bytes_copied'] / 1024 / 1024:.1f} MB，失败 {totals['failed']}")
+    if profiler is not None:
+        profiler.record_stage('pipeline', time.perf_counter() - t_start, n_done)
+        profiler.write_report(profile_path, os.path.splitext(profile_path)[0] + '.csv')
+        profiler.print_summary()
 
 if __name__ == '__main__':
     src = r"C:\MyDocument\ToDoList\D20_ToDailyNotice"
@@ -1,50 +1,70 @@
 import os
+import time
 import shutil
+from fs_walker import scan_tree
+from archive_manifest import MANIFEST_PATH, append_manifest
 
-def move_files(src_folder, base_dest, year, sub_path):
+def _manifest_record(dest_file, year, moved_at):
+    # 标签即文件所在的分类文件夹名（与 P01 generate_labels_and_filter 的规则一致）
+    return {'path': dest_file, 'label': os.path.basename(os.path.dirname(dest_file)),
+            'year': str(year), 'moved_at': moved_at}
+
+def move_files(src_folder, base_dest, year, sub_path, manifest_path=MANIFEST_PATH):
     """
     将 src_folder 下的所有内容移动到 base_dest\Store{year}\sub_path
     - 文件遇到同名则覆盖
     - 文件夹遇到同名则合并（不会删除目标已有内容）
     - 空文件夹不会破坏目标文件夹
+    - 每个移入的文件追加一条归档清单记录（manifest_path 为 None 时不记录），供 P02 增量训练
     """
     dest_folder = os.path.join(base_dest, f"Store{year}", sub_path)
     os.makedirs(dest_folder, exist_ok=True)
+    moved_at = time.strftime('%Y-%m-%d %H:%M:%S')
+    records = []
 
-    for item in os.listdir(src_folder):
-        src_item = os.path.join(src_folder, item)
-        dest_item = os.path.join(dest_folder, item)
+    # 移动时不做任何排除：合并后源目录会被整体删除，不能漏掉任何文件
+    for entry, _ in list(scan_tree(src_folder, max_depth=0, exclude=None)):
+        src_item = entry.path
+        dest_item = os.path.join(dest_folder, entry.name)
 
         try:
-            if os.path.isfile(src_item):
+            if entry.is_file():
                 # 文件：覆盖
                 shutil.move(src_item, dest_item)
+                records.append(_manifest_record(dest_item, year, moved_at))
                 print(f"已移动文件: {src_item} -> {dest_item}")
 
-            elif os.path.isdir(src_item):
+            elif entry.is_dir():
                 # 文件夹：合并
                 if not os.path.exists(dest_item):
                     shutil.move(src_item, dest_item)
+                    for sub_entry, _ in scan_tree(dest_item, exclude=None):
+                        if sub_entry.is_file():
+                            records.append(_manifest_record(sub_entry.path, year, moved_at))
                     print(f"已移动文件夹: {src_item} -> {dest_item}")
                 else:
                     # 合并内容
-                    for root, _, files in os.walk(src_item):
-                        rel_path = os.path.relpath(root, src_item)
-                        target_dir = os.path.join(dest_item, rel_path)
-                        os.makedirs(target_dir, exist_ok=True)
-                        for f in files:
-                            src_file = os.path.join(root, f)
-                            dest_file = os.path.join(target_dir, f)
-                            if os.path.exists(dest_file):
-                                os.remove(dest_file)  # 覆盖文件
-                            shutil.move(src_file, dest_file)
-                            print(f"已移动文件: {src_file} -> {dest_file}")
+                    for sub_entry, _ in list(scan_tree(src_item, exclude=None)):
+                        src_file = sub_entry.path
+                        dest_file = os.path.join(dest_item, os.path.relpath(src_file, src_item))
+                        if sub_entry.is_dir():
+                            os.makedirs(dest_file, exist_ok=True)
+                            continue
+                        if os.path.exists(dest_file):
+                            os.remove(dest_file)  # 覆盖文件
+                        shutil.move(src_file, dest_file)
+                        records.append(_manifest_record(dest_file, year, moved_at))
+                        print(f"已移动文件: {src_file} -> {dest_file}")
                     # 清理空源目录
                     shutil.rmtree(src_item, ignore_errors=True)
 
         except Exception as e:
             print(f"移动失败: {src_item}, 错误: {e}")
 
+    if manifest_path is not None:
+        append_manifest(records, manifest_path)
+        print(f"已记录 {len(records)} 个归档文件到 {manifest_path}")
+
 
 
 
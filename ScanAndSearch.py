@@ -1,9 +1,9 @@
-import os
 import pdfplumber
 import pandas as pd
 import docx
 import win32com.client
 from pathlib import Path
+from fs_walker import iter_file_paths
 
 fail_log = []
 
@@ -116,11 +116,10 @@ def convert_and_delete(filepath: Path):
         log_failure(filepath, "内容为空或提取失败")
 
 def scan_and_convert(root_folder):
-    for dirpath, _, filenames in os.walk(root_folder):
-        for filename in filenames:
-            filepath = Path(os.path.join(dirpath, filename))
-            if filepath.suffix.lower() in [".pdf", ".doc", ".docx", ".xls", ".xlsx"]:
-                convert_and_delete(filepath)
+    for file_path in iter_file_paths(root_folder):
+        filepath = Path(file_path)
+        if filepath.suffix.lower() in [".pdf", ".doc", ".docx", ".xls", ".xlsx"]:
+            convert_and_delete(filepath)
 
 if __name__ == "__main__":
     target_folder = r"C:\MyDocument\ToDoList\D20_ToHardDisk\关于开展教育教改类科的通知"
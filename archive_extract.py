@@ -0,0 +1,107 @@
+import io
+import os
+import zipfile
+
+from ooxml_stream import join_until, extract_text_from_docx_stream, extract_text_from_pptx_stream
+from sheet_stream import extract_text_from_sheet_stream
+
+try:
+    import rarfile
+except ImportError:
+    rarfile = None
+
+# ----- 压缩包内文档的流式文本提取：直接从压缩流读取，不解压到磁盘 ----- #
+# - 只处理 docx/pptx/txt/xls/xlsx 成员，单个成员超过 max_member_bytes 直接跳过
+# - 成员按目录顺序依次提取，字符数够了立即停止，后面的成员不会被解压
+# - docx/pptx/xls/xlsx 成员解压一次读入内存（受 max_member_bytes 限制）再解析：这些格式要先读末尾的目录再回头读数据，
+#   直接在解压流上 seek 时每次向回 seek 都要从头重新解压；txt 成员只读开头，直接流式读取
+# - 没有可提取的成员时退回成员文件名列表
+
+MEMBER_EXTS = {'.txt', '.docx', '.pptx', '.xls', '.xlsx'}
+MAX_MEMBER_BYTES = 32 * 1024 * 1024
+
+
+def _member_text(fileobj, ext, len_doc):
+    """
+    从成员解压流中提取前 len_doc 个字符；txt 只读开头，其余格式先整体读入内存
+    """
+    if ext == '.txt':
+        # UTF-8 每个字符最多 4 字节，读取上限即可覆盖 len_doc 个字符
+        return fileobj.read(len_doc * 4).decode('utf-8', errors='ignore')[:len_doc]
+    fileobj = io.BytesIO(fileobj.read())
+    if ext == '.docx':
+        return extract_text_from_docx_stream(fileobj, len_doc)
+    if ext == '.pptx':
+        return extract_text_from_pptx_stream(fileobj, len_doc)
+    return extract_text_from_sheet_stream(fileobj, len_doc)
+
+
+def zip_member_name(info):
+    """
+    未设置 UTF-8 标志的成员名按 GBK 重新解码（Windows 中文压缩包的常见情况）
+    """
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        return info.filename.encode('cp437').decode('gbk')
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return info.filename
+
+
+def _iter_zip_member_texts(z, len_doc, max_member_bytes):
+    for info in z.infolist():
+        if info.is_dir() or info.file_size > max_member_bytes:
+            continue
+        ext = os.path.splitext(info.filename)[1].lower()
+        if ext not in MEMBER_EXTS:
+            continue
+        try:
+            with z.open(info) as member:
+                text = _member_text(member, ext, len_doc)
+        except Exception as e:
+            print(f"读取压缩包成员 {zip_member_name(info)} 出错: {e}")
+            continue
+        if text:
+            yield text
+
+
+def _iter_rar_member_texts(r, len_doc, max_member_bytes):
+    for info in r.infolist():
+        if info.is_dir() or info.file_size > max_member_bytes:
+            continue
+        ext = os.path.splitext(info.filename)[1].lower()
+        if ext not in MEMBER_EXTS:
+            continue
+        try:
+            with r.open(info) as member:
+                text = _member_text(member, ext, len_doc)
+        except Exception as e:
+            print(f"读取压缩包成员 {info.filename} 出错: {e}")
+            continue
+        if text:
+            yield text
+
+
+def extract_text_from_zip_stream(source, len_doc, max_member_bytes=MAX_MEMBER_BYTES):
+    """
+    提取 zip 内文档的前 len_doc 个字符；没有可提取内容时返回成员名列表
+    """
+    with zipfile.ZipFile(source) as z:
+        content = join_until(_iter_zip_member_texts(z, len_doc, max_member_bytes), len_doc)
+        if content:
+            return content
+        return " ".join(zip_member_name(info) for info in z.infolist())[:len_doc]
+
+
+def extract_text_from_rar_stream(source, len_doc, max_member_bytes=MAX_MEMBER_BYTES):
+    """
+    提取 rar 内文档的前 len_doc 个字符；没有可提取内容时返回成员名列表
+    需要 rarfile 及系统中的 unrar 工具
+    """
+    if rarfile is None:
+        raise ImportError("未安装 rarfile，无法读取 rar 文件")
+    with rarfile.RarFile(source) as r:
+        content = join_until(_iter_rar_member_texts(r, len_doc, max_member_bytes), len_doc)
+        if content:
+            return content
+        return " ".join(r.namelist())[:len_doc]
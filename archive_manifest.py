@@ -0,0 +1,62 @@
+import os
+import json
+
+# ----- 归档清单：P04 每次移动文件后追加记录，P02 增量训练按游标读取尚未处理的记录 ----- #
+# 清单为只追加的 JSONL，每行 {"path", "label", "year", "moved_at"}，label 为文件所在的分类文件夹名
+# 游标文件（清单路径 + '.cursor'）记录已被增量训练消费到的字节偏移
+
+MANIFEST_PATH = os.path.join('file_embed_pkl_history', 'archive_manifest.jsonl')
+
+
+def append_manifest(records, manifest_path=MANIFEST_PATH):
+    if not records:
+        return
+    folder = os.path.dirname(manifest_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(manifest_path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_cursor(manifest_path=MANIFEST_PATH):
+    try:
+        with open(manifest_path + '.cursor', 'r', encoding='utf-8') as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def read_new_records(manifest_path=MANIFEST_PATH):
+    """
+    返回 (游标之后的完整记录列表, 读到的结束偏移)；末尾未写完的半行不计入
+    """
+    start = read_cursor(manifest_path)
+    if not os.path.exists(manifest_path):
+        return [], start
+    records = []
+    end = start
+    with open(manifest_path, 'rb') as f:
+        f.seek(start)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            end += len(line)
+            line = line.strip()
+            if line:
+                records.append(json.loads(line.decode('utf-8')))
+    return records, end
+
+
+def commit_cursor(offset, manifest_path=MANIFEST_PATH):
+    """
+    原子地更新游标：模型新版本保存成功后再调用，失败时下次会重新处理同一批记录
+    """
+    tmp = manifest_path + '.cursor.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(str(offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, manifest_path + '.cursor')
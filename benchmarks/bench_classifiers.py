@@ -0,0 +1,47 @@
+import os
+import sys
+import csv
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from P02_training import load_training_data, encode_texts, MODEL_ID, TARGET_CATEGORIES
+from embedding_store import EmbeddingStore, EMBED_STORE_DIR
+from classifier_backends import BACKENDS, benchmark_backends
+
+# ----- 在同一份缓存嵌入上对比各分类器后端：训练耗时、预测延迟、模型大小、微平均 F1 ----- #
+# 需要在仓库根目录运行（数据集和向量库路径都是相对路径）
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多标签分类器后端基准测试")
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument('--dedup', default='weight', choices=['none', 'collapse', 'weight'])
+    parser.add_argument('--limit', type=int, default=0, help="只取前 N 条样本（0 为全部）")
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--csv', default='classifier_benchmark.csv')
+    args = parser.parse_args()
+
+    texts, Y, sample_weight = load_training_data(dedup=None if args.dedup == 'none' else args.dedup)
+    store = EmbeddingStore(EMBED_STORE_DIR, MODEL_ID)
+    X = encode_texts(texts, store=store)
+    store.close()
+    Y = np.asarray(Y)
+    if args.limit:
+        X, Y = X[:args.limit], Y[:args.limit]
+        sample_weight = None if sample_weight is None else sample_weight[:args.limit]
+
+    print(f"样本 {len(X)} 条，向量维度 {X.shape[1]}，标签 {Y.shape[1]} 个")
+    rows = benchmark_backends(X, Y, names=args.backends, sample_weight=sample_weight, test_size=args.test_size,
+                              label_names=TARGET_CATEGORIES)
+
+    with open(args.csv, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"结果已写入 {args.csv}")
+
+
+if __name__ == '__main__':
+    main()
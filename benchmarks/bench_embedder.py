@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedder import (MODEL_ID, ONNX_DIR, MAX_TOKENS, TorchEmbedder, OnnxEmbedder, onnx_model_dir,
+                      export_onnx, ort)
+from benchmarks.synthetic_corpus import make_text, category_keywords
+
+# ----- 嵌入后端基准：定长批 vs 按长度分桶，torch vs ONNX float32 / int8 ----- #
+# - 文本长度分布接近 P02/P03 的实际输入：约一半只有文件名，其余为不同长度的正文片段
+# - 第一行为参照（装了 sentence_transformers 时为 SentenceTransformer.encode(batch_size=32)），
+#   其余各行与参照逐行比较余弦相似度，最小值接近 1 说明输出顺序与数值都一致
+# - --model 可以是本地的小模型目录（如 paraphrase-MiniLM-L3-v2），首次运行时导出 ONNX 到 --onnx-dir
+
+
+def synthetic_texts(n, seed=0):
+    rng = np.random.default_rng(seed)
+    keywords = category_keywords('学科建设_学位点评估') + category_keywords('人事工作_人才招聘')
+    texts = []
+    for i in range(n):
+        if rng.random() < 0.5:
+            texts.append(f"{keywords[rng.integers(len(keywords))]}_{i:05d}.docx")
+        else:
+            texts.append(make_text(rng, keywords, '2025', int(rng.integers(5, 200))))
+    return texts
+
+
+def fixed_batches(embedder, texts, batch_size=32):
+    # ONNX 后端不排序、定长批，单独衡量分桶带来的收益
+    encodings = embedder.tokenizer.encode_batch(texts)
+    return np.vstack([embedder._encode_batch(encodings[i:i + batch_size])
+                      for i in range(0, len(encodings), batch_size)])
+
+
+def timed(func, repeat):
+    func()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - t0) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="嵌入后端吞吐基准")
+    parser.add_argument('--model', default=MODEL_ID, help="模型名或本地模型目录")
+    parser.add_argument('--onnx-dir', default=ONNX_DIR)
+    parser.add_argument('--texts', type=int, default=2000)
+    parser.add_argument('--max-tokens', type=int, default=MAX_TOKENS)
+    parser.add_argument('--threads', type=int, default=None, help="ONNX Runtime 线程数")
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.texts)
+    runs = []
+    try:
+        torch_embedder = TorchEmbedder(args.model, max_tokens=args.max_tokens)
+        runs.append(('torch 定长批32', lambda: torch_embedder.model.encode(
+            texts, batch_size=32, show_progress_bar=False, convert_to_numpy=True)))
+        runs.append(('torch 分桶', lambda: torch_embedder.encode(texts)))
+    except ImportError as e:
+        print(f"跳过 torch 后端：{e}")
+
+    if ort is not None:
+        model_dir = onnx_model_dir(args.model, args.onnx_dir)
+        if not os.path.exists(os.path.join(model_dir, 'model_int8.onnx')):
+            export_onnx(args.model, args.onnx_dir, quantize=True)
+        fp32 = OnnxEmbedder(model_dir, max_tokens=args.max_tokens, threads=args.threads)
+        int8 = OnnxEmbedder(model_dir, quantize=True, max_tokens=args.max_tokens, threads=args.threads)
+        runs.append(('onnx 定长批32', lambda: fixed_batches(fp32, texts)))
+        runs.append(('onnx 分桶', lambda: fp32.encode(texts)))
+        runs.append(('onnx int8 分桶', lambda: int8.encode(texts)))
+    else:
+        print("跳过 ONNX 后端：未安装 onnxruntime")
+    if not runs:
+        return
+
+    print(f"{len(texts)} 条文本，模型 {args.model}")
+    print(f"{'后端':<16} {'条/秒':>9} {'加速比':>7} {'最小余弦':>9}")
+    ref = base_s = None
+    for name, func in runs:
+        vecs, seconds = timed(func, args.repeat)
+        vecs = np.asarray(vecs, dtype=np.float32)
+        vecs /= np.clip(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12, None)
+        if ref is None:
+            ref, base_s = vecs, seconds
+        cos = float((vecs * ref).sum(axis=1).min())
+        print(f"{name:<16} {len(texts) / seconds:>9.1f} {base_s / seconds:>7.2f} {cos:>9.4f}")
+
+
+if __name__ == '__main__':
+    main()
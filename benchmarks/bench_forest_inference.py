@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import pickle
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classifier_backends import make_classifier, predict_label_proba
+from model_bundle import ModelBundle
+from forest_engine import ForestEngine, numba
+
+# ----- 对比 sklearn 逐标签 predict_proba 与批量森林推理引擎的延迟，并检查两者结果一致 ----- #
+# “引擎”列为 ModelBundle.predict_proba（装了 numba 时为编译核），“NumPy”列为强制使用纯 NumPy 遍历的引擎
+# 默认读取仓库根目录的 rf_model.pkl / label_binarizer.pkl；--synthetic 时用随机数据训练一个同规模的模型
+
+
+def synthetic_model(backend, n_samples, n_features, n_labels, n_trees):
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((n_samples, n_features)).astype(np.float32)
+    W = rng.standard_normal((n_features, n_labels))
+    Y = (X @ W + rng.standard_normal((n_samples, n_labels)) > 1.0).astype(int)
+    model = make_classifier(backend)
+    if hasattr(model, 'n_estimators'):
+        model.set_params(n_estimators=n_trees)
+    elif hasattr(model, 'estimator') and hasattr(model.estimator, 'n_estimators'):
+        model.set_params(estimator__n_estimators=n_trees)
+    model.fit(X, Y)
+    return model, [f'标签{j}' for j in range(n_labels)], n_features
+
+
+def timed(func, repeat):
+    func()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - t0) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量森林推理基准测试")
+    parser.add_argument('--synthetic', action='store_true', help="用随机数据训练模型，而不是读取 rf_model.pkl")
+    parser.add_argument('--backend', default='multioutput_rf', help="--synthetic 时使用的后端")
+    parser.add_argument('--trees', type=int, default=200)
+    parser.add_argument('--labels', type=int, default=21)
+    parser.add_argument('--batch', nargs='+', type=int, default=[1, 32, 256, 1024], help="每次预测的样本数")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        model, classes, n_features = synthetic_model(args.backend, 2000, 384, args.labels, args.trees)
+    else:
+        with open('rf_model.pkl', 'rb') as f:
+            model = pickle.load(f)
+        with open('label_binarizer.pkl', 'rb') as f:
+            classes = pickle.load(f).classes_.tolist()
+        n_features = model.n_features_in_
+
+    bundle = ModelBundle.from_model(model, classes)
+    forest_names = [name for name, g in bundle.meta['groups'].items() if g['kind'] == 'forest']
+    numpy_engine = ForestEngine({name: bundle.group(name) for name in forest_names}, use_compiled=False)
+    print(f"森林组 {len(forest_names)} 个，共 {numpy_engine.n_trees} 棵树；numba {'可用' if numba else '未安装'}")
+
+    rng = np.random.default_rng(1)
+    print(f"{'样本数':>6} {'sklearn(ms)':>12} {'引擎(ms)':>10} {'NumPy(ms)':>10} {'加速比':>7} {'最大差异':>10}")
+    for n in args.batch:
+        X = rng.standard_normal((n, n_features)).astype(np.float32)
+        ref, t_ref = timed(lambda: predict_label_proba(model, X), args.repeat)
+        got, t_new = timed(lambda: bundle.predict_proba(X), args.repeat)
+        _, t_np = timed(lambda: numpy_engine.predict_proba(X), args.repeat)
+        diff = float(np.abs(ref - got).max())
+        print(f"{n:>6} {t_ref * 1e3:>12.1f} {t_new * 1e3:>10.1f} {t_np * 1e3:>10.1f} "
+              f"{t_ref / t_new:>7.2f} {diff:>10.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score, f1_score
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from P02_training import load_training_data, encode_texts, MODEL_ID, TARGET_CATEGORIES
+from embedding_store import EmbeddingStore, EMBED_STORE_DIR
+from classifier_backends import make_classifier, predict_label_proba, derive_label_groups
+
+# ----- 两级（组 -> 标签）模型与扁平 21 个森林的对比：精度、训练/预测耗时、每个文件评估的森林数 ----- #
+# 需要在仓库根目录运行（数据集和向量库路径都是相对路径）
+
+
+def compare_flat_hierarchical(X, Y, label_names, sample_weight=None, gates=(0.1, 0.25, 0.5),
+                              test_size=0.2, random_state=42):
+    tr, te = train_test_split(np.arange(len(X)), test_size=test_size, random_state=random_state)
+    fit_params = {} if sample_weight is None else {'sample_weight': sample_weight[tr]}
+
+    def evaluate(name, P, fit_s, predict_s, forests):
+        pred = (P >= 0.5).astype(int)
+        print(f"  {name:<18} 微平均F1 {f1_score(Y[te], pred, average='micro', zero_division=0):.4f}  "
+              f"准确率 {accuracy_score(Y[te], pred):.4f}  训练 {fit_s:>7.2f}s  "
+              f"预测 {predict_s / max(len(te), 1) * 1e6:>8.1f}ms/千条  每文件评估森林 {forests:>5.2f} 个")
+
+    flat = make_classifier('multioutput_rf', random_state=random_state)
+    t0 = time.perf_counter()
+    flat.fit(X[tr], Y[tr], **fit_params)
+    fit_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    P = predict_label_proba(flat, X[te])
+    evaluate('扁平 multioutput_rf', P, fit_s, time.perf_counter() - t0, Y.shape[1])
+
+    hier = make_classifier('hier_rf', random_state=random_state, label_names=label_names)
+    t0 = time.perf_counter()
+    hier.fit(X[tr], Y[tr], **fit_params)
+    fit_s = time.perf_counter() - t0
+    for gate in gates:
+        hier.gate = gate
+        t0 = time.perf_counter()
+        P, cost = hier.predict_proba_with_cost(X[te])
+        evaluate(f'两级 gate={gate}', P, fit_s, time.perf_counter() - t0, float(cost.mean()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="两级分类器与扁平分类器对比")
+    parser.add_argument('--dedup', default='weight', choices=['none', 'collapse', 'weight'])
+    parser.add_argument('--limit', type=int, default=0, help="只取前 N 条样本（0 为全部）")
+    parser.add_argument('--gates', nargs='+', type=float, default=[0.1, 0.25, 0.5])
+    args = parser.parse_args()
+
+    texts, Y, sample_weight = load_training_data(dedup=None if args.dedup == 'none' else args.dedup)
+    store = EmbeddingStore(EMBED_STORE_DIR, MODEL_ID)
+    X = encode_texts(texts, store=store)
+    store.close()
+    Y = np.asarray(Y)
+    if args.limit:
+        X, Y = X[:args.limit], Y[:args.limit]
+        sample_weight = None if sample_weight is None else sample_weight[:args.limit]
+
+    groups = derive_label_groups(TARGET_CATEGORIES)
+    print(f"样本 {len(X)} 条，标签 {Y.shape[1]} 个，按前缀分为 {len(groups)} 组：")
+    for name, members in groups:
+        print(f"  {name}: {len(members)} 个标签")
+    compare_flat_hierarchical(X, Y, TARGET_CATEGORIES, sample_weight, gates=args.gates)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+from pptx import Presentation
+from ooxml_stream import extract_text_from_docx_stream, extract_text_from_pptx_stream
+
+# ----- 对比 docx/pptx 对象模型解析与流式解析的耗时和峰值内存 ----- #
+
+def object_model_docx(fp, L):
+    doc = Document(fp)
+    return "\n".join(p.text for p in doc.paragraphs)[:L]
+
+
+def object_model_pptx(fp, L):
+    prs = Presentation(fp)
+    txt = []
+    for s in prs.slides:
+        for sh in s.shapes:
+            if hasattr(sh, 'text'):
+                txt.append(sh.text)
+    return "\n".join(txt)[:L]
+
+
+EXTRACTORS = {
+    '.docx': (object_model_docx, extract_text_from_docx_stream),
+    '.pptx': (object_model_pptx, extract_text_from_pptx_stream),
+}
+
+
+def measure(func, fp, L, repeat):
+    """
+    返回 (结果, 平均耗时秒, 峰值内存字节)
+    """
+    tracemalloc.start()
+    result = func(fp, L)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        func(fp, L)
+    return result, (time.perf_counter() - t0) / repeat, peak
+
+
+def collect_files(roots):
+    for root in roots:
+        if os.path.isfile(root):
+            yield root
+            continue
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                if os.path.splitext(name)[1].lower() in EXTRACTORS:
+                    yield os.path.join(dirpath, name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="docx/pptx 提取方式基准测试")
+    parser.add_argument('paths', nargs='+', help="docx/pptx 文件或包含它们的目录")
+    parser.add_argument('--len-doc', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    totals = {}
+    print(f"{'文件':<50} {'对象模型(ms)':>12} {'流式(ms)':>10} {'对象模型峰值(KB)':>16} {'流式峰值(KB)':>12} 一致")
+    for fp in collect_files(args.paths):
+        ext = os.path.splitext(fp)[1].lower()
+        old_func, new_func = EXTRACTORS[ext]
+        try:
+            old_text, old_t, old_peak = measure(old_func, fp, args.len_doc, args.repeat)
+            new_text, new_t, new_peak = measure(new_func, fp, args.len_doc, args.repeat)
+        except Exception as e:
+            print(f"跳过 {fp}: {e}")
+            continue
+        agg = totals.setdefault(ext, [0, 0.0, 0.0, 0, 0])
+        agg[0] += 1
+        agg[1] += old_t
+        agg[2] += new_t
+        agg[3] = max(agg[3], old_peak)
+        agg[4] = max(agg[4], new_peak)
+        print(f"{os.path.basename(fp)[:50]:<50} {old_t * 1000:>12.2f} {new_t * 1000:>10.2f} "
+              f"{old_peak / 1024:>16.0f} {new_peak / 1024:>12.0f} {old_text == new_text}")
+
+    for ext, (n, old_t, new_t, old_peak, new_peak) in totals.items():
+        speedup = old_t / new_t if new_t else float('inf')
+        print(f"[{ext}] {n} 个文件：对象模型共 {old_t:.3f}s，流式共 {new_t:.3f}s，加速 {speedup:.1f}x；"
+              f"峰值内存 {old_peak / 1024:.0f}KB -> {new_peak / 1024:.0f}KB")
+
+
+if __name__ == '__main__':
+    main()
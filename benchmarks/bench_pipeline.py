@@ -0,0 +1,265 @@
+import os
+import sys
+import json
+import time
+import zlib
+import shutil
+import platform
+import argparse
+import tempfile
+import threading
+import contextlib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_corpus import generate_corpus, generate_inbox
+
+try:
+    import psutil  # 可选：按间隔采样本进程及子进程的 RSS，得到每个阶段自己的峰值
+except ImportError:
+    psutil = None
+
+try:
+    import resource  # Windows 下没有；没有 psutil 时退回进程生命周期内的最大 RSS
+except ImportError:
+    resource = None
+
+# ----- 端到端流水线基准：合成语料 -> P01 采集 -> P02 训练 -> P03 分类 -> P04 归档 ----- #
+# - 所有产物（缓存、数据集、模型、向量库、归档目录）都写在工作目录中，运行时切换到该目录，
+#   P02/P03 中的相对路径（rf_model.pkl、rf_model_bundle 等）不会碰到仓库里的真实文件
+# - 默认用哈希嵌入器代替 SBERT（--embedder stub），只测流水线本身；--embedder model 使用真实模型
+# - 每个阶段记录耗时、文件数、文件/秒、峰值 RSS，写出 JSON 基线；--compare 与旧基线对比，
+#   吞吐下降或内存上升超过 --tolerance 时以退出码 1 结束，便于做回归检查
+
+
+class HashingEmbedder:
+    """
+    字符一元/二元组哈希到 dim 维再 L2 归一化；接口与 SentenceTransformer.encode 相同
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            grams = list(text) + [text[i:i + 2] for i in range(len(text) - 1)]
+            if not grams:
+                continue
+            idx = [zlib.crc32(g.encode('utf-8')) % self.dim for g in grams]
+            v = np.bincount(idx, minlength=self.dim).astype(np.float32)
+            out[row] = v / np.linalg.norm(v)
+        return out
+
+
+class PeakRSS:
+    """
+    with PeakRSS() as peak: ... ；结束后 peak.mb 为该区间内的峰值 RSS（MB，含子进程）
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.mb = None
+        self._stop = threading.Event()
+
+    def _sample(self):
+        proc = psutil.Process()
+        peak = 0
+        while True:
+            try:
+                rss = proc.memory_info().rss + sum(c.memory_info().rss for c in proc.children(recursive=True))
+            except psutil.Error:
+                rss = 0
+            peak = max(peak, rss)
+            if self._stop.wait(self.interval):
+                break
+        self.mb = peak / 1024 / 1024
+
+    def __enter__(self):
+        if psutil is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if psutil is not None:
+            self._stop.set()
+            self._thread.join()
+        elif resource is not None:
+            # ru_maxrss：Linux 为 KB，macOS 为字节
+            scale = 1 if sys.platform == 'darwin' else 1024
+            self.mb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                          resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * scale / 1024 / 1024
+        return False
+
+
+def run_stage(results, name, n_files, func, verbose=False):
+    """
+    运行一个阶段并记录 {'seconds', 'files', 'files_per_sec', 'peak_rss_mb'}；阶段出错时记录 error 并返回 False
+    """
+    print(f"[{name}] 开始（{n_files} 个文件）")
+    t0 = time.perf_counter()
+    error = None
+    with PeakRSS() as peak, open(os.devnull, 'w', encoding='utf-8') as devnull:
+        try:
+            with contextlib.redirect_stdout(sys.stdout if verbose else devnull):
+                func()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+    seconds = time.perf_counter() - t0
+    results[name] = {
+        'seconds': round(seconds, 3),
+        'files': n_files,
+        'files_per_sec': round(n_files / seconds, 1) if seconds > 0 else None,
+        'peak_rss_mb': None if peak.mb is None else round(peak.mb, 1),
+    }
+    if error:
+        results[name]['error'] = error
+        print(f"[{name}] 失败：{error}")
+        return False
+    print(f"[{name}] {seconds:.2f}s，{results[name]['files_per_sec']} 个文件/秒，"
+          f"峰值 RSS {results[name]['peak_rss_mb']} MB")
+    return True
+
+
+def compare_baseline(current, baseline, tolerance):
+    """
+    打印与旧基线的对比，返回回归的阶段名列表（吞吐下降或峰值内存上升超过 tolerance）
+    """
+    regressions = []
+    if baseline.get('config') != current['config']:
+        print(f"注意：基线配置不同，对比仅供参考\n  旧：{baseline.get('config')}\n  新：{current['config']}")
+    print(f"{'阶段':<10} {'旧(文件/秒)':>12} {'新(文件/秒)':>12} {'变化':>8} {'旧RSS':>8} {'新RSS':>8}")
+    for name, new in current['stages'].items():
+        old = baseline.get('stages', {}).get(name)
+        if not old or not old.get('files_per_sec') or not new.get('files_per_sec'):
+            continue
+        ratio = new['files_per_sec'] / old['files_per_sec']
+        rss_up = (old.get('peak_rss_mb') and new.get('peak_rss_mb')
+                  and new['peak_rss_mb'] > old['peak_rss_mb'] * (1 + tolerance))
+        flag = ratio < 1 - tolerance or rss_up
+        if flag:
+            regressions.append(name)
+        print(f"{name:<10} {old['files_per_sec']:>12} {new['files_per_sec']:>12} {ratio - 1:>+8.1%} "
+              f"{old.get('peak_rss_mb')!s:>8} {new.get('peak_rss_mb')!s:>8}{'  <- 回归' if flag else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="P01-P04 端到端流水线基准")
+    parser.add_argument('--files', type=int, default=5000, help="合成归档文件数")
+    parser.add_argument('--inbox', type=int, default=500, help="P03 待分类文件数")
+    parser.add_argument('--years', nargs='+', default=['2023', '2024', '2025'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--corpus', help="使用已生成的语料目录（synthetic_corpus.py 生成），不再重新生成")
+    parser.add_argument('--workdir', help="工作目录，默认为临时目录（结束后删除）")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="P01 并行提取进程数")
+    parser.add_argument('--embedder', default='stub', choices=['stub', 'model'])
+    parser.add_argument('--backend', default='multioutput_rf')
+    parser.add_argument('--trees', type=int, default=50, help="随机森林后端的树数")
+    parser.add_argument('--out', default='pipeline_baseline.json')
+    parser.add_argument('--compare', help="与该 JSON 基线对比")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--verbose', action='store_true', help="显示各阶段自身的输出")
+    args = parser.parse_args()
+
+    out_path = os.path.abspath(args.out)
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+    corpus = os.path.abspath(args.corpus) if args.corpus else None
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix='bench_pipeline_')
+    os.makedirs(workdir, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+
+    import P01_collect_name as P01
+    import P02_training as P02
+    import P03_testing as P03
+    import P04_moving as P04
+    from embedding_store import EmbeddingStore
+    from classifier_backends import make_classifier
+    from model_versions import save_model_version, atomic_pickle
+
+    if args.embedder == 'stub':
+        P02._embedder = P03._embedder = HashingEmbedder()
+    model_id = 'stub-hashing-384' if args.embedder == 'stub' else P02.MODEL_ID
+
+    sub_path = 'M02广医事务性工作'
+    save_folder = os.path.join(workdir, 'file_embed_pkl_history')
+    dataset_dir = os.path.join(save_folder, 'dataset')
+    store_dir = os.path.join(save_folder, 'embeddings')
+    inbox = os.path.join(workdir, 'inbox')
+    done_dir = os.path.join(workdir, 'DoneFileArchived')
+    archive_root = os.path.join(workdir, 'archive')
+    stages = {}
+    n_files = args.files
+
+    try:
+        if corpus is None:
+            corpus = os.path.join(workdir, 'corpus')
+            run_stage(stages, 'generate', args.files, lambda: generate_corpus(
+                corpus, args.files, P02.TARGET_CATEGORIES, tuple(args.years), sub_path, seed=args.seed,
+                progress_every=0), args.verbose)
+        else:
+            n_files = sum(len(files) for _, _, files in os.walk(corpus))
+        dirs = {y: [os.path.join(corpus, f'Store{y}', sub_path)] for y in args.years
+                if os.path.isdir(os.path.join(corpus, f'Store{y}', sub_path))}
+        generate_inbox(inbox, args.inbox, P02.TARGET_CATEGORIES, seed=args.seed + 1)
+
+        def collect():
+            P01.collect_data_and_features_by_year(dirs, P02.LEN_DOC, save_folder,
+                                                  n_workers=args.workers, profile=False)
+            P01.build_year_partitions(list(dirs), P02.TARGET_CATEGORIES, save_folder, dataset_dir)
+
+        def train():
+            texts, Y, sample_weight = P02.load_training_data(dataset_dir=dataset_dir, dedup='weight')
+            store = EmbeddingStore(store_dir, model_id)
+            X = P02.encode_texts(texts, store=store)
+            store.close()
+            params = {'n_estimators': args.trees} if args.backend.endswith('_rf') else None
+            model = make_classifier(args.backend, params=params, label_names=P02.TARGET_CATEGORIES)
+            model.fit(X, Y, **({} if sample_weight is None else {'sample_weight': sample_weight}))
+            version = save_model_version(model, {'mode': 'benchmark', 'backend': args.backend})
+            atomic_pickle(P02.make_label_binarizer(), 'label_binarizer.pkl')
+            P02.export_model_bundle(model, version)
+
+        def classify():
+            P03.classify_files(inbox, done_dir, L=50, embed_store_dir=store_dir, use_service=False)
+
+        def move():
+            P04.move_files(done_dir, archive_root, args.years[-1], sub_path,
+                           manifest_path=os.path.join(save_folder, 'archive_manifest.jsonl'))
+
+        for name, count, func in (('collect', n_files, collect), ('train', n_files, train),
+                                  ('classify', args.inbox, classify), ('move', args.inbox, move)):
+            if not run_stage(stages, name, count, func, args.verbose):
+                break
+    finally:
+        os.chdir(cwd)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'config': {k: getattr(args, k) for k in ('files', 'inbox', 'years', 'seed', 'workers',
+                                                 'embedder', 'backend', 'trees')},
+        'platform': {'python': platform.python_version(), 'system': platform.platform(),
+                     'cpu_count': os.cpu_count(), 'numpy': np.__version__},
+        'stages': stages,
+        'total_seconds': round(sum(s['seconds'] for s in stages.values()), 3),
+    }
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"基线已写入 {out_path}")
+
+    if compare_path:
+        with open(compare_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_baseline(result, baseline, args.tolerance)
+        if regressions:
+            print(f"以下阶段相对 {compare_path} 出现回归：{regressions}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import os
+import sys
+import csv
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from P02_training import load_training_data, encode_texts, MODEL_ID
+from embedding_store import EmbeddingStore, EMBED_STORE_DIR
+from classifier_backends import BACKENDS
+from feature_reducer import benchmark_reducers
+
+# ----- 降维/量化报告：训练加速比、特征内存节省、微平均 F1 变化（相对 384 维 float32 原始向量） ----- #
+# 需要在仓库根目录运行（数据集和向量库路径都是相对路径）
+
+DEFAULT_CONFIGS = [
+    None,
+    {'method': 'pca', 'n_components': 128, 'quantize': 'int8'},
+    {'method': 'pca', 'n_components': 64, 'quantize': 'int8'},
+    {'method': 'pca', 'n_components': 128, 'quantize': 'float16'},
+    {'method': 'random', 'n_components': 128, 'quantize': 'int8'},
+    {'method': None, 'n_components': None, 'quantize': 'int8'},
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="嵌入降维与量化基准测试")
+    parser.add_argument('--backend', default='multioutput_rf', choices=BACKENDS)
+    parser.add_argument('--dedup', default='weight', choices=['none', 'collapse', 'weight'])
+    parser.add_argument('--limit', type=int, default=0, help="只取前 N 条样本（0 为全部）")
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--csv', default='reducer_benchmark.csv')
+    args = parser.parse_args()
+
+    texts, Y, sample_weight = load_training_data(dedup=None if args.dedup == 'none' else args.dedup)
+    store = EmbeddingStore(EMBED_STORE_DIR, MODEL_ID)
+    X = encode_texts(texts, store=store)
+    store.close()
+    Y = np.asarray(Y)
+    if args.limit:
+        X, Y = X[:args.limit], Y[:args.limit]
+        sample_weight = None if sample_weight is None else sample_weight[:args.limit]
+
+    print(f"样本 {len(X)} 条，向量维度 {X.shape[1]}，标签 {Y.shape[1]} 个，后端 {args.backend}")
+    rows = benchmark_reducers(X, Y, DEFAULT_CONFIGS, backend=args.backend,
+                              sample_weight=sample_weight, test_size=args.test_size)
+    for row in rows:
+        print(f"  {row['reducer']:<22} 训练加速 {row['speedup']:>5.2f}x  内存节省 {row['memory_saved']:>6.1%}  "
+              f"F1 变化 {row['f1_change']:+.4f}")
+
+    with open(args.csv, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"结果已写入 {args.csv}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from sheet_stream import extract_text_from_sheet_stream
+
+# ----- 对比 pandas 整表读取与只读流式读取 xls/xlsx 的耗时和峰值内存 ----- #
+
+SHEET_EXTS = {'.xls', '.xlsx'}
+
+
+def pandas_excel(fp, L):
+    sheets = pd.read_excel(fp, sheet_name=None)
+    return "\n".join(df.to_string() for df in sheets.values())[:L]
+
+
+def measure(func, fp, L, repeat):
+    """
+    返回 (平均耗时秒, 峰值内存字节)
+    """
+    tracemalloc.start()
+    func(fp, L)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        func(fp, L)
+    return (time.perf_counter() - t0) / repeat, peak
+
+
+def generate_xlsx(fp, n_rows, n_cols=12):
+    """
+    生成一个 n_rows 行的财务风格测试表（openpyxl write_only 模式，不占用大量内存）
+    """
+    import openpyxl
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet('明细')
+    ws.append([f'列{j}' for j in range(n_cols)])
+    for i in range(n_rows):
+        ws.append([f'项目{i}', i * 1.5, '经费报销'] + [i + j for j in range(n_cols - 3)])
+    wb.save(fp)
+
+
+def collect_files(roots):
+    for root in roots:
+        if os.path.isfile(root):
+            yield root
+            continue
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                if os.path.splitext(name)[1].lower() in SHEET_EXTS:
+                    yield os.path.join(dirpath, name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="xls/xlsx 提取方式基准测试")
+    parser.add_argument('paths', nargs='*', help="xls/xlsx 文件或包含它们的目录")
+    parser.add_argument('--generate', type=int, default=0, help="生成一个指定行数的测试 xlsx 并加入测试")
+    parser.add_argument('--len-doc', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    paths = list(args.paths)
+    if args.generate:
+        fp = os.path.abspath(f'bench_sheet_{args.generate}.xlsx')
+        if not os.path.exists(fp):
+            generate_xlsx(fp, args.generate)
+        paths.append(fp)
+
+    old_total = new_total = 0.0
+    print(f"{'文件':<40} {'大小(KB)':>10} {'pandas(ms)':>12} {'流式(ms)':>10} {'pandas峰值(KB)':>14} {'流式峰值(KB)':>12}")
+    for fp in collect_files(paths):
+        try:
+            old_t, old_peak = measure(pandas_excel, fp, args.len_doc, args.repeat)
+            new_t, new_peak = measure(extract_text_from_sheet_stream, fp, args.len_doc, args.repeat)
+        except Exception as e:
+            print(f"跳过 {fp}: {e}")
+            continue
+        old_total += old_t
+        new_total += new_t
+        print(f"{os.path.basename(fp)[:40]:<40} {os.path.getsize(fp) / 1024:>10.0f} {old_t * 1000:>12.2f} "
+              f"{new_t * 1000:>10.2f} {old_peak / 1024:>14.0f} {new_peak / 1024:>12.0f}")
+
+    if new_total:
+        print(f"合计：pandas {old_total:.3f}s，流式 {new_total:.3f}s，加速 {old_total / new_total:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+import os
+import io
+import sys
+import time
+import zipfile
+import argparse
+import numpy as np
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# ----- 可复现的合成归档语料：Store{year}/<子路径>/<类别>/[子文件夹]/文件 ----- #
+# - 文件类型：txt / docx / pptx / xlsx / zip（内含 txt + docx），OOXML 只写最小必需部件（用 zipfile 直接生成）
+# - 文本：按类别名拆出的中文关键词 + 通用中文/英文填充词，同一类别的文件共享关键词，分类器有信号可学
+# - 第 i 个文件的内容只由 (seed, i) 决定：重复生成得到完全相同的语料，中断后可以续写（已存在的文件跳过）
+# - 不在内存中保存文件清单，百万级文件也只占常数内存
+# - generate_inbox 生成 P03 的待分类目录（扁平、无类别文件夹）
+
+DEFAULT_MIX = {'.txt': 0.3, '.docx': 0.3, '.pptx': 0.15, '.xlsx': 0.15, '.zip': 0.1}
+OTHER_FOLDER = '其他杂项'
+
+_FILLER_ZH = ['通知', '关于', '工作', '安排', '会议', '材料', '提交', '学院', '学校', '年度', '申报', '审核',
+              '附件', '要求', '各单位', '落实', '情况', '报告', '办法', '实施', '推进', '组织', '开展', '总结']
+_FILLER_EN = ['report', 'meeting', 'notice', 'project', 'review', 'schedule', 'budget', 'policy',
+              'annual', 'summary', 'application', 'deadline', 'committee', 'university', 'department']
+_SUBFOLDERS = ['', '', '', '会议材料', '2024-03', '往来文件', '附件/扫描件']
+
+_CONTENT_TYPES = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                  '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                  '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                  '<Default Extension="xml" ContentType="application/xml"/>'
+                  '<Override PartName="/{part}" ContentType="{ctype}"/></Types>')
+_ROOT_RELS = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+              '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+              '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+              'relationships/officeDocument" Target="{part}"/></Relationships>')
+
+
+def category_keywords(category):
+    """
+    从类别名拆出关键词：按 "_" 分段，每段再切成两字词
+    """
+    words = []
+    for part in category.split('_'):
+        words.append(part)
+        words.extend(part[i:i + 2] for i in range(0, len(part) - 1, 2))
+    return words
+
+
+def make_text(rng, keywords, year, n_words):
+    words = []
+    for _ in range(n_words):
+        r = rng.random()
+        if r < 0.35:
+            words.append(keywords[rng.integers(len(keywords))])
+        elif r < 0.8:
+            words.append(_FILLER_ZH[rng.integers(len(_FILLER_ZH))])
+        else:
+            words.append(_FILLER_EN[rng.integers(len(_FILLER_EN))])
+    title = f"关于{keywords[0]}的通知（{year}年）"
+    return title + "\n" + " ".join(words)
+
+
+def _zip_bytes(parts):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as z:
+        for name, data in parts.items():
+            z.writestr(name, data)
+    return buf.getvalue()
+
+
+def docx_bytes(text):
+    paras = "".join(f'<w:p><w:r><w:t xml:space="preserve">{escape(line)}</w:t></w:r></w:p>'
+                    for line in text.split("\n"))
+    document = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                f'<w:body>{paras}</w:body></w:document>')
+    return _zip_bytes({
+        '[Content_Types].xml': _CONTENT_TYPES.format(
+            part='word/document.xml',
+            ctype='application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml'),
+        '_rels/.rels': _ROOT_RELS.format(part='word/document.xml'),
+        'word/document.xml': document,
+    })
+
+
+def pptx_bytes(text):
+    # 没有 presentation.xml 时 ooxml_stream 按 slideN.xml 的编号顺序读取
+    lines = text.split("\n")
+    parts = {
+        '[Content_Types].xml': _CONTENT_TYPES.format(
+            part='ppt/slides/slide1.xml',
+            ctype='application/vnd.openxmlformats-officedocument.presentationml.slide+xml'),
+        '_rels/.rels': _ROOT_RELS.format(part='ppt/slides/slide1.xml'),
+    }
+    for k, line in enumerate(lines, start=1):
+        parts[f'ppt/slides/slide{k}.xml'] = (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<p:sld xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+            'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main">'
+            '<p:cSld><p:spTree><p:sp><p:txBody><a:bodyPr/>'
+            f'<a:p><a:r><a:t>{escape(line)}</a:t></a:r></a:p>'
+            '</p:txBody></p:sp></p:spTree></p:cSld></p:sld>')
+    return _zip_bytes(parts)
+
+
+def xlsx_bytes(text, n_cols=4):
+    # 内联字符串单元格，不需要 sharedStrings.xml；没有 workbook.xml 时 sheet_stream 按编号读取 sheetN.xml
+    words = text.split()
+    rows = []
+    for r in range(0, len(words), n_cols):
+        cells = "".join(f'<c t="inlineStr"><is><t>{escape(w)}</t></is></c>' for w in words[r:r + n_cols])
+        rows.append(f'<row r="{r // n_cols + 1}">{cells}</row>')
+    sheet = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+             '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+             f'<sheetData>{"".join(rows)}</sheetData></worksheet>')
+    return _zip_bytes({
+        '[Content_Types].xml': _CONTENT_TYPES.format(
+            part='xl/worksheets/sheet1.xml',
+            ctype='application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'),
+        '_rels/.rels': _ROOT_RELS.format(part='xl/worksheets/sheet1.xml'),
+        'xl/worksheets/sheet1.xml': sheet,
+    })
+
+
+def zip_bytes(text):
+    head, _, tail = text.partition("\n")
+    return _zip_bytes({'说明.txt': head.encode('utf-8'), '正文.docx': docx_bytes(tail)})
+
+
+_WRITERS = {
+    '.txt': lambda text: text.encode('utf-8'),
+    '.docx': docx_bytes,
+    '.pptx': pptx_bytes,
+    '.xlsx': xlsx_bytes,
+    '.zip': zip_bytes,
+}
+
+
+def file_spec(seed, i, categories, years, mix, other_ratio=0.1, n_words=(20, 120)):
+    """
+    第 i 个文件的 (year, category 或 None, 子文件夹, 扩展名, 文本)，只由 (seed, i) 决定
+    """
+    rng = np.random.default_rng([seed, i])
+    year = years[rng.integers(len(years))]
+    exts = list(mix)
+    ext = exts[rng.choice(len(exts), p=np.asarray([mix[e] for e in exts]) / sum(mix.values()))]
+    category = None if rng.random() < other_ratio else categories[rng.integers(len(categories))]
+    keywords = category_keywords(category) if category else ['事务', '杂项', '其他']
+    sub = _SUBFOLDERS[rng.integers(len(_SUBFOLDERS))]
+    text = make_text(rng, keywords, year, int(rng.integers(*n_words)))
+    return year, category, sub, ext, text
+
+
+def generate_corpus(root, n_files, categories, years=('2023', '2024', '2025'), sub_path='M02广医事务性工作',
+                    seed=0, mix=None, other_ratio=0.1, start=0, progress_every=10000):
+    """
+    在 root 下生成 n_files 个归档文件，返回 {year: [该年份的归档根目录]}（即 P01 的 directories_by_year）
+
+    Args:
+        root (str): 输出目录
+        n_files (int): 文件总数（可到百万级）
+        categories (list): 类别名，对应各类别文件夹
+        sub_path (str): Store{year} 下的子路径，与 P04 的 sub_path 一致
+        seed (int): 随机种子，相同参数生成完全相同的语料
+        mix (dict): 扩展名 -> 比例，默认 DEFAULT_MIX
+        other_ratio (float): 放在非目标类别文件夹中的文件比例
+        start (int): 从第几个文件开始（续写）；已存在的文件直接跳过
+    """
+    mix = mix or DEFAULT_MIX
+    t0 = time.perf_counter()
+    made_dirs = set()
+    for i in range(start, n_files):
+        year, category, sub, ext, text = file_spec(seed, i, categories, years, mix, other_ratio)
+        folder = os.path.join(root, f'Store{year}', sub_path, category or OTHER_FOLDER, *filter(None, sub.split('/')))
+        if folder not in made_dirs:
+            os.makedirs(folder, exist_ok=True)
+            made_dirs.add(folder)
+        path = os.path.join(folder, f'{(category or OTHER_FOLDER).split("_")[-1]}_{i:07d}{ext}')
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(_WRITERS[ext](text))
+        if progress_every and (i + 1) % progress_every == 0:
+            print(f"已生成 {i + 1}/{n_files} 个文件（{(i + 1 - start) / (time.perf_counter() - t0):.0f} 个/秒）")
+    return {year: [os.path.join(root, f'Store{year}', sub_path)] for year in years}
+
+
+def generate_inbox(folder, n_files, categories, seed=1, mix=None):
+    """
+    生成 P03 待分类的扁平目录（文件名不含类别信息），返回文件数
+    """
+    mix = mix or DEFAULT_MIX
+    os.makedirs(folder, exist_ok=True)
+    for i in range(n_files):
+        year, category, _, ext, text = file_spec(seed, i, categories, ('2025',), mix, other_ratio=0.0)
+        with open(os.path.join(folder, f'待分类_{i:07d}{ext}'), 'wb') as f:
+            f.write(_WRITERS[ext](text))
+    return n_files
+
+
+def main():
+    from P02_training import TARGET_CATEGORIES
+
+    parser = argparse.ArgumentParser(description="生成可复现的合成归档语料")
+    parser.add_argument('root', help="输出目录")
+    parser.add_argument('--files', type=int, default=10000)
+    parser.add_argument('--years', nargs='+', default=['2023', '2024', '2025'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--start', type=int, default=0, help="从第几个文件开始（中断后续写）")
+    parser.add_argument('--inbox', type=int, default=0, help="另外生成 N 个待分类文件到 root/inbox")
+    args = parser.parse_args()
+
+    dirs = generate_corpus(args.root, args.files, TARGET_CATEGORIES, tuple(args.years), seed=args.seed,
+                           start=args.start)
+    if args.inbox:
+        generate_inbox(os.path.join(args.root, 'inbox'), args.inbox, TARGET_CATEGORIES)
+    print(f"语料已生成：{dirs}")
+
+
+if __name__ == '__main__':
+    main()
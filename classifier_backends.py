@@ -0,0 +1,351 @@
+import time
+import pickle
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.multioutput import MultiOutputClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import f1_score
+
+# ----- 多标签分类器后端：统一的构造入口、概率输出和速度/精度基准 ----- #
+# - multioutput_rf：原方案，每个标签一棵 200 树的随机森林（共 21 个森林）
+# - native_rf：一个原生多输出随机森林，所有标签共享同一批树
+# - ovr_linear：每个标签一个逻辑回归（一对多），在 SBERT 向量上训练/预测都很快
+# - hist_gb：每个标签一个直方图梯度提升树
+# - sgd_linear：每个标签一个 SGD 逻辑回归，支持 partial_fit，可只用新增样本增量更新
+#   （multioutput_rf 也可以增量更新：add_label_trees 在新样本上为每个标签追加一批树）
+# - hier_rf：按类别名前缀分组的两级随机森林，先判断组，只对可能的组再判断组内标签（需要 label_names）
+
+BACKENDS = ('multioutput_rf', 'native_rf', 'ovr_linear', 'hist_gb', 'sgd_linear', 'hier_rf')
+
+
+def fit_label(estimator, X, y, sample_weight=None):
+    """
+    训练单个标签的二分类器；训练集中只出现一个取值的标签返回该常数（float），不训练模型
+    """
+    if np.unique(y).size < 2:
+        return float(y[0]) if len(y) else 0.0
+    estimator = clone(estimator)
+    if sample_weight is None:
+        estimator.fit(X, y)
+    else:
+        estimator.fit(X, y, sample_weight=sample_weight)
+    return estimator
+
+
+def _positive_proba(est, X):
+    # 单标签分类器（或常数）的正类概率；训练时没有正类的返回全 0
+    if isinstance(est, float):
+        return np.full(len(X), est)
+    if 1 not in est.classes_:
+        return np.zeros(len(X))
+    return est.predict_proba(X)[:, list(est.classes_).index(1)]
+
+
+def derive_label_groups(label_names):
+    """
+    按类别名中第一个 "_" 之前的前缀分组，返回 [(组名, [标签下标, ...]), ...]，组的顺序为首次出现的顺序
+    没有 "_" 的类别自成一组
+    """
+    groups = {}
+    for j, name in enumerate(label_names):
+        groups.setdefault(name.split('_', 1)[0], []).append(j)
+    return list(groups.items())
+
+
+class PerLabelClassifier(ClassifierMixin, BaseEstimator):
+    """
+    每个标签独立训练一个二分类器（并行），只有一个取值的标签按常数处理
+    predict_proba 的返回格式与 MultiOutputClassifier 相同：每个标签一个 (n, 2) 数组；
+    classes_ 同样是每个标签一个 [0, 1]，sklearn 的评分函数按它判断目标类型
+    """
+
+    def __init__(self, estimator, n_jobs=None):
+        self.estimator = estimator
+        self.n_jobs = n_jobs
+
+    def fit(self, X, Y, sample_weight=None):
+        Y = np.asarray(Y)
+        self.estimators_ = Parallel(n_jobs=self.n_jobs)(
+            delayed(fit_label)(self.estimator, X, Y[:, j], sample_weight) for j in range(Y.shape[1])
+        )
+        self.n_outputs_ = Y.shape[1]
+        self.classes_ = [np.array([0, 1])] * Y.shape[1]
+        return self
+
+    def predict_proba(self, X):
+        out = []
+        for est in self.estimators_:
+            p1 = _positive_proba(est, X)
+            out.append(np.column_stack([1.0 - p1, p1]))
+        return out
+
+    def predict(self, X):
+        return (predict_label_proba(self, X) >= 0.5).astype(np.int64)
+
+
+class SGDPerLabelClassifier(ClassifierMixin, BaseEstimator):
+    """
+    每个标签一个 SGDClassifier(loss='log_loss')，支持 partial_fit 增量更新
+    - fit：按标签频率计算正负类权重（相当于 class_weight='balanced'），打乱后训练 n_epochs 轮
+    - partial_fit：沿用 fit 时的类别权重，只在新样本上各走一轮，耗时与新样本数成正比
+    """
+
+    def __init__(self, alpha=1e-4, n_epochs=10, random_state=42):
+        self.alpha = alpha
+        self.n_epochs = n_epochs
+        self.random_state = random_state
+
+    def _init_estimators(self, Y):
+        n, n_labels = Y.shape
+        pos = Y.sum(axis=0).astype(np.float64)
+        neg = n - pos
+        # 类别权重 n / (2 * 该类样本数)，缺失的类别权重记为 1
+        self.class_weights_ = np.column_stack([
+            np.where(neg > 0, n / (2 * np.maximum(neg, 1)), 1.0),
+            np.where(pos > 0, n / (2 * np.maximum(pos, 1)), 1.0),
+        ])
+        self.estimators_ = [SGDClassifier(loss='log_loss', alpha=self.alpha, random_state=self.random_state)
+                            for _ in range(n_labels)]
+        self.n_outputs_ = n_labels
+        self.classes_ = [np.array([0, 1])] * n_labels
+        self.n_updates_ = 0
+
+    def _partial_fit_once(self, X, Y, sample_weight):
+        for j, est in enumerate(self.estimators_):
+            w = self.class_weights_[j][Y[:, j]]
+            if sample_weight is not None:
+                w = w * sample_weight
+            est.partial_fit(X, Y[:, j], classes=[0, 1], sample_weight=w)
+
+    def fit(self, X, Y, sample_weight=None):
+        Y = np.asarray(Y).astype(np.int64)
+        self._init_estimators(Y)
+        rng = np.random.default_rng(self.random_state)
+        for _ in range(self.n_epochs):
+            order = rng.permutation(len(X))
+            self._partial_fit_once(X[order], Y[order], None if sample_weight is None else sample_weight[order])
+        return self
+
+    def partial_fit(self, X, Y, sample_weight=None):
+        Y = np.asarray(Y).astype(np.int64)
+        if not hasattr(self, 'estimators_'):
+            self._init_estimators(Y)
+        self._partial_fit_once(X, Y, sample_weight)
+        self.n_updates_ += 1
+        return self
+
+    def predict_proba(self, X):
+        return [est.predict_proba(X) for est in self.estimators_]
+
+    def predict(self, X):
+        return (predict_label_proba(self, X) >= 0.5).astype(np.int64)
+
+
+class HierarchicalClassifier(ClassifierMixin, BaseEstimator):
+    """
+    两级多标签分类器：组 = 类别名前缀（derive_label_groups）
+    - 组分类器：样本是否属于该组（组内任一标签为正）；只有一个成员的组，组分类器就是该标签的分类器
+    - 成员分类器：只在该组的正样本上训练，给出 P(标签 | 组)
+    - 预测：P(标签) = P(组) × P(标签 | 组)；P(组) < gate 的样本不再评估该组的成员分类器（其标签概率记为 0，
+      gate 不超过判定阈值时这些标签本来也不会被选中）
+    predict_proba 直接返回 (n, n_labels) 的正类概率矩阵
+    """
+
+    def __init__(self, label_names=None, estimator=None, gate=0.25, n_jobs=None):
+        self.label_names = label_names
+        self.estimator = estimator
+        self.gate = gate
+        self.n_jobs = n_jobs
+
+    def fit(self, X, Y, sample_weight=None):
+        if self.label_names is None:
+            raise ValueError("HierarchicalClassifier 需要 label_names 来推导标签分组")
+        Y = np.asarray(Y)
+        if Y.shape[1] != len(self.label_names):
+            raise ValueError(f"标签矩阵有 {Y.shape[1]} 列，但 label_names 有 {len(self.label_names)} 个")
+        estimator = self.estimator if self.estimator is not None else make_label_estimator('multioutput_rf')
+        self.groups_ = derive_label_groups(self.label_names)
+
+        # 所有组分类器和成员分类器作为同一批任务并行训练
+        tasks = []
+        for _, members in self.groups_:
+            in_group = Y[:, members].any(axis=1)
+            tasks.append((X, in_group.astype(np.int64), sample_weight))
+            if len(members) > 1:
+                rows = np.flatnonzero(in_group)
+                for j in members:
+                    tasks.append((X[rows], Y[rows, j], None if sample_weight is None else sample_weight[rows]))
+        fitted = iter(Parallel(n_jobs=self.n_jobs)(
+            delayed(fit_label)(estimator, Xt, yt, wt) for Xt, yt, wt in tasks
+        ))
+        self.group_estimators_ = []
+        self.member_estimators_ = []
+        for _, members in self.groups_:
+            self.group_estimators_.append(next(fitted))
+            self.member_estimators_.append([next(fitted) for _ in members] if len(members) > 1 else [])
+        self.n_outputs_ = Y.shape[1]
+        self.classes_ = [np.array([0, 1])] * Y.shape[1]
+        return self
+
+    def predict_proba_with_cost(self, X):
+        """
+        返回 (P, cost)：P 为 (n, n_labels) 正类概率，cost 为每个样本实际评估的分类器（森林）个数
+        """
+        n = len(X)
+        P = np.zeros((n, self.n_outputs_))
+        cost = np.zeros(n, dtype=np.int64)
+        for (_, members), group_est, member_ests in zip(self.groups_, self.group_estimators_,
+                                                         self.member_estimators_):
+            pg = _positive_proba(group_est, X)
+            cost += 1
+            if not member_ests:
+                P[:, members[0]] = pg
+                continue
+            rows = np.flatnonzero(pg >= self.gate)
+            if not len(rows):
+                continue
+            Xg = X[rows]
+            for j, est in zip(members, member_ests):
+                P[rows, j] = pg[rows] * _positive_proba(est, Xg)
+            cost[rows] += len(members)
+        return P, cost
+
+    def predict_proba(self, X):
+        return self.predict_proba_with_cost(X)[0]
+
+    def predict(self, X):
+        return (self.predict_proba(X) >= 0.5).astype(np.int64)
+
+
+def make_label_estimator(name, n_jobs=1, random_state=42, params=None):
+    """
+    返回逐标签后端的单标签二分类器；native_rf / sgd_linear 不是逐标签独立训练的，返回 None
+    params 为覆盖默认值的超参数（如 hparam_search 找到的最优参数）
+    """
+    if name == 'multioutput_rf':
+        est = RandomForestClassifier(n_estimators=200, class_weight='balanced',
+                                     n_jobs=n_jobs, random_state=random_state)
+    elif name == 'ovr_linear':
+        est = LogisticRegression(C=4.0, class_weight='balanced', max_iter=2000)
+    elif name == 'hist_gb':
+        est = HistGradientBoostingClassifier(max_iter=200, learning_rate=0.1,
+                                             class_weight='balanced', random_state=random_state)
+    elif name in ('native_rf', 'sgd_linear', 'hier_rf'):
+        return None
+    else:
+        raise ValueError(f"未知的分类器后端：{name}，可选 {BACKENDS}")
+    return est.set_params(**params) if params else est
+
+
+def supports_added_trees(model):
+    """
+    是否为逐标签随机森林（multioutput_rf 全量训练得到的模型），可以用 add_label_trees 增量更新
+    """
+    return (isinstance(model, MultiOutputClassifier) and hasattr(model, 'estimators_')
+            and all(isinstance(est, RandomForestClassifier) for est in model.estimators_))
+
+
+def add_label_trees(model, X, Y, n_new=50, sample_weight=None, random_state=None):
+    """
+    随机森林的增量更新（warm-started ensemble）：每个标签在新样本上另训练 n_new 棵树，追加到原森林中，
+    原有的树保持不变，新旧树一起投票。新样本中只有一个取值、或与原森林的类别不一致的标签（如全量训练时
+    没有正样本的标签）无法追加，保持原样；返回追加了树的标签数
+    """
+    if not supports_added_trees(model):
+        raise TypeError(f"当前模型 {type(model).__name__} 不是逐标签随机森林，不能追加树")
+    Y = np.asarray(Y)
+    new = Parallel(n_jobs=model.n_jobs)(
+        delayed(fit_label)(clone(est).set_params(n_estimators=n_new, warm_start=False, random_state=random_state),
+                           X, Y[:, j], sample_weight)
+        for j, est in enumerate(model.estimators_)
+    )
+    n_updated = 0
+    for est, added in zip(model.estimators_, new):
+        if isinstance(added, float) or not np.array_equal(added.classes_, est.classes_):
+            continue
+        est.estimators_ += added.estimators_
+        est.n_estimators = len(est.estimators_)
+        n_updated += 1
+    return n_updated
+
+
+def make_classifier(name='multioutput_rf', n_jobs=-1, random_state=42, params=None, label_names=None):
+    """
+    按名称构造多标签分类器，所有后端都支持 fit(X, Y, sample_weight=...)
+    params：逐标签后端和 hier_rf 为单标签分类器的超参数，native_rf / sgd_linear 为整个模型的超参数
+    label_names：类别名列表，hier_rf 按其前缀推导分组
+    """
+    if name == 'multioutput_rf':
+        # 只在标签一级并行，每个森林单线程，避免两级 n_jobs=-1 嵌套造成 CPU 超额订阅
+        return MultiOutputClassifier(make_label_estimator(name, 1, random_state, params), n_jobs=n_jobs)
+    if name == 'native_rf':
+        # 多输出时 class_weight='balanced' 按每个标签分别计算
+        model = RandomForestClassifier(n_estimators=200, class_weight='balanced',
+                                       n_jobs=n_jobs, random_state=random_state)
+        return model.set_params(**params) if params else model
+    if name == 'sgd_linear':
+        model = SGDPerLabelClassifier(random_state=random_state)
+        return model.set_params(**params) if params else model
+    if name == 'hier_rf':
+        return HierarchicalClassifier(label_names, make_label_estimator('multioutput_rf', 1, random_state, params),
+                                      n_jobs=n_jobs)
+    return PerLabelClassifier(make_label_estimator(name, random_state=random_state, params=params), n_jobs=n_jobs)
+
+
+def predict_label_proba(model, X):
+    """
+    返回 (n_samples, n_labels) 的正类概率矩阵，兼容以下输出：
+    - 列表：每个标签一个 (n, n_classes) 数组（MultiOutputClassifier、多输出随机森林）；
+      训练时只出现过一个取值的标签只有一列，按 classes_ 判断它是正类还是负类
+    - 二维数组：已经是每个标签的正类概率（OneVsRestClassifier 等）
+    """
+    probas = model.predict_proba(X)
+    if isinstance(probas, np.ndarray):
+        return probas
+
+    # MultiOutputClassifier 和多输出随机森林的 classes_ 都是每个标签一个数组的列表
+    classes = getattr(model, 'classes_', None)
+    if not isinstance(classes, list):
+        classes = [np.arange(p.shape[1]) for p in probas]
+
+    P = np.zeros((len(X), len(probas)))
+    for j, (p, cls) in enumerate(zip(probas, classes)):
+        cls = list(cls)
+        if 1 in cls:
+            P[:, j] = p[:, cls.index(1)]
+    return P
+
+
+def benchmark_backends(X, Y, names=BACKENDS, sample_weight=None, test_size=0.2, random_state=42, label_names=None):
+    """
+    在同一份嵌入上比较各后端：训练耗时、每 1000 个文件的预测耗时、序列化大小、微平均 F1
+    返回每个后端一行的字典列表
+    """
+    idx = np.arange(len(X))
+    tr, te = train_test_split(idx, test_size=test_size, random_state=random_state)
+    rows = []
+    for name in names:
+        model = make_classifier(name, random_state=random_state, label_names=label_names)
+        fit_params = {} if sample_weight is None else {'sample_weight': sample_weight[tr]}
+        t0 = time.perf_counter()
+        model.fit(X[tr], Y[tr], **fit_params)
+        fit_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        P = predict_label_proba(model, X[te])
+        predict_s = time.perf_counter() - t0
+
+        f1 = f1_score(Y[te], (P >= 0.5).astype(int), average='micro', zero_division=0)
+        rows.append({
+            'backend': name,
+            'fit_s': round(fit_s, 3),
+            'predict_ms_per_1k': round(predict_s / max(len(te), 1) * 1000 * 1000, 3),
+            'model_mb': round(len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)) / 1024 / 1024, 3),
+            'micro_f1': round(float(f1), 4),
+        })
+        print(f"  {name:<16} 训练 {rows[-1]['fit_s']:>8.2f}s  预测 {rows[-1]['predict_ms_per_1k']:>9.1f}ms/千条  "
+              f"模型 {rows[-1]['model_mb']:>8.2f}MB  微平均F1 {rows[-1]['micro_f1']:.4f}")
+    return rows
@@ -0,0 +1,61 @@
+import json
+import http.client
+import numpy as np
+
+# ----- 常驻分类服务（classify_service.py）的客户端 ----- #
+# 只依赖标准库和 NumPy，P03 导入它不会加载模型；服务不在运行时 connect_service 返回 None，调用方在本进程内分类
+
+SERVICE_HOST = '127.0.0.1'
+SERVICE_PORT = 8765
+
+
+class ClassifyClient:
+    """
+    classify_texts / classify_paths 返回 (labels, P)，P 为 (n, n_labels) 概率矩阵，与 P03 本地预测的结果相同
+    """
+
+    def __init__(self, host=SERVICE_HOST, port=SERVICE_PORT, timeout=300):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def _request(self, method, path, payload=None, timeout=None):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=timeout or self.timeout)
+        try:
+            body = None if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            conn.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+            resp = conn.getresponse()
+            data = json.loads(resp.read().decode('utf-8') or '{}')
+        finally:
+            conn.close()
+        if resp.status != 200:
+            raise RuntimeError(f"分类服务返回 {resp.status}：{data.get('error')}")
+        return data
+
+    def health(self, timeout=None):
+        return self._request('GET', '/health', timeout=timeout)
+
+    def reload(self):
+        # 重新加载模型（P02 训练出新模型后调用）
+        return self._request('POST', '/reload', {})
+
+    def classify_texts(self, texts):
+        data = self._request('POST', '/classify', {'texts': list(texts)})
+        return data['labels'], np.asarray(data['proba'], dtype=np.float64).reshape(len(texts), -1)
+
+    def classify_paths(self, paths, L=50):
+        # 服务端提取文本；路径须是服务进程可以访问的本机路径
+        data = self._request('POST', '/classify', {'paths': list(paths), 'L': L})
+        return data['labels'], np.asarray(data['proba'], dtype=np.float64).reshape(len(paths), -1)
+
+
+def connect_service(host=SERVICE_HOST, port=SERVICE_PORT, timeout=0.2):
+    """
+    服务在运行时返回 ClassifyClient，否则返回 None（探测超时很短，服务不在时几乎没有额外开销）
+    """
+    client = ClassifyClient(host, port)
+    try:
+        client.health(timeout=timeout)
+    except (OSError, ValueError, RuntimeError, http.client.HTTPException):
+        return None
+    return client
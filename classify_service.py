@@ -0,0 +1,202 @@
+import json
+import time
+import queue
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+
+from P03_testing import get_embedder, load_model_and_labels, predict_proba, extract_features_batch, MODEL_ID
+from embedding_store import EmbeddingStore, EMBED_STORE_DIR
+from classify_client import SERVICE_HOST, SERVICE_PORT
+
+# ----- 常驻分类服务：嵌入模型和分类器常驻内存，P03 的 classify_files 通过 classify_client 自动使用 ----- #
+# - 只监听本机地址（默认 127.0.0.1:8765），HTTP + JSON：
+#     GET  /health                                  -> {"labels", "requests", "batches", "uptime_s"}
+#     POST /classify {"texts": [...]}               -> {"labels": [...], "proba": [[...], ...]}
+#     POST /classify {"paths": [...], "L": 50}      -> 同上，由服务提取文本
+#     POST /reload                                  -> 重新加载 rf_model.pkl / 模型包
+# - 每个请求一个线程（提取文本在请求线程中进行）；嵌入 + 预测由单个批处理线程完成：
+#   取到第一个请求后最多再等 max_wait 秒，把同时到达的请求合成一批（不超过 max_batch 条文本）一起编码和预测
+# - 向量库只在批处理线程中打开（sqlite 连接不跨线程）；P02 训练、P03/监视模式的本地回退也会写同一个库，
+#   追加由 EmbeddingStore 的跨进程写锁串行化，各进程新写入的向量互相可见
+
+
+class _Job:
+    def __init__(self, texts):
+        self.texts = texts
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class WarmClassifier:
+    """
+    常驻的嵌入 + 分类模型，submit(texts) 返回 (labels, (n, n_labels) 概率矩阵)；并发提交的请求按微批合并
+
+    Args:
+        model_path (str): pickle 模型路径（模型包更新时优先加载模型包）
+        store_dir (str): 向量库目录，None 表示不使用向量库
+        max_batch (int): 每批最多的文本条数
+        max_wait (float): 凑批的最长等待时间（秒）
+    """
+
+    def __init__(self, model_path='rf_model.pkl', store_dir=EMBED_STORE_DIR, max_batch=256, max_wait=0.005):
+        self.model_path = model_path
+        self.store_dir = store_dir
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.n_requests = 0
+        self.n_batches = 0
+        self.started = time.time()
+        self.reload()
+        # 首次推理的初始化开销（模型加载、numba 编译缓存、线程池）放在启动时；
+        # numba 的 TBB 线程池须在主线程初始化，首次在工作线程中初始化会导致进程退出时挂起
+        predict_proba(self.model, get_embedder().encode(['warmup'], show_progress_bar=False))
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def reload(self):
+        # 新模型加载完成后整体替换，正在处理的批次继续使用旧模型
+        model, labels = load_model_and_labels(self.model_path)
+        self.model, self.labels = model, labels
+        print(f"模型已加载：{len(labels)} 个标签")
+
+    def submit(self, texts):
+        # 返回 (labels, P)；labels 与计算 P 的模型对应（期间 reload 也不会错位）
+        job = _Job(list(texts))
+        if not job.texts:
+            return self.labels, np.zeros((0, len(self.labels)))
+        self._queue.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def _collect(self):
+        # 阻塞取第一个请求，再在 max_wait 内尽量多取；返回 None 表示停止
+        first = self._queue.get()
+        if first is None:
+            return None
+        jobs, n = [first], len(first.texts)
+        deadline = time.perf_counter() + self.max_wait
+        while n < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if job is None:
+                self._queue.put(None)
+                break
+            jobs.append(job)
+            n += len(job.texts)
+        return jobs
+
+    def _run(self):
+        store = EmbeddingStore(self.store_dir, MODEL_ID) if self.store_dir else None
+
+        def encode(batch):
+            return get_embedder().encode(batch, show_progress_bar=False)
+
+        try:
+            while True:
+                jobs = self._collect()
+                if jobs is None:
+                    break
+                texts = [t for job in jobs for t in job.texts]
+                model, labels = self.model, self.labels
+                try:
+                    X = store.encode(texts, encode) if store is not None else encode(texts)
+                    P = predict_proba(model, X)
+                    start = 0
+                    for job in jobs:
+                        job.result = (labels, P[start:start + len(job.texts)])
+                        start += len(job.texts)
+                except Exception as e:
+                    for job in jobs:
+                        job.error = e
+                self.n_requests += len(jobs)
+                self.n_batches += 1
+                for job in jobs:
+                    job.done.set()
+        finally:
+            if store is not None:
+                store.close()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+def _make_handler(warm):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass    # 不逐条打印请求
+
+        def _send(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != '/health':
+                return self._send(404, {'error': f'未知路径 {self.path}'})
+            self._send(200, {'labels': warm.labels, 'requests': warm.n_requests, 'batches': warm.n_batches,
+                             'uptime_s': round(time.time() - warm.started, 1)})
+
+        def do_POST(self):
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                payload = json.loads(self.rfile.read(length).decode('utf-8') or '{}')
+            except ValueError as e:
+                return self._send(400, {'error': f'请求不是合法的 JSON：{e}'})
+            try:
+                if self.path == '/reload':
+                    warm.reload()
+                    return self._send(200, {'labels': warm.labels})
+                if self.path != '/classify':
+                    return self._send(404, {'error': f'未知路径 {self.path}'})
+                if 'texts' in payload:
+                    texts = payload['texts']
+                elif 'paths' in payload:
+                    texts = extract_features_batch(payload['paths'], int(payload.get('L', 50)))
+                else:
+                    return self._send(400, {'error': '需要 texts 或 paths'})
+                labels, P = warm.submit(texts)
+                self._send(200, {'labels': labels, 'proba': P.tolist()})
+            except Exception as e:
+                print(f"处理请求出错：{type(e).__name__}: {e}")
+                self._send(500, {'error': f'{type(e).__name__}: {e}'})
+
+    return Handler
+
+
+def serve(host=SERVICE_HOST, port=SERVICE_PORT, model_path='rf_model.pkl', store_dir=EMBED_STORE_DIR,
+          max_batch=256, max_wait=0.005):
+    """
+    启动服务并阻塞，Ctrl+C 结束
+    """
+    warm = WarmClassifier(model_path, store_dir, max_batch, max_wait)
+    server = ThreadingHTTPServer((host, port), _make_handler(warm))
+    server.daemon_threads = True
+    print(f"分类服务已启动：http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        warm.close()
+        print("分类服务已停止")
+
+
+if __name__ == '__main__':
+    serve(SERVICE_HOST, SERVICE_PORT, model_path='rf_model.pkl', store_dir=EMBED_STORE_DIR)
@@ -0,0 +1,278 @@
+import os
+import json
+import mmap
+import shutil
+import numpy as np
+
+# ----- 列式训练数据集：按年份分区，字符串列 = UTF-8 字节块 + 偏移量，标签存整数编码 ----- #
+# 目录结构：
+#   dataset/
+#     meta.json                       {"categories": [...]}，所有分区共享同一套标签编码
+#     year=2025/
+#       paths.bin  paths.offsets.npy  路径列
+#       texts.bin  texts.offsets.npy  文本列
+#       labels.npy                    int16 标签编码，-1 表示“其他”
+#       digests.npy                   S16 文件内容哈希（可选，空表示未参与去重）
+#       meta.json                     {"year", "n_rows", "source_mtime_ns"}
+# 读取时字符串列以 mmap 方式打开，按需解码，不会一次性生成上百万个 Python 字符串
+
+OTHER_CODE = -1
+
+
+class StringColumn:
+    """
+    只读字符串列：底层为 mmap 的 UTF-8 字节块，按下标解码
+    """
+
+    def __init__(self, data_path, offsets_path):
+        self.offsets = np.load(offsets_path, mmap_mode='r')
+        self._file = None
+        self._buf = b''
+        if self.offsets[-1] > 0:
+            self._file = open(data_path, 'rb')
+            self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._buf[int(self.offsets[i]):int(self.offsets[i + 1])].decode('utf-8', 'surrogatepass')
+
+    def __iter__(self):
+        buf = self._buf
+        offsets = self.offsets
+        for i in range(len(self)):
+            yield buf[int(offsets[i]):int(offsets[i + 1])].decode('utf-8', 'surrogatepass')
+
+    def close(self):
+        if self._file is not None:
+            self._buf.close()
+            self._file.close()
+            self._file = None
+
+
+class ConcatColumn:
+    """
+    把多个分区的同名字符串列拼接成一个逻辑列
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self._starts = np.cumsum([0] + [len(c) for c in columns])
+
+    def __len__(self):
+        return int(self._starts[-1])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        k = int(np.searchsorted(self._starts, i, side='right')) - 1
+        return self.columns[k][i - int(self._starts[k])]
+
+    def __iter__(self):
+        for column in self.columns:
+            yield from column
+
+    def iter_chunks(self, chunk_size, indices=None):
+        """
+        按块产出字符串列表，供批量编码等场景流式使用；indices 给出时只取这些行（按给定顺序）
+        """
+        chunk = []
+        for s in (self if indices is None else (self[int(i)] for i in indices)):
+            chunk.append(s)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def close(self):
+        for column in self.columns:
+            column.close()
+
+    def take(self, indices):
+        return ColumnView(self, indices)
+
+
+class ColumnView:
+    """
+    按行下标选取的只读视图（例如去重后保留的行）
+    """
+
+    def __init__(self, column, indices):
+        self.column = column
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.column[int(j)] for j in self.indices[i]]
+        return self.column[int(self.indices[i])]
+
+    def __iter__(self):
+        for i in self.indices:
+            yield self.column[int(i)]
+
+    def iter_chunks(self, chunk_size):
+        return self.column.iter_chunks(chunk_size, indices=self.indices)
+
+
+def _write_string_column(folder, name, values):
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    with open(os.path.join(folder, f'{name}.bin'), 'wb') as f:
+        pos = 0
+        for i, v in enumerate(values):
+            b = v.encode('utf-8', 'surrogatepass')
+            f.write(b)
+            pos += len(b)
+            offsets[i + 1] = pos
+    np.save(os.path.join(folder, f'{name}.offsets.npy'), offsets)
+
+
+def partition_dir(dataset_dir, year):
+    return os.path.join(dataset_dir, f'year={year}')
+
+
+def read_dataset_meta(dataset_dir):
+    meta_path = os.path.join(dataset_dir, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_partition_meta(dataset_dir, year):
+    meta_path = os.path.join(partition_dir(dataset_dir, year), 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def ensure_dataset(dataset_dir, categories):
+    """
+    创建数据集目录并写入标签表；已有数据集的标签表不一致时清空所有分区（编码已失效）
+    """
+    os.makedirs(dataset_dir, exist_ok=True)
+    meta = read_dataset_meta(dataset_dir)
+    if meta is not None and meta.get('categories') == list(categories):
+        return
+    if meta is not None:
+        print(f"标签列表已变化，清空旧的数据集分区：{dataset_dir}")
+        for name in os.listdir(dataset_dir):
+            if name.startswith('year='):
+                shutil.rmtree(os.path.join(dataset_dir, name), ignore_errors=True)
+    with open(os.path.join(dataset_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'categories': list(categories)}, f, ensure_ascii=False, indent=2)
+
+
+def write_partition(dataset_dir, year, paths, texts, label_codes, digests=None, extra_meta=None):
+    """
+    写入（或整体替换）一个年份分区：先写到临时目录，完成后再替换，避免读到半成品
+    """
+    final_dir = partition_dir(dataset_dir, year)
+    tmp_dir = final_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    _write_string_column(tmp_dir, 'paths', paths)
+    _write_string_column(tmp_dir, 'texts', texts)
+    np.save(os.path.join(tmp_dir, 'labels.npy'), np.asarray(label_codes, dtype=np.int16))
+    if digests is not None:
+        np.save(os.path.join(tmp_dir, 'digests.npy'), np.asarray(digests, dtype='S16'))
+    meta = {'year': str(year), 'n_rows': len(paths)}
+    meta.update(extra_meta or {})
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    old_dir = final_dir + '.old'
+    if os.path.exists(final_dir):
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.replace(final_dir, old_dir)
+    os.replace(tmp_dir, final_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def list_partitions(dataset_dir):
+    if not os.path.isdir(dataset_dir):
+        return []
+    return sorted(name[len('year='):] for name in os.listdir(dataset_dir)
+                  if name.startswith('year=') and not name.endswith(('.tmp', '.old')))
+
+
+class ColumnarDataset:
+    """
+    已加载的数据集：paths/texts 为惰性字符串列，labels 为 int16 编码数组
+    """
+
+    def __init__(self, dataset_dir, years=None):
+        meta = read_dataset_meta(dataset_dir)
+        if meta is None:
+            raise FileNotFoundError(f"数据集不存在：{dataset_dir}")
+        self.categories = meta['categories']
+        self.years = list(years) if years is not None else list_partitions(dataset_dir)
+        path_cols, text_cols, labels, digests = [], [], [], []
+        for year in self.years:
+            folder = partition_dir(dataset_dir, year)
+            path_cols.append(StringColumn(os.path.join(folder, 'paths.bin'),
+                                          os.path.join(folder, 'paths.offsets.npy')))
+            text_cols.append(StringColumn(os.path.join(folder, 'texts.bin'),
+                                          os.path.join(folder, 'texts.offsets.npy')))
+            labels.append(np.load(os.path.join(folder, 'labels.npy'), mmap_mode='r'))
+            digest_path = os.path.join(folder, 'digests.npy')
+            if os.path.exists(digest_path):
+                digests.append(np.load(digest_path))
+            else:
+                digests.append(np.zeros(len(labels[-1]), dtype='S16'))
+        self.paths = ConcatColumn(path_cols)
+        self.texts = ConcatColumn(text_cols)
+        self.labels = np.concatenate(labels) if labels else np.zeros(0, dtype=np.int16)
+        self.digests = np.concatenate(digests) if digests else np.zeros(0, dtype='S16')
+
+    def __len__(self):
+        return len(self.labels)
+
+    def label_matrix(self, dtype=np.int8):
+        """
+        把标签编码展开成 (n_rows, n_categories) 的 0/1 矩阵，“其他”对应全零行
+        """
+        Y = np.zeros((len(self.labels), len(self.categories)), dtype=dtype)
+        rows = np.flatnonzero(self.labels >= 0)
+        Y[rows, self.labels[rows]] = 1
+        return Y
+
+    def dedup_rows(self):
+        """
+        按 (内容哈希, 标签) 合并重复行，返回 (保留的行下标, 每个保留行代表的副本数)
+        没有内容哈希的行各自独立保留
+        """
+        n = len(self.labels)
+        if n == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        words = np.ascontiguousarray(self.digests).view(np.uint64).reshape(n, 2)
+        hashed = np.flatnonzero(words.any(axis=1))
+        plain = np.flatnonzero(~words.any(axis=1))
+
+        keys = np.column_stack([words[hashed], self.labels[hashed].astype(np.int64).view(np.uint64)])
+        _, first, counts = np.unique(keys, axis=0, return_index=True, return_counts=True)
+
+        keep = np.concatenate([plain, hashed[first]])
+        weights = np.concatenate([np.ones(len(plain), dtype=np.int64), counts])
+        order = np.argsort(keep, kind='stable')
+        return keep[order], weights[order]
+
+    def close(self):
+        self.paths.close()
+        self.texts.close()
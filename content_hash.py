@@ -0,0 +1,65 @@
+import os
+import hashlib
+from feature_cache import lookup_digest, store_digest
+
+# ----- 文件内容哈希：分块 BLAKE2b，按 (大小, 修改时间) 缓存在 feature_cache.sqlite 中 ----- #
+
+# 只有按内容提取文本的类型才参与去重；其他类型的特征是文件名，不能按内容合并
+# 压缩包的文本取自成员内容（没有可提取成员时为成员名列表），同样只由内容决定
+HASH_EXTS = {'.txt', '.docx', '.pptx', '.xls', '.xlsx', '.zip', '.rar'}
+CHUNK_SIZE = 1 << 20
+# 超过 SAMPLE_ABOVE 的压缩包不整体哈希，只哈希 大小 + 开头/末尾各 SAMPLE_BYTES：
+# 提取的文本来自开头的成员（末尾为成员目录），大小和首尾都相同的两个压缩包按同一内容处理
+SAMPLED_EXTS = {'.zip', '.rar'}
+SAMPLE_ABOVE = 64 * 1024 * 1024
+SAMPLE_BYTES = 4 * 1024 * 1024
+
+
+def file_digest(path, chunk_size=CHUNK_SIZE):
+    """
+    计算文件内容的 16 字节 BLAKE2b 摘要
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.digest()
+
+
+def sampled_digest(path, sample_bytes=SAMPLE_BYTES):
+    """
+    大文件的抽样摘要：BLAKE2b(大小, 开头 sample_bytes, 末尾 sample_bytes)，与整体摘要不会相同
+    """
+    h = hashlib.blake2b(digest_size=16, person=b'sampled')
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        h.update(size.to_bytes(8, 'little'))
+        h.update(f.read(sample_bytes))
+        f.seek(max(sample_bytes, size - sample_bytes))
+        h.update(f.read(sample_bytes))
+    return h.digest()
+
+
+def get_digest(conn, path, key):
+    """
+    返回文件内容摘要：缓存命中（大小/修改时间一致）直接返回，否则重新计算并写入缓存
+    不参与去重的类型、目录或无法读取的文件返回 None
+    """
+    if key is None or os.path.splitext(path)[1].lower() not in HASH_EXTS:
+        return None
+    digest = lookup_digest(conn, path, *key)
+    if digest is not None:
+        return digest
+    try:
+        if os.path.splitext(path)[1].lower() in SAMPLED_EXTS and os.path.getsize(path) > SAMPLE_ABOVE:
+            digest = sampled_digest(path, SAMPLE_BYTES)
+        else:
+            digest = file_digest(path)
+    except OSError as e:
+        print(f"计算文件哈希出错 {path}: {e}")
+        return None
+    store_digest(conn, path, *key, digest)
+    return digest
@@ -1,5 +1,6 @@
 import os
 import re
+from fs_walker import iter_file_paths
 
 
 def replace_string_in_file(file_path, old_str, new_str):
@@ -27,11 +28,9 @@ def process_directory(directory, old_str, new_str):
     print(f"处理目录: {directory}")
     print(f"替换规则: '{old_str}' → '{new_str}'")
 
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.endswith('.py'):
-                file_path = os.path.join(root, file)
-                replace_string_in_file(file_path, old_str, new_str)
+    for file_path in iter_file_paths(directory):
+        if file_path.endswith('.py'):
+            replace_string_in_file(file_path, old_str, new_str)
 
     print("替换完成")
 
@@ -0,0 +1,124 @@
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from threadpoolctl import threadpool_limits
+from sklearn.model_selection import KFold
+from sklearn.metrics import accuracy_score, f1_score
+
+from classifier_backends import make_classifier, make_label_estimator, fit_label
+
+# ----- 并行交叉验证：所有 (折, 标签) 训练任务共用一个进程池，不再层层 n_jobs=-1 ----- #
+# - 逐标签后端（multioutput_rf / ovr_linear / hist_gb）：每个 (折, 标签) 是一个单线程任务
+# - native_rf / sgd_linear / hier_rf：每折一个任务，进程池大小 × 每个任务的线程数 不超过 n_workers
+# - X 放在共享内存中，子进程启动时映射一次，任务本身只传折号和标签号
+# - 每折的所有任务完成后立即打印该折指标，不必等全部结束
+
+_X = None
+_Y = None
+_W = None
+_FOLDS = None
+_SHM = None
+
+
+def _init_worker(shm_name, shape, dtype, Y, W, folds, n_threads):
+    global _X, _Y, _W, _FOLDS, _SHM
+    # 子进程与主进程共用同一个 resource_tracker，映射后无需单独登记/注销
+    _SHM = shared_memory.SharedMemory(name=shm_name)
+    _X = np.ndarray(shape, dtype=dtype, buffer=_SHM.buf)
+    _Y, _W, _FOLDS = Y, W, folds
+    # 限制 BLAS/OpenMP 线程（如 HistGradientBoosting），避免与进程池叠加
+    threadpool_limits(n_threads)
+
+
+def _label_task(backend, fold, label, random_state, params):
+    tr, te = _FOLDS[fold]
+    est = fit_label(make_label_estimator(backend, n_jobs=1, random_state=random_state, params=params),
+                    _X[tr], _Y[tr, label], None if _W is None else _W[tr])
+    if isinstance(est, float):
+        pred = np.full(len(te), int(est >= 0.5), dtype=np.int8)
+    else:
+        pred = est.predict(_X[te]).astype(np.int8)
+    return fold, label, pred
+
+
+def _fold_task(backend, fold, n_jobs, random_state, params, label_names):
+    tr, te = _FOLDS[fold]
+    model = make_classifier(backend, n_jobs=n_jobs, random_state=random_state, params=params,
+                            label_names=label_names)
+    fit_params = {} if _W is None else {'sample_weight': _W[tr]}
+    model.fit(_X[tr], _Y[tr], **fit_params)
+    pred = np.asarray(model.predict(_X[te]), dtype=np.int8)
+    return fold, None, pred
+
+
+def run_cross_validation(X, Y, backend='multioutput_rf', n_splits=5, sample_weight=None,
+                         n_workers=None, random_state=42, on_fold=None, params=None,
+                         label_names=None):
+    """
+    K 折交叉验证，返回按折号排序的指标列表 [{'fold', 'accuracy', 'micro_f1', 'seconds'}]
+
+    Args:
+        X (ndarray): 特征矩阵，会复制到共享内存
+        Y (ndarray): (n, n_labels) 0/1 标签矩阵
+        backend (str): classifier_backends 中的后端名
+        n_splits (int): 折数
+        sample_weight (ndarray): 可选的样本权重
+        n_workers (int): 总的 CPU 预算，默认等于核数
+        on_fold (callable): 每折完成时以该折的指标字典调用
+        params (dict): 传给 make_classifier / make_label_estimator 的超参数
+        label_names (list): 类别名列表（hier_rf 需要）
+    """
+    X = np.ascontiguousarray(X)
+    Y = np.asarray(Y)
+    n_workers = n_workers or os.cpu_count() or 1
+    folds = list(KFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(X))
+    n_labels = Y.shape[1]
+
+    per_label = make_label_estimator(backend) is not None
+    if per_label:
+        pool_size, n_threads = n_workers, 1
+        tasks = [(_label_task, (backend, f, j, random_state, params)) for f in range(n_splits) for j in range(n_labels)]
+    else:
+        pool_size = min(n_workers, n_splits)
+        n_threads = max(1, n_workers // pool_size)
+        tasks = [(_fold_task, (backend, f, n_threads, random_state, params, label_names)) for f in range(n_splits)]
+
+    shm = shared_memory.SharedMemory(create=True, size=max(X.nbytes, 1))
+    try:
+        np.ndarray(X.shape, dtype=X.dtype, buffer=shm.buf)[:] = X
+        preds = [np.zeros((len(te), n_labels), dtype=np.int8) for _, te in folds]
+        remaining = [n_labels if per_label else 1] * n_splits
+        t_start = time.perf_counter()
+        results = []
+
+        with ProcessPoolExecutor(max_workers=pool_size, initializer=_init_worker,
+                                 initargs=(shm.name, X.shape, X.dtype, Y, sample_weight, folds, n_threads)) as pool:
+            futures = [pool.submit(func, *args) for func, args in tasks]
+            for future in as_completed(futures):
+                fold, label, pred = future.result()
+                if label is None:
+                    preds[fold][:] = pred
+                else:
+                    preds[fold][:, label] = pred
+                remaining[fold] -= 1
+                if remaining[fold]:
+                    continue
+                Y_te = Y[folds[fold][1]]
+                metrics = {
+                    'fold': fold,
+                    'accuracy': float(accuracy_score(Y_te, preds[fold])),
+                    'micro_f1': float(f1_score(Y_te, preds[fold], average='micro', zero_division=0)),
+                    'seconds': round(time.perf_counter() - t_start, 3),
+                }
+                results.append(metrics)
+                print(f"[折 {fold + 1}/{n_splits}] 准确率 {metrics['accuracy']:.4f}  "
+                      f"微平均 F1 {metrics['micro_f1']:.4f}  （已用 {metrics['seconds']:.1f}s）")
+                if on_fold is not None:
+                    on_fold(metrics)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return sorted(results, key=lambda m: m['fold'])
@@ -0,0 +1,220 @@
+import os
+import json
+import numpy as np
+
+try:
+    import onnxruntime as ort  # 可选：有导出的 ONNX 模型时用它在 CPU 上推理
+except ImportError:
+    ort = None
+
+# ----- 嵌入后端：按 token 长度分桶、按 token 预算自适应批大小，可选 ONNX Runtime（int8 量化）推理 ----- #
+# - 所有文本先分词一次，按长度从长到短排序后切批：每批 token 总数不超过 max_tokens，
+#   只有文件名的短文本一批可以放很多条，长文本一批放得少，不再被补齐到同批最长文本的长度
+# - 结果按输入顺序写回，调用方（EmbeddingStore.encode 等）无需关心排序
+# - backend='onnx'：使用导出到 ONNX_DIR 的模型（首次使用时由 torch 导出，可选动态 int8 量化）；
+#   'torch'：SentenceTransformer；'auto'：已导出或能导出 ONNX 且装了 onnxruntime 时用 ONNX，否则用 torch
+# - ONNX float32 与 torch 的向量差异在 1e-6 量级，可共用同一个向量库；int8 量化的向量有可见差异，
+#   向量库使用单独的模型键（embedding_model_key）
+
+MODEL_ID = 'all-MiniLM-L6-v2'
+ONNX_DIR = os.path.join('file_embed_pkl_history', 'onnx')
+MAX_TOKENS = 8192    # 每批 token 总数上限
+MAX_BATCH = 256      # 每批条数上限
+
+
+def embedding_model_key(model_id=MODEL_ID, quantize=False):
+    """
+    向量库中的模型键：int8 量化的向量与 float32 向量分开存放
+    """
+    return f'{model_id}-onnx-int8' if quantize else model_id
+
+
+def bucketed_encode(items, lengths, encode_batch, max_tokens=MAX_TOKENS, max_batch=MAX_BATCH):
+    """
+    按长度从长到短分批调用 encode_batch(批内条目列表) -> (b, dim) 数组，返回按输入顺序排列的 float32 矩阵
+    最长的批最先运行，内存不够时立即暴露
+    """
+    n = len(items)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    order = np.argsort(-lengths, kind='stable')
+    out = None
+    i = 0
+    while i < n:
+        longest = max(int(lengths[order[i]]), 1)
+        size = max(1, min(max_batch, max_tokens // longest))
+        idx = order[i:i + size]
+        vecs = np.asarray(encode_batch([items[j] for j in idx]), dtype=np.float32)
+        if out is None:
+            out = np.empty((n, vecs.shape[1]), dtype=np.float32)
+        out[idx] = vecs
+        i += size
+    return out if out is not None else np.zeros((0, 0), dtype=np.float32)
+
+
+class TorchEmbedder:
+    """
+    SentenceTransformer 加上分桶/自适应批大小
+    """
+
+    def __init__(self, model_id=MODEL_ID, max_tokens=MAX_TOKENS, max_batch=MAX_BATCH):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_id, device='cpu')
+        self.max_tokens = max_tokens
+        self.max_batch = max_batch
+
+    def token_lengths(self, texts):
+        ids = self.model.tokenizer(list(texts), truncation=True, max_length=self.model.max_seq_length,
+                                   return_attention_mask=False, return_token_type_ids=False)['input_ids']
+        return [len(x) for x in ids]
+
+    def encode(self, texts, batch_size=None, show_progress_bar=False):
+        """
+        接口与 SentenceTransformer.encode 相同；batch_size 仅为兼容保留，批大小由 max_tokens 自适应决定
+        """
+        texts = list(texts)
+        return bucketed_encode(
+            texts, self.token_lengths(texts),
+            lambda batch: self.model.encode(batch, batch_size=len(batch), show_progress_bar=False,
+                                            convert_to_numpy=True),
+            self.max_tokens, self.max_batch)
+
+
+class OnnxEmbedder:
+    """
+    ONNX Runtime 推理：tokenizers 分词 + 导出的 Transformer + 均值池化（+ L2 归一化），与 SentenceTransformer 输出一致
+    """
+
+    def __init__(self, model_dir, quantize=False, max_tokens=MAX_TOKENS, max_batch=MAX_BATCH, threads=None):
+        if ort is None:
+            raise ImportError("未安装 onnxruntime，无法使用 ONNX 嵌入后端")
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, 'embedder_config.json'), 'r', encoding='utf-8') as f:
+            self.config = json.load(f)
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.no_padding()
+        self.tokenizer.enable_truncation(self.config['max_seq_length'])
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        name = 'model_int8.onnx' if quantize else 'model.onnx'
+        self.session = ort.InferenceSession(os.path.join(model_dir, name), options,
+                                            providers=['CPUExecutionProvider'])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.max_tokens = max_tokens
+        self.max_batch = max_batch
+
+    def _encode_batch(self, encodings):
+        L = max(len(e.ids) for e in encodings)
+        ids = np.full((len(encodings), L), self.config['pad_token_id'], dtype=np.int64)
+        mask = np.zeros((len(encodings), L), dtype=np.int64)
+        types = np.zeros((len(encodings), L), dtype=np.int64)
+        for r, e in enumerate(encodings):
+            n = len(e.ids)
+            ids[r, :n] = e.ids
+            mask[r, :n] = 1
+            types[r, :n] = e.type_ids
+        feeds = {'input_ids': ids, 'attention_mask': mask, 'token_type_ids': types}
+        hidden = self.session.run(None, {k: feeds[k] for k in self.input_names})[0]
+
+        # 与 sentence_transformers.models.Pooling(mean) / Normalize 相同的计算
+        m = mask[:, :, None].astype(np.float32)
+        emb = (hidden * m).sum(axis=1) / np.clip(m.sum(axis=1), 1e-9, None)
+        if self.config.get('normalize'):
+            emb /= np.clip(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12, None)
+        return emb
+
+    def encode(self, texts, batch_size=None, show_progress_bar=False):
+        """
+        接口与 SentenceTransformer.encode 相同；batch_size 仅为兼容保留，批大小由 max_tokens 自适应决定
+        """
+        encodings = self.tokenizer.encode_batch(list(texts))
+        return bucketed_encode(encodings, [len(e.ids) for e in encodings], self._encode_batch,
+                               self.max_tokens, self.max_batch)
+
+
+def onnx_model_dir(model_id=MODEL_ID, onnx_dir=ONNX_DIR):
+    return os.path.join(onnx_dir, os.path.basename(os.path.normpath(model_id)))
+
+
+def export_onnx(model_id=MODEL_ID, onnx_dir=ONNX_DIR, quantize=True):
+    """
+    把 SentenceTransformer 的 Transformer 部分导出为 ONNX（动态 batch/序列长度），并保存分词器和池化配置
+    quantize 时另存一份动态 int8 量化的模型；需要 torch 和 sentence_transformers，返回模型目录
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_id, device='cpu')
+    modules = list(model)
+    pooling = modules[1] if len(modules) > 1 else None
+    if pooling is not None and not getattr(pooling, 'pooling_mode_mean_tokens', False):
+        raise ValueError(f"ONNX 后端只支持均值池化的模型：{model_id}")
+
+    out_dir = onnx_model_dir(model_id, onnx_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = model.tokenizer
+    tokenizer.save_pretrained(out_dir)
+    transformer = modules[0].auto_model.eval()
+
+    dummy = tokenizer(["示例文本 example"], return_tensors='pt')
+    names = [k for k in ('input_ids', 'attention_mask', 'token_type_ids') if k in dummy]
+    path = os.path.join(out_dir, 'model.onnx')
+    export_kwargs = dict(input_names=names, output_names=['last_hidden_state'],
+                         dynamic_axes={**{k: {0: 'batch', 1: 'seq'} for k in names},
+                                       'last_hidden_state': {0: 'batch', 1: 'seq'}},
+                         opset_version=17)
+    with torch.no_grad():
+        try:
+            torch.onnx.export(transformer, tuple(dummy[k] for k in names), path, dynamo=False, **export_kwargs)
+        except TypeError:   # 旧版 torch 没有 dynamo 参数
+            torch.onnx.export(transformer, tuple(dummy[k] for k in names), path, **export_kwargs)
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(path, os.path.join(out_dir, 'model_int8.onnx'), weight_type=QuantType.QInt8)
+
+    config = {
+        'model_id': model_id,
+        'max_seq_length': int(model.max_seq_length),
+        'pad_token_id': int(tokenizer.pad_token_id or 0),
+        'normalize': any(type(m).__name__ == 'Normalize' for m in modules),
+    }
+    with open(os.path.join(out_dir, 'embedder_config.json'), 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+    return out_dir
+
+
+def load_embedder(model_id=MODEL_ID, backend='auto', quantize=False, onnx_dir=ONNX_DIR,
+                  max_tokens=MAX_TOKENS, max_batch=MAX_BATCH, threads=None):
+    """
+    嵌入器工厂：返回带 encode(texts, batch_size=None, show_progress_bar=False) 方法的对象
+
+    Args:
+        model_id (str): 模型名或本地模型目录
+        backend (str): 'auto' / 'onnx' / 'torch'
+        quantize (bool): ONNX 后端使用 int8 量化模型（向量库键见 embedding_model_key）
+        threads (int): ONNX Runtime 的线程数，默认由其自动决定
+    """
+    if backend not in ('auto', 'onnx', 'torch'):
+        raise ValueError(f"未知的嵌入后端：{backend}")
+    if backend != 'torch' and ort is not None:
+        model_dir = onnx_model_dir(model_id, onnx_dir)
+        name = 'model_int8.onnx' if quantize else 'model.onnx'
+        if not os.path.exists(os.path.join(model_dir, name)):
+            try:
+                print(f"首次使用 ONNX 后端，正在导出 {model_id} -> {model_dir}")
+                export_onnx(model_id, onnx_dir, quantize=quantize)
+            except Exception as e:
+                if backend == 'onnx':
+                    raise
+                print(f"ONNX 导出失败，改用 torch 后端：{e}")
+                return TorchEmbedder(model_id, max_tokens, max_batch)
+        return OnnxEmbedder(model_dir, quantize, max_tokens, max_batch, threads)
+    if backend == 'onnx':
+        raise ImportError("未安装 onnxruntime，无法使用 ONNX 嵌入后端")
+    if quantize:
+        print("int8 量化只用于 ONNX 后端，torch 后端使用 float32 模型")
+    return TorchEmbedder(model_id, max_tokens, max_batch)
@@ -0,0 +1,181 @@
+import os
+import re
+import json
+import hashlib
+import sqlite3
+import numpy as np
+
+from file_lock import FileLock
+
+# ----- 持久化嵌入向量库：以 (模型名, 文本哈希) 为键，向量存放在可 mmap 的追加式矩阵中 ----- #
+# 目录结构（每个模型一个子目录，换模型不会混用向量）：
+#   embeddings/
+#     all-MiniLM-L6-v2/
+#       meta.json        {"model_id", "dim", "dtype"}
+#       vectors.bin      行优先的 (n, dim) 矩阵，只追加
+#       index.sqlite     文本哈希 -> 行号
+#       store.lock       跨进程写锁
+# 写入顺序：先追加并刷新向量，再提交索引；中途中断最多留下没有索引的尾部行，下次写入或打开时截掉
+# 多个进程（P02 训练、P03/监视模式、常驻分类服务）可以同时打开同一个库：截尾和追加都在 store.lock 的独占锁内进行，
+# 新行的行号取自锁内的实际行数，不依赖本进程打开时记下的行数；其他进程追加的行在查到时自动纳入 mmap 视图
+
+EMBED_STORE_DIR = os.path.join('file_embed_pkl_history', 'embeddings')
+
+_SQL_CHUNK = 500
+
+
+def text_hash(text):
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+def _model_folder(store_dir, model_id):
+    return os.path.join(store_dir, re.sub(r'[^\w.-]+', '_', model_id))
+
+
+class EmbeddingStore:
+    """
+    按文本内容缓存嵌入向量；encode() 只对库中没有的文本调用编码函数
+
+    Args:
+        store_dir (str): 向量库根目录
+        model_id (str): 模型名，不同模型的向量分目录存放
+        dtype (str): 磁盘存储精度，'float16'（默认，体积减半）或 'float32'
+    """
+
+    def __init__(self, store_dir, model_id, dtype='float16'):
+        self.folder = _model_folder(store_dir, model_id)
+        os.makedirs(self.folder, exist_ok=True)
+        self.model_id = model_id
+        self._meta_path = os.path.join(self.folder, 'meta.json')
+        self._bin_path = os.path.join(self.folder, 'vectors.bin')
+        self._lock = FileLock(os.path.join(self.folder, 'store.lock'))
+
+        self.dim = None
+        self.dtype = np.dtype(dtype)
+        self._load_meta()
+
+        self.conn = sqlite3.connect(os.path.join(self.folder, 'index.sqlite'))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS vectors (hash BLOB PRIMARY KEY, row INTEGER NOT NULL)")
+        self.conn.commit()
+
+        with self._lock:
+            self.n_rows = self._recover()
+        self._matrix = None
+
+    def _load_meta(self):
+        # 库可能由其他进程首次写入，维度未知时重新读取 meta.json
+        if self.dim is None and os.path.exists(self._meta_path):
+            with open(self._meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            self.dim = meta['dim']
+            self.dtype = np.dtype(meta['dtype'])
+
+    def _recover(self):
+        """
+        截掉没有索引的尾部行（写入中断），返回有效行数；须在持有写锁时调用，
+        此时没有其他进程在追加，没有索引的尾部只可能是中断留下的
+        """
+        n_indexed = self.conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM vectors").fetchone()[0]
+        self._load_meta()
+        if self.dim is None or not os.path.exists(self._bin_path):
+            return n_indexed
+        row_bytes = self.dim * self.dtype.itemsize
+        if os.path.getsize(self._bin_path) != n_indexed * row_bytes:
+            with open(self._bin_path, 'r+b') as f:
+                f.truncate(n_indexed * row_bytes)
+        return n_indexed
+
+    def __len__(self):
+        return self.n_rows
+
+    @property
+    def matrix(self):
+        """
+        整个向量矩阵的只读 mmap 视图，行数增加后自动重新映射
+        """
+        if self.n_rows == 0:
+            return np.zeros((0, self.dim or 0), dtype=self.dtype)
+        if self._matrix is None or len(self._matrix) != self.n_rows:
+            self._matrix = np.memmap(self._bin_path, dtype=self.dtype, mode='r', shape=(self.n_rows, self.dim))
+        return self._matrix
+
+    def lookup_rows(self, hashes):
+        """
+        返回每个哈希对应的行号，库中没有的为 -1
+        """
+        rows = np.full(len(hashes), -1, dtype=np.int64)
+        pos = {}
+        for i, h in enumerate(hashes):
+            pos.setdefault(h, []).append(i)
+        keys = list(pos)
+        for start in range(0, len(keys), _SQL_CHUNK):
+            chunk = keys[start:start + _SQL_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            for h, row in self.conn.execute(
+                    f"SELECT hash, row FROM vectors WHERE hash IN ({placeholders})", chunk):
+                rows[pos[h]] = row
+        return rows
+
+    def append(self, hashes, vectors):
+        """
+        追加新向量并写入索引，返回每个哈希的行号；
+        其他进程在此期间已写入的哈希不再重复追加，直接返回已有的行号
+        """
+        vectors = np.asarray(vectors)
+        self._matrix = None  # 先释放旧映射（Windows 下被映射的文件不便追加）
+        with self._lock:
+            start = self._recover()
+            rows = self.lookup_rows(hashes)
+            new = np.flatnonzero(rows < 0)
+            if len(new):
+                if self.dim is None:
+                    self.dim = int(vectors.shape[1])
+                    with open(self._meta_path, 'w', encoding='utf-8') as f:
+                        json.dump({'model_id': self.model_id, 'dim': self.dim, 'dtype': self.dtype.name},
+                                  f, indent=2)
+                elif vectors.shape[1] != self.dim:
+                    raise ValueError(f"向量维度 {vectors.shape[1]} 与向量库维度 {self.dim} 不一致：{self.folder}")
+
+                with open(self._bin_path, 'ab') as f:
+                    f.write(np.ascontiguousarray(vectors[new], dtype=self.dtype).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                rows[new] = start + np.arange(len(new))
+                self.conn.executemany("INSERT INTO vectors (hash, row) VALUES (?, ?)",
+                                      ((hashes[i], int(rows[i])) for i in new))
+                self.conn.commit()
+                start += len(new)
+            self.n_rows = max(self.n_rows, start)
+        return rows
+
+    def encode(self, texts, encode_func):
+        """
+        返回 texts 的嵌入矩阵（float32，顺序与 texts 一致）
+        库中已有的直接读取；缺失的文本去重后交给 encode_func(list_of_texts) 编码并追加入库
+        """
+        texts = list(texts)
+        hashes = [text_hash(t) for t in texts]
+        rows = self.lookup_rows(hashes)
+
+        missing = {}
+        for i in np.flatnonzero(rows < 0):
+            missing.setdefault(hashes[i], i)
+        if missing:
+            new_hashes = list(missing)
+            vectors = encode_func([texts[missing[h]] for h in new_hashes])
+            new_row = dict(zip(new_hashes, self.append(new_hashes, vectors)))
+            for i in np.flatnonzero(rows < 0):
+                rows[i] = new_row[hashes[i]]
+
+        if len(rows) == 0:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        if rows.max() >= self.n_rows:
+            # 其他进程追加的行：索引提交前向量已写入并刷新，行号以内的数据都已完整
+            self._load_meta()
+            self.n_rows = int(rows.max()) + 1
+        return np.asarray(self.matrix[rows], dtype=np.float32)
+
+    def close(self):
+        self._matrix = None
+        self.conn.close()
@@ -0,0 +1,158 @@
+import os
+import csv
+import json
+import time
+import heapq
+import threading
+from contextlib import contextmanager
+
+# ----- 特征提取性能剖析：按扩展名/提取器统计调用次数、耗时分位数、文件大小合计和失败次数 ----- #
+# file_bytes 是被提取文件的磁盘大小之和，不是提取器实际读取的字节数：
+# 流式提取读够 len_doc 个字符即停止、压缩包成员有大小上限，不能用它换算 MB/s 吞吐
+
+_local = threading.local()
+
+
+def note_extract_failure(path, error=None):
+    """
+    提取函数在 except 分支中调用：把当前正在计时的记录标记为失败（未开启剖析时无操作）
+    """
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        stack[-1]['failed'] = True
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+class ExtractionProfiler:
+    """
+    收集每个文件的提取耗时；report() 汇总，write_report() 输出 JSON + CSV
+    keep_records=True 时额外保留原始记录，供子进程用 pop_records() 取出、主进程用 merge() 合并
+    """
+
+    def __init__(self, top_n=20, keep_records=False):
+        self.top_n = top_n
+        self._records = [] if keep_records else None
+        self.groups = {}      # (扩展名, 提取器) -> {'latencies': [], 'file_bytes': 0, 'failures': 0}
+        self.stages = {}      # 阶段名 -> {'seconds': 0.0, 'items': 0}
+        self._slowest = []    # 小顶堆 (耗时, 路径, 扩展名, 提取器)
+        self._lock = threading.Lock()
+
+    def record(self, path, ext, extractor, seconds, file_bytes=0, failed=False):
+        with self._lock:
+            if self._records is not None:
+                self._records.append(('file', path, ext, extractor, seconds, file_bytes, failed))
+            group = self.groups.setdefault((ext, extractor), {'latencies': [], 'file_bytes': 0, 'failures': 0})
+            group['latencies'].append(seconds)
+            group['file_bytes'] += file_bytes or 0
+            group['failures'] += int(bool(failed))
+            item = (seconds, path, ext, extractor)
+            if len(self._slowest) < self.top_n:
+                heapq.heappush(self._slowest, item)
+            elif self._slowest and seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def record_stage(self, name, seconds, items=1):
+        """
+        记录批量阶段（如文本规范化）的总耗时和处理条数
+        """
+        with self._lock:
+            if self._records is not None:
+                self._records.append(('stage', name, seconds, items))
+            stage = self.stages.setdefault(name, {'seconds': 0.0, 'items': 0})
+            stage['seconds'] += seconds
+            stage['items'] += items
+
+    def pop_records(self):
+        with self._lock:
+            records, self._records = self._records or [], ([] if self._records is not None else None)
+        return records
+
+    def merge(self, records):
+        for rec in records:
+            if rec[0] == 'file':
+                self.record(*rec[1:])
+            else:
+                self.record_stage(*rec[1:])
+
+    @contextmanager
+    def track(self, path, ext, extractor):
+        """
+        计时一次提取调用；块内抛出异常或调用 note_extract_failure 都会记为失败
+        """
+        try:
+            nbytes = os.path.getsize(path)
+        except OSError:
+            nbytes = 0
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        state = {'failed': False}
+        stack.append(state)
+        t0 = time.perf_counter()
+        try:
+            yield state
+        except Exception:
+            state['failed'] = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - t0
+            stack.pop()
+            self.record(path, ext, extractor, elapsed, nbytes, state['failed'])
+
+    def report(self):
+        rows = []
+        for (ext, extractor), group in sorted(self.groups.items()):
+            lat = sorted(group['latencies'])
+            total = sum(lat)
+            rows.append({
+                'ext': ext,
+                'extractor': extractor,
+                'calls': len(lat),
+                'failures': group['failures'],
+                'file_bytes': group['file_bytes'],
+                'total_s': round(total, 6),
+                'mean_ms': round(total / len(lat) * 1000, 3) if lat else 0.0,
+                'p50_ms': round(_percentile(lat, 0.50) * 1000, 3),
+                'p90_ms': round(_percentile(lat, 0.90) * 1000, 3),
+                'p99_ms': round(_percentile(lat, 0.99) * 1000, 3),
+                'max_ms': round(lat[-1] * 1000, 3) if lat else 0.0,
+            })
+        rows.sort(key=lambda r: r['total_s'], reverse=True)
+        slowest = [{'path': p, 'ext': e, 'extractor': x, 'seconds': round(s, 6)}
+                   for s, p, e, x in sorted(self._slowest, reverse=True)]
+        stages = {name: {'seconds': round(v['seconds'], 6), 'items': v['items']}
+                  for name, v in self.stages.items()}
+        return {'by_extractor': rows, 'stages': stages, 'slowest': slowest}
+
+    def write_report(self, json_path, csv_path=None):
+        """
+        写出 JSON 报告（完整内容）和 CSV（按扩展名/提取器的汇总表）
+        """
+        report = self.report()
+        folder = os.path.dirname(json_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        if csv_path:
+            fields = ['ext', 'extractor', 'calls', 'failures', 'file_bytes', 'total_s',
+                      'mean_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms']
+            with open(csv_path, 'w', newline='', encoding='utf-8-sig') as f:
+                writer = csv.DictWriter(f, fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(report['by_extractor'])
+        return report
+
+    def print_summary(self, limit=10):
+        report = self.report()
+        for row in report['by_extractor'][:limit]:
+            print(f"  {row['ext']:<6} {row['extractor']:<24} 调用 {row['calls']:>7}  失败 {row['failures']:>5}  "
+                  f"总计 {row['total_s']:>9.2f}s  p50 {row['p50_ms']:>8.1f}ms  p99 {row['p99_ms']:>8.1f}ms")
+        for name, stage in report['stages'].items():
+            print(f"  [阶段] {name:<16} {stage['items']:>7} 条  总计 {stage['seconds']:.2f}s")
@@ -0,0 +1,208 @@
+import os
+import hashlib
+import sqlite3
+
+# ----- 文本特征增量缓存：以 (规范化路径, 大小, 修改时间) 为键 ----- #
+
+# 提取/预处理逻辑的版本号：文件未变但提取出的文本会变时（提取器、规范化规则修改）加 1，
+# 打开缓存时版本不一致则清空文本缓存，年度分区签名也包含该版本号，旧的年度 pkl 会重写
+# 1: 初版；2: docx/pptx 流式提取（XML 解析方式变化）；3: 离线文本规范化替换 preprocess_text；
+# 4: 压缩包提取成员内容（原为文件名）；5: xls/xlsx 按行流式提取
+EXTRACT_VERSION = 5
+
+def normalize_cache_path(path):
+    """
+    规范化缓存键中的路径：绝对路径 + 统一大小写/分隔符（Windows 下不区分大小写）
+    """
+    return os.path.normcase(os.path.abspath(path))
+
+
+def open_feature_cache(db_path):
+    """
+    打开（或新建）SQLite 特征缓存库，返回连接对象
+    - features 表：每个文件在指定 len_doc 下的预处理文本
+    - partitions 表：每个年份的文件清单签名，用于判断年度 pkl 是否需要重写
+    - digests 表：文件内容哈希（同样以大小/修改时间判断是否失效）
+    - content_texts 表：内容哈希 -> 预处理文本，字节相同的副本只解析一次
+    - meta 表：EXTRACT_VERSION，与当前版本不一致时清空 features/content_texts/partitions（digests 与提取无关，保留）
+    """
+    folder = os.path.dirname(db_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS features ("
+        " path TEXT NOT NULL,"
+        " len_doc INTEGER NOT NULL,"
+        " size INTEGER NOT NULL,"
+        " mtime_ns INTEGER NOT NULL,"
+        " text TEXT NOT NULL,"
+        " PRIMARY KEY (path, len_doc))"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS partitions ("
+        " year TEXT PRIMARY KEY,"
+        " signature TEXT NOT NULL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS digests ("
+        " path TEXT PRIMARY KEY,"
+        " size INTEGER NOT NULL,"
+        " mtime_ns INTEGER NOT NULL,"
+        " digest BLOB NOT NULL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS content_texts ("
+        " digest BLOB NOT NULL,"
+        " len_doc INTEGER NOT NULL,"
+        " text TEXT NOT NULL,"
+        " PRIMARY KEY (digest, len_doc))"
+    )
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    row = conn.execute("SELECT value FROM meta WHERE key = 'extract_version'").fetchone()
+    if row is None or row[0] != str(EXTRACT_VERSION):
+        conn.execute("DELETE FROM features")
+        conn.execute("DELETE FROM content_texts")
+        conn.execute("DELETE FROM partitions")
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('extract_version', ?)",
+                     (str(EXTRACT_VERSION),))
+        if row is not None:
+            print(f"文本提取逻辑已更新（版本 {row[0]} -> {EXTRACT_VERSION}），已清空特征缓存")
+    conn.commit()
+    return conn
+
+
+def stat_key(path):
+    """
+    返回 (大小, 修改时间纳秒)，文件不可访问时返回 None
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def entry_stat_key(entry):
+    """
+    同 stat_key，但直接使用 os.DirEntry 缓存的 stat 结果（Windows 下无需额外系统调用）
+    """
+    try:
+        st = entry.stat()
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def lookup_feature(conn, path, len_doc, size, mtime_ns):
+    """
+    查询缓存：仅当大小和修改时间都一致时命中，返回文本；否则返回 None
+    """
+    row = conn.execute(
+        "SELECT size, mtime_ns, text FROM features WHERE path = ? AND len_doc = ?",
+        (normalize_cache_path(path), len_doc)
+    ).fetchone()
+    if row is None or row[0] != size or row[1] != mtime_ns:
+        return None
+    return row[2]
+
+
+def store_feature(conn, path, len_doc, size, mtime_ns, text):
+    """
+    写入（或覆盖）一条缓存记录，调用方负责 commit
+    """
+    conn.execute(
+        "INSERT OR REPLACE INTO features (path, len_doc, size, mtime_ns, text) VALUES (?, ?, ?, ?, ?)",
+        (normalize_cache_path(path), len_doc, size, mtime_ns, text)
+    )
+
+
+def lookup_digest(conn, path, size=None, mtime_ns=None):
+    """
+    查询文件内容哈希；给出 size/mtime_ns 时只在二者一致时命中
+    """
+    row = conn.execute(
+        "SELECT size, mtime_ns, digest FROM digests WHERE path = ?",
+        (normalize_cache_path(path),)
+    ).fetchone()
+    if row is None:
+        return None
+    if size is not None and (row[0] != size or row[1] != mtime_ns):
+        return None
+    return row[2]
+
+
+def store_digest(conn, path, size, mtime_ns, digest):
+    conn.execute(
+        "INSERT OR REPLACE INTO digests (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+        (normalize_cache_path(path), size, mtime_ns, digest)
+    )
+
+
+def lookup_content_text(conn, digest, len_doc):
+    row = conn.execute(
+        "SELECT text FROM content_texts WHERE digest = ? AND len_doc = ?",
+        (digest, len_doc)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def store_content_text(conn, digest, len_doc, text):
+    conn.execute(
+        "INSERT OR REPLACE INTO content_texts (digest, len_doc, text) VALUES (?, ?, ?)",
+        (digest, len_doc, text)
+    )
+
+
+def partition_signature(file_paths, stat_keys, len_doc):
+    """
+    计算某年份文件清单的签名（提取版本 + 路径 + 大小 + 修改时间 + len_doc），清单不变则签名不变
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"v{EXTRACT_VERSION}:{len_doc}".encode('utf-8'))
+    for path, key in zip(file_paths, stat_keys):
+        h.update(normalize_cache_path(path).encode('utf-8', 'surrogatepass'))
+        h.update(b'\0')
+        h.update(repr(key).encode('ascii'))
+        h.update(b'\n')
+    return h.hexdigest()
+
+
+def get_partition_signature(conn, year):
+    row = conn.execute("SELECT signature FROM partitions WHERE year = ?", (str(year),)).fetchone()
+    return row[0] if row else None
+
+
+def set_partition_signature(conn, year, signature):
+    conn.execute(
+        "INSERT OR REPLACE INTO partitions (year, signature) VALUES (?, ?)",
+        (str(year), signature)
+    )
+
+
+def prune_missing(conn, keep_paths, len_doc, prefixes):
+    """
+    删除缓存中位于 prefixes 目录下、但本次扫描已不存在的文件记录，避免缓存无限增长
+    """
+    keep = set(normalize_cache_path(p) for p in keep_paths)
+    removed = 0
+    for prefix in prefixes:
+        prefix = normalize_cache_path(prefix).rstrip(os.sep) + os.sep
+        rows = conn.execute(
+            "SELECT path FROM features WHERE len_doc = ? AND substr(path, 1, ?) = ?",
+            (len_doc, len(prefix), prefix)
+        ).fetchall()
+        stale = [(r[0], len_doc) for r in rows if r[0] not in keep]
+        if stale:
+            conn.executemany("DELETE FROM features WHERE path = ? AND len_doc = ?", stale)
+            removed += len(stale)
+        rows = conn.execute(
+            "SELECT path FROM digests WHERE substr(path, 1, ?) = ?",
+            (len(prefix), prefix)
+        ).fetchall()
+        stale = [(r[0],) for r in rows if r[0] not in keep]
+        if stale:
+            conn.executemany("DELETE FROM digests WHERE path = ?", stale)
+    return removed
@@ -0,0 +1,165 @@
+import numpy as np
+
+# ----- 嵌入降维 + 量化：384 维 float32 的 SBERT 向量 -> k 维 int8 / float16 特征 ----- #
+# - method: 'pca'（拟合主成分）或 'random'（高斯随机投影，不需要拟合数据）
+# - quantize: 'int8'（按维度对称缩放，训练集 99.9% 分位映射到 ±127）、'float16' 或 None（float32）
+# - 拟合后的降维器挂在模型对象的 feature_reducer_ 属性上，随模型一起 pickle、保存版本、导出模型包，
+#   P02 训练/增量更新和 P03 预测都从模型上取同一个降维器，保证变换完全一致
+# - 变换只用 NumPy（float64 矩阵乘法后再量化），不依赖 sklearn 版本
+
+REDUCER_ATTR = 'feature_reducer_'
+
+_QUANT_DTYPES = {'int8': np.int8, 'float16': np.float16, None: np.float32}
+
+
+class FeatureReducer:
+    """
+    Args:
+        method (str): 'pca' / 'random' / None（只量化不降维）
+        n_components (int): 降维后的维度
+        quantize (str): 'int8' / 'float16' / None
+        clip_quantile (float): int8 量化时用于确定缩放系数的分位数，超出部分截断
+    """
+
+    def __init__(self, method='pca', n_components=128, quantize='int8', clip_quantile=0.999, random_state=42):
+        if method not in ('pca', 'random', None):
+            raise ValueError(f"未知的降维方法：{method}")
+        if quantize not in _QUANT_DTYPES:
+            raise ValueError(f"未知的量化方式：{quantize}")
+        self.method = method
+        self.n_components = n_components
+        self.quantize = quantize
+        self.clip_quantile = clip_quantile
+        self.random_state = random_state
+        self.mean_ = None
+        self.components_ = None
+        self.scale_ = None
+
+    def describe(self):
+        return {'method': self.method, 'n_components': self.n_output_, 'quantize': self.quantize}
+
+    @property
+    def n_output_(self):
+        return None if self.components_ is None else int(self.components_.shape[0])
+
+    def fit(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        d = X.shape[1]
+        k = min(self.n_components or d, d) if self.method else d
+        if self.method == 'pca':
+            from sklearn.decomposition import PCA
+            pca = PCA(n_components=min(k, len(X)), svd_solver='randomized', random_state=self.random_state).fit(X)
+            self.mean_ = pca.mean_.astype(np.float64)
+            self.components_ = pca.components_.astype(np.float64)
+        elif self.method == 'random':
+            rng = np.random.default_rng(self.random_state)
+            self.mean_ = np.zeros(d)
+            self.components_ = rng.standard_normal((k, d)) / np.sqrt(k)
+        else:
+            self.mean_ = np.zeros(d)
+            self.components_ = np.eye(d)
+
+        if self.quantize == 'int8':
+            Z = self._project(X)
+            bound = np.quantile(np.abs(Z), self.clip_quantile, axis=0) if len(Z) else np.ones(k)
+            bound[bound == 0] = 1.0
+            self.scale_ = bound / 127.0
+        return self
+
+    def _project(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) @ self.components_.T
+
+    def transform(self, X):
+        if self.components_ is None:
+            raise RuntimeError("降维器尚未拟合")
+        Z = self._project(X)
+        if self.quantize == 'int8':
+            return np.clip(np.rint(Z / self.scale_), -127, 127).astype(np.int8)
+        return Z.astype(_QUANT_DTYPES[self.quantize])
+
+    def fit_transform(self, X):
+        return self.fit(X).transform(X)
+
+    # 模型包中以数组形式保存，不 pickle 对象
+    def to_arrays(self):
+        arrays = {'mean': self.mean_, 'components': self.components_}
+        if self.scale_ is not None:
+            arrays['scale'] = self.scale_
+        return self.describe(), arrays
+
+    @classmethod
+    def from_arrays(cls, meta, arrays):
+        reducer = cls(method=meta['method'], n_components=meta['n_components'], quantize=meta['quantize'])
+        reducer.mean_ = np.asarray(arrays['mean'], dtype=np.float64)
+        reducer.components_ = np.asarray(arrays['components'], dtype=np.float64)
+        reducer.scale_ = None if 'scale' not in arrays else np.asarray(arrays['scale'], dtype=np.float64)
+        return reducer
+
+
+def attach_reducer(model, reducer):
+    setattr(model, REDUCER_ATTR, reducer)
+    return model
+
+
+def get_reducer(model):
+    return getattr(model, REDUCER_ATTR, None)
+
+
+def apply_reducer(model, X):
+    """
+    模型带有降维器时先变换 X，否则原样返回
+    """
+    reducer = get_reducer(model)
+    return X if reducer is None else reducer.transform(X)
+
+
+def benchmark_reducers(X, Y, configs, backend='multioutput_rf', sample_weight=None, test_size=0.2, random_state=42):
+    """
+    在同一训练/测试划分上比较各降维配置：特征内存、训练耗时、微平均 F1，以及相对不降维（configs 中的 None）的变化
+    降维器只在训练集上拟合；返回每个配置一行的字典列表
+    """
+    import time
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import f1_score
+    from classifier_backends import make_classifier, predict_label_proba
+
+    tr, te = train_test_split(np.arange(len(X)), test_size=test_size, random_state=random_state)
+    rows = []
+    for config in configs:
+        t0 = time.perf_counter()
+        if config is None:
+            X_tr, X_te = np.asarray(X[tr], dtype=np.float32), np.asarray(X[te], dtype=np.float32)
+        else:
+            reducer = FeatureReducer(random_state=random_state, **config).fit(X[tr])
+            X_tr, X_te = reducer.transform(X[tr]), reducer.transform(X[te])
+        reduce_s = time.perf_counter() - t0
+
+        model = make_classifier(backend, random_state=random_state)
+        fit_params = {} if sample_weight is None else {'sample_weight': sample_weight[tr]}
+        t0 = time.perf_counter()
+        model.fit(X_tr, Y[tr], **fit_params)
+        fit_s = time.perf_counter() - t0
+        P = predict_label_proba(model, X_te)
+        f1 = f1_score(Y[te], (P >= 0.5).astype(int), average='micro', zero_division=0)
+
+        name = 'none' if config is None else f"{config.get('method')}-{config.get('n_components')}-{config.get('quantize')}"
+        rows.append({
+            'reducer': name,
+            'dims': X_tr.shape[1],
+            'dtype': str(X_tr.dtype),
+            # 全部样本按该配置存放时的特征矩阵大小
+            'feature_mb': round(len(X) * X_tr.shape[1] * X_tr.dtype.itemsize / 1024 / 1024, 3),
+            'reduce_s': round(reduce_s, 3),
+            'fit_s': round(fit_s, 3),
+            'micro_f1': round(float(f1), 4),
+        })
+        print(f"  {name:<22} {rows[-1]['dims']:>4} 维 {rows[-1]['dtype']:<8} 特征 {rows[-1]['feature_mb']:>8.2f}MB  "
+              f"训练 {fit_s:>8.2f}s  微平均F1 {rows[-1]['micro_f1']:.4f}")
+
+    base = next((r for r in rows if r['reducer'] == 'none'), None)
+    for row in rows:
+        if base is not None:
+            row['speedup'] = round(base['fit_s'] / max(row['fit_s'], 1e-9), 2)
+            row['memory_saved'] = round(1 - row['feature_mb'] / max(base['feature_mb'], 1e-9), 3)
+            row['f1_change'] = round(row['micro_f1'] - base['micro_f1'], 4)
+    return rows
@@ -0,0 +1,77 @@
+import os
+import time
+
+try:
+    import fcntl  # 类 Unix 系统
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt  # Windows
+except ImportError:
+    msvcrt = None
+
+# ----- 跨进程的独占文件锁：向量库、移动日志等多个进程共用的文件，写入前先加锁 ----- #
+# - 类 Unix 用 flock，Windows 用 msvcrt.locking（锁住锁文件的第一个字节）；进程退出时系统自动释放
+# - 锁属于打开的文件句柄，同一进程内的不同 FileLock 对象之间同样互斥；不可重入，已持有时不要再次加锁
+
+
+class FileLock:
+    """
+    with FileLock(path): ... —— 阻塞直到拿到锁；timeout 秒后仍未拿到时抛出 TimeoutError（None 表示一直等）
+    """
+
+    def __init__(self, path, timeout=None, poll=0.05):
+        self.path = path
+        self.timeout = timeout
+        self.poll = poll
+        self._f = None
+
+    @property
+    def locked(self):
+        return self._f is not None
+
+    def acquire(self):
+        if self._f is not None:
+            raise RuntimeError(f"文件锁不可重入：{self.path}")
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        f = open(self.path, 'a+b')
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        try:
+            while True:
+                try:
+                    if fcntl is not None:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if deadline is None else fcntl.LOCK_NB))
+                    elif msvcrt is not None:
+                        f.seek(0)
+                        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise TimeoutError(f"等待文件锁超时：{self.path}")
+                    time.sleep(self.poll)
+        except BaseException:
+            f.close()
+            raise
+        self._f = f
+        return self
+
+    def release(self):
+        f, self._f = self._f, None
+        if f is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            f.close()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,129 @@
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# ----- 批量森林推理：把所有标签的所有树拼成一张节点表，一批样本 × 全部树一次遍历完 ----- #
+# - 节点表：children[2*i] / children[2*i+1] 为左右子节点；叶子的两个子节点都指向自己、阈值为 +inf，
+#   这样“下一个节点 == 当前节点”即表示到达叶子，遍历时不需要单独判断叶子
+# - 比较规则与 sklearn 一致：X 转为 float32 后与 float64 阈值比较，X[:, feature] <= threshold 走左子树
+# - 安装了 numba 时用编译的遍历核（按树并行）；否则用 NumPy：每个 (样本, 树) 对是一条游标，
+#   每轮所有未到叶子的游标同时下降一层，Python 层循环次数 = 最大树深，与样本数、树数无关
+# - 到达叶子后按组把叶子上的概率求和再除以该组的树数，得到每组 (n, k) 的正类概率
+
+_apply_kernel = None
+
+
+def _compiled_kernel():
+    """
+    第一次使用时编译（cache=True 时编译结果缓存在 __pycache__，下次启动直接加载）；没有 numba 时返回 None
+    """
+    global _apply_kernel
+    if _apply_kernel is None and numba is not None:
+        @numba.njit(parallel=True, cache=True, nogil=True)
+        def kernel(X, roots, feature, threshold, children, out):
+            # 外层按树：一棵树的节点很小，整批样本走完这棵树之前它一直留在 CPU 缓存里
+            for t in numba.prange(roots.shape[0]):
+                for i in range(X.shape[0]):
+                    nd = roots[t]
+                    while True:
+                        nxt = children[2 * nd + (1 if X[i, feature[nd]] > threshold[nd] else 0)]
+                        if nxt == nd:
+                            break
+                        nd = nxt
+                    out[t, i] = nd
+
+        _apply_kernel = kernel
+    return _apply_kernel
+
+
+class ForestEngine:
+    """
+    groups: {组名: {'feature', 'threshold', 'left', 'right', 'value', 'roots'}}，格式同 model_bundle 中的森林组
+    （left/right/roots 为组内的全局节点下标）
+    use_compiled: None 表示有 numba 就用；False 强制使用 NumPy 实现
+    """
+
+    def __init__(self, groups, use_compiled=None):
+        self.names = list(groups)
+        feature, threshold, children, roots = [], [], [], []
+        self._values = []
+        self._tree_slices = []
+        node_offset = 0
+        tree_offset = 0
+        for name in self.names:
+            g = groups[name]
+            left = np.asarray(g['left'])
+            leaf = left < 0
+            own = np.arange(node_offset, node_offset + len(left), dtype=np.intp)
+            # 组内下标平移到拼接后的全局节点表；叶子的子节点指向自己
+            pair = np.empty((len(left), 2), dtype=np.intp)
+            pair[:, 0] = np.where(leaf, own, left.astype(np.intp) + node_offset)
+            pair[:, 1] = np.where(leaf, own, np.asarray(g['right'], dtype=np.intp) + node_offset)
+            children.append(pair.ravel())
+            feature.append(np.where(leaf, 0, np.asarray(g['feature'], dtype=np.intp)))
+            threshold.append(np.where(leaf, np.inf, np.asarray(g['threshold'], dtype=np.float64)))
+            roots.append(np.asarray(g['roots'], dtype=np.intp) + node_offset)
+
+            n_trees = len(g['roots'])
+            self._values.append((node_offset, np.asarray(g['value'], dtype=np.float64)))
+            self._tree_slices.append(slice(tree_offset, tree_offset + n_trees))
+            node_offset += len(left)
+            tree_offset += n_trees
+
+        def cat(parts, dtype):
+            return np.concatenate(parts).astype(dtype, copy=False) if parts else np.zeros(0, dtype=dtype)
+
+        self.feature = cat(feature, np.intp)
+        self.threshold = cat(threshold, np.float64)
+        self.children = cat(children, np.intp)
+        self.roots = cat(roots, np.intp)
+        self._kernel = _compiled_kernel() if use_compiled is not False else None
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _apply_numpy(self, X):
+        n, d = X.shape
+        T = self.n_trees
+        flat_X = X.ravel()
+        node = np.tile(self.roots, n)
+        # 游标 i 对应样本 i // T；base 为该样本在 flat_X 中的起始偏移
+        base = np.repeat(np.arange(n, dtype=np.intp) * d, T)
+        active = np.arange(n * T, dtype=np.intp)
+        while len(active):
+            nd = node[active]
+            go_right = flat_X[base[active] + self.feature[nd]] > self.threshold[nd]
+            nxt = self.children[2 * nd + go_right]
+            node[active] = nxt
+            active = active[nxt != nd]
+        return node.reshape(n, T)
+
+    def apply(self, X):
+        """
+        返回 (n_samples, n_trees) 的叶子节点全局下标
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if self._kernel is None:
+            return self._apply_numpy(X)
+        out = np.empty((self.n_trees, len(X)), dtype=np.intp)
+        self._kernel(X, self.roots, self.feature, self.threshold, self.children, out)
+        return out.T
+
+    def predict_proba(self, X, batch_size=256):
+        """
+        返回 {组名: (n_samples, k) 正类概率}；按 batch_size 分批以限制叶子下标数组的内存（batch_size × 总树数）
+        """
+        X = np.asarray(X, dtype=np.float32)
+        n = len(X)
+        out = {name: np.zeros((n, value.shape[1])) for name, (_, value) in zip(self.names, self._values)}
+        for start in range(0, n, batch_size):
+            leaves = self.apply(X[start:start + batch_size])
+            for name, (offset, value), trees in zip(self.names, self._values, self._tree_slices):
+                # (b, n_trees, k) 沿树的方向求和，再除以树数，与 sklearn 的森林平均一致
+                proba = value[leaves[:, trees] - offset].sum(axis=1)
+                out[name][start:start + len(leaves)] = proba / (trees.stop - trees.start)
+        return out
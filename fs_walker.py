@@ -0,0 +1,109 @@
+import os
+import re
+import fnmatch
+from concurrent.futures import ThreadPoolExecutor
+
+# ----- 统一的目录遍历：基于 os.scandir，复用 DirEntry 缓存的类型/stat 信息 ----- #
+# - 按深度剪枝：超过 max_depth 的目录根本不会被打开
+# - 按名称排除：回收站、desktop.ini、Office 临时文件等（不区分大小写的通配符）
+# - 惰性产出：调用方可以边遍历边处理，随时中断
+# - 可选线程池：预取兄弟子目录的列表，适合延迟高的 USB 硬盘；产出顺序与单线程一致
+
+DEFAULT_EXCLUDE = ('$RECYCLE.BIN', 'desktop.ini', '~WRL*', '*.tmp')
+
+
+def compile_exclude(exclude):
+    """
+    把通配符列表编译成一个正则的 match 函数（作用于小写文件名），None/空列表表示不排除
+    """
+    if not exclude:
+        return None
+    pattern = '|'.join(fnmatch.translate(p.lower()) for p in exclude)
+    return re.compile(pattern).match
+
+
+def _list_dir(path, exclude_match):
+    """
+    列出单个目录（一次 scandir），过滤掉被排除的项；无法访问时打印错误并返回空列表
+    """
+    try:
+        with os.scandir(path) as it:
+            if exclude_match is None:
+                return list(it)
+            return [e for e in it if not exclude_match(e.name.lower())]
+    except OSError as e:
+        print(f"无法读取目录 {path}: {e}")
+        return []
+
+
+def _is_dir(entry, follow_symlinks):
+    try:
+        return entry.is_dir(follow_symlinks=follow_symlinks)
+    except OSError:
+        return False
+
+
+def _walk(path, depth, listing, match, max_depth, topdown, follow_symlinks, pool):
+    entries = listing.result() if listing is not None else _list_dir(path, match)
+    descend = max_depth is None or depth < max_depth
+
+    # 线程池模式：先把本层所有要进入的子目录提交给线程池预取
+    prefetched = {}
+    if pool is not None and descend:
+        for entry in entries:
+            if _is_dir(entry, follow_symlinks):
+                prefetched[entry.path] = pool.submit(_list_dir, entry.path, match)
+
+    for entry in entries:
+        is_dir = _is_dir(entry, follow_symlinks)
+        if topdown:
+            yield entry, depth
+        if is_dir and descend:
+            yield from _walk(entry.path, depth + 1, prefetched.pop(entry.path, None), match,
+                             max_depth, topdown, follow_symlinks, pool)
+        if not topdown:
+            yield entry, depth
+
+
+def scan_tree(root, max_depth=None, exclude=DEFAULT_EXCLUDE, topdown=True,
+              follow_symlinks=False, workers=0):
+    """
+    惰性遍历 root 目录树，产出 (DirEntry, depth)
+
+    Args:
+        root (str): 起始目录
+        max_depth (int): 最大深度，root 的直接子项深度为 0；None 表示不限制
+        exclude (iterable): 排除的名称通配符（不区分大小写），被排除的目录不会进入
+        topdown (bool): True 时目录先于其内容产出；False 时目录在其内容之后产出（便于自下而上重命名）
+        follow_symlinks (bool): 是否进入符号链接指向的目录
+        workers (int): 大于 0 时用该数量的线程预取子目录列表
+
+    Yields:
+        (os.DirEntry, int): 目录项及其深度，entry.is_file()/entry.stat() 尽量复用 scandir 的结果
+    """
+    match = compile_exclude(exclude)
+    if not workers:
+        yield from _walk(root, 0, None, match, max_depth, topdown, follow_symlinks, None)
+        return
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        yield from _walk(root, 0, pool.submit(_list_dir, root, match), match,
+                         max_depth, topdown, follow_symlinks, pool)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_file_paths(roots, max_depth=None, exclude=DEFAULT_EXCLUDE, workers=0):
+    """
+    产出一个或多个目录下所有文件的路径
+    """
+    if isinstance(roots, (str, os.PathLike)):
+        roots = [roots]
+    for root in roots:
+        for entry, _ in scan_tree(root, max_depth=max_depth, exclude=exclude, workers=workers):
+            try:
+                if entry.is_file():
+                    yield entry.path
+            except OSError:
+                continue
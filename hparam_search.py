@@ -0,0 +1,178 @@
+import os
+import csv
+import math
+import json
+import time
+import numpy as np
+from scipy.stats import loguniform, randint
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401  启用 HalvingRandomSearchCV
+from sklearn.model_selection import HalvingRandomSearchCV, KFold
+
+from classifier_backends import make_classifier
+from model_versions import atomic_write_bytes
+
+# ----- 超参数搜索：在缓存的嵌入矩阵上做逐次减半（successive halving）随机搜索 ----- #
+# - 第一轮用少量样本评估大量候选，每轮只保留前 1/factor 的候选、样本数乘以 factor，
+#   最后一轮只剩少数候选在全部样本上评估，总开销远小于网格搜索
+# - 候选之间并行（n_jobs），每个候选内部单线程，避免与进程池叠加
+# - 结果：最优参数 JSON（P02 全量训练时自动读取）和包含每轮每个候选得分/训练耗时的排行榜 CSV
+# - 参数写成单标签分类器的参数名（native_rf / sgd_linear 为整个模型的参数名），与 make_classifier(params=...) 一致
+
+BEST_PARAMS_PATH = 'hparam_best.json'
+LEADERBOARD_PATH = 'hparam_leaderboard.csv'
+
+# 各后端的搜索空间：列表为离散取值，scipy 分布为连续/整数采样
+PARAM_SPACES = {
+    'multioutput_rf': {
+        'n_estimators': [100, 200, 300, 400],
+        'max_depth': [None, 16, 32, 64],
+        'min_samples_leaf': [1, 2, 4, 8],
+        'max_features': ['sqrt', 'log2', 0.1, 0.2],
+        'class_weight': ['balanced', 'balanced_subsample', None],
+    },
+    'native_rf': {
+        'n_estimators': [100, 200, 300, 400],
+        'max_depth': [None, 16, 32, 64],
+        'min_samples_leaf': [1, 2, 4, 8],
+        'max_features': ['sqrt', 'log2', 0.1, 0.2],
+        'class_weight': ['balanced', 'balanced_subsample', None],
+    },
+    'ovr_linear': {
+        'C': loguniform(1e-2, 1e2),
+        'class_weight': ['balanced', None],
+    },
+    'hist_gb': {
+        'learning_rate': loguniform(0.02, 0.3),
+        'max_iter': randint(50, 400),
+        'max_leaf_nodes': [15, 31, 63],
+        'l2_regularization': loguniform(1e-4, 1.0),
+    },
+    'sgd_linear': {
+        'alpha': loguniform(1e-6, 1e-2),
+        'n_epochs': [5, 10, 20],
+    },
+}
+# hier_rf 的组/成员分类器与 multioutput_rf 使用同一种单标签随机森林
+PARAM_SPACES['hier_rf'] = PARAM_SPACES['multioutput_rf']
+
+_FOREST_BACKENDS = ('multioutput_rf', 'native_rf', 'hier_rf')
+
+
+def _prefix(backend):
+    # 逐标签后端的单标签分类器参数在外层模型中的名字为 estimator__xxx
+    return '' if backend in ('native_rf', 'sgd_linear') else 'estimator__'
+
+
+def _plain(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def run_halving_search(X, Y, backend='multioutput_rf', sample_weight=None, space=None, n_candidates=48,
+                       factor=3, resource='n_samples', max_trees=400, cv=3, n_jobs=-1, random_state=42,
+                       best_path=BEST_PARAMS_PATH, leaderboard_path=LEADERBOARD_PATH, label_names=None):
+    """
+    逐次减半随机搜索，按微平均 F1 选最优参数，写出最优参数 JSON 和排行榜 CSV，返回最优参数结果字典
+
+    Args:
+        X (ndarray): 缓存的嵌入矩阵（可以是降维/量化后的特征）
+        Y (ndarray): (n, n_labels) 0/1 标签矩阵
+        backend (str): classifier_backends 中的后端名
+        space (dict): 搜索空间，默认 PARAM_SPACES[backend]
+        n_candidates (int): 第一轮的候选数
+        factor (int): 每轮保留 1/factor 的候选，资源乘以 factor
+        resource (str): 'n_samples'（按样本数逐轮增加）或 'n_estimators'（仅随机森林，按树数逐轮增加）
+        max_trees (int): resource='n_estimators' 时最后一轮的树数
+        cv (int): 每个候选的折数
+        label_names (list): 类别名列表（hier_rf 需要）
+    """
+    space = dict(PARAM_SPACES[backend] if space is None else space)
+    prefix = _prefix(backend)
+    Y = np.asarray(Y)
+    # 让 n_candidates 个候选正好减半到最后一轮用满全部资源所需的轮数
+    n_iter = max(1, math.ceil(math.log(max(n_candidates, 1)) / math.log(factor)))
+    if resource == 'n_estimators':
+        if backend not in _FOREST_BACKENDS:
+            raise ValueError(f"只有随机森林后端可以按树数分配资源：{backend}")
+        space.pop('n_estimators', None)
+        search_kwargs = {'resource': prefix + 'n_estimators', 'max_resources': max_trees,
+                         'min_resources': max(max_trees // factor ** (n_iter - 1), 1)}
+    elif resource == 'n_samples':
+        # min_resources='exhaust' 对分类器会按一维 y 统计类别数，多标签 Y 会报错；
+        # 这里按同样的思路直接算出起始样本数：每折每个标签至少约 2 个样本，且最后一轮用满全部样本
+        n_samples = len(Y)
+        n_outputs = Y.shape[1] if Y.ndim == 2 else len(np.unique(Y))
+        search_kwargs = {'min_resources': min(max(cv * 2 * n_outputs, n_samples // factor ** (n_iter - 1)),
+                                              n_samples)}
+    else:
+        raise ValueError(f"未知的资源类型：{resource}")
+
+    search = HalvingRandomSearchCV(
+        make_classifier(backend, n_jobs=1, random_state=random_state, label_names=label_names),
+        {prefix + k: v for k, v in space.items()},
+        n_candidates=n_candidates,
+        factor=factor,
+        cv=KFold(n_splits=cv, shuffle=True, random_state=random_state),
+        scoring='f1_micro',
+        refit=False,
+        n_jobs=n_jobs,
+        random_state=random_state,
+        verbose=1,
+        **search_kwargs,
+    )
+    fit_params = {} if sample_weight is None else {'sample_weight': sample_weight}
+    t0 = time.perf_counter()
+    search.fit(X, Y, **fit_params)
+    seconds = time.perf_counter() - t0
+
+    res = search.cv_results_
+    rows = []
+    for i in range(len(res['params'])):
+        rows.append({
+            'iter': int(res['iter'][i]),
+            'n_resources': int(res['n_resources'][i]),
+            'rank_in_iter': int(res['rank_test_score'][i]),
+            'mean_f1': round(float(res['mean_test_score'][i]), 4),
+            'std_f1': round(float(res['std_test_score'][i]), 4),
+            'mean_fit_s': round(float(res['mean_fit_time'][i]), 3),
+            'params': json.dumps({k[len(prefix):]: _plain(v) for k, v in res['params'][i].items()},
+                                 ensure_ascii=False),
+        })
+    rows.sort(key=lambda r: (-r['iter'], r['rank_in_iter']))
+    with open(leaderboard_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    # 所有候选的训练量折合成“在全部资源上训练一次”的次数，与网格搜索对比
+    full_fits = float(np.sum(np.asarray(res['n_resources'], dtype=np.float64)) * cv / search.max_resources_)
+    best = {
+        'backend': backend,
+        'params': {k[len(prefix):]: _plain(v) for k, v in search.best_params_.items()},
+        'best_micro_f1': round(float(search.best_score_), 4),
+        'resource': resource,
+        'factor': factor,
+        'n_candidates': len(res['params']),
+        'n_iterations': int(search.n_iterations_),
+        'equivalent_full_fits': round(full_fits, 1),
+        'search_seconds': round(seconds, 1),
+        'searched_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    atomic_write_bytes(best_path, json.dumps(best, ensure_ascii=False, indent=2).encode('utf-8'))
+    print(f"搜索完成：{best['n_iterations']} 轮 {best['n_candidates']} 次评估，耗时 {seconds:.1f}s，"
+          f"折合全量训练 {best['equivalent_full_fits']} 次")
+    print(f"最优参数（微平均 F1 {best['best_micro_f1']:.4f}）：{best['params']}")
+    print(f"  - {best_path}\n  - {leaderboard_path}")
+    return best
+
+
+def load_best_params(backend, path=BEST_PARAMS_PATH):
+    """
+    读取搜索得到的最优参数；文件不存在或不是该后端的结果时返回 None（使用默认参数）
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        best = json.load(f)
+    if best.get('backend') != backend:
+        return None
+    return dict(best['params'])
@@ -0,0 +1,306 @@
+import os
+import sys
+import time
+import queue
+import struct
+import threading
+
+from P03_testing import (extract_features_batch, embed_texts, load_model_and_labels, predict_proba,
+                         move_classified)
+from classify_client import connect_service
+from embedding_store import EMBED_STORE_DIR
+from fs_walker import iter_file_paths, compile_exclude, DEFAULT_EXCLUDE
+
+try:
+    from watchdog.observers import Observer  # 可选：跨平台（Windows 上为 ReadDirectoryChangesW）
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+
+# ----- 监视模式：文件落到收件目录后几秒内完成分类并移动到 DoneFileArchived/<标签> ----- #
+# - 事件来源：watchdog（已安装时）或 Linux inotify（ctypes 直接调用，无需依赖）；不做周期性的全目录扫描，
+#   只在启动时扫描一次已有文件、新建/移入子目录时遍历该子目录、inotify 事件队列溢出时重扫一次
+# - 去抖：下载中的临时文件（.crdownload/.part/.tmp、Office 的 ~$ 锁文件）直接忽略，改名为正式文件名后才处理；
+#   其余文件在大小和修改时间连续 settle 秒不变、且能以只读方式打开后才视为写完
+# - 同一轮中写完的文件合成一个小批次（不超过 max_batch）提取、分类、移动；分类出错（模型重新加载、文件被占用、
+#   服务不可用等）的批次放回等待队列，retry_delay 秒后重试，连续失败时等待时间加倍（最多 max_retry_delay 秒）；
+#   常驻分类服务在运行时交给服务，否则在本进程内加载一次模型并常驻（模型文件更新后自动重新加载）
+
+IN_PROGRESS = ('*.crdownload', '*.part', '*.partial', '*.download', '~$*', '.~lock*')
+is_temporary = compile_exclude(DEFAULT_EXCLUDE + IN_PROGRESS)
+
+# inotify 常量（linux/inotify.h）
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct('iIII')   # wd, mask, cookie, len，其后为 len 字节的文件名
+
+
+class InotifyWatcher:
+    """
+    递归监视 root 的 Linux inotify 实现：每个目录一个 watch，新目录出现时自动加入；
+    文件事件调用 on_path(路径)，队列溢出时调用 on_path(root) 让调用方重扫一次
+    """
+
+    def __init__(self, root, on_path):
+        import ctypes
+        import ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self.root = root
+        self.on_path = on_path
+        self._dirs = {}
+        self._add_tree(root)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _add_watch(self, path):
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), mask)
+        if wd >= 0:
+            self._dirs[wd] = path
+
+    def _add_tree(self, path):
+        self._add_watch(path)
+        for dirpath, dirnames, _ in os.walk(path):
+            for d in dirnames:
+                self._add_watch(os.path.join(dirpath, d))
+
+    def _run(self):
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except OSError:
+                return      # stop() 关闭了描述符
+            pos = 0
+            while pos + _EVENT.size <= len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, pos)
+                name = data[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b'\0')
+                pos += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    self.on_path(self.root)
+                    continue
+                folder = self._dirs.get(wd)
+                if folder is None or not name:
+                    continue
+                path = os.path.join(folder, os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        self._add_tree(path)
+                        self.on_path(path)      # 加 watch 之前已落入新目录的文件由调用方遍历一次
+                else:
+                    self.on_path(path)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        os.close(self._fd)
+
+
+def watchdog_event_path(event):
+    """
+    watchdog 事件 -> 需要处理的路径，不需要处理时返回 None
+    目录只处理新建/移入（调用方遍历该目录一次）；目录的 modified 事件在其中任一文件写入时都会触发，忽略
+    """
+    if event.is_directory:
+        if event.event_type not in ('created', 'moved'):
+            return None
+    elif event.event_type not in ('created', 'modified', 'moved', 'closed'):
+        return None
+    return getattr(event, 'dest_path', '') or event.src_path
+
+
+def start_watcher(root, on_path):
+    """
+    启动递归监视，优先 watchdog，其次 Linux inotify；返回带 stop() 方法的对象
+    """
+    if Observer is not None:
+        class Handler(FileSystemEventHandler):
+            def dispatch(self, event):
+                path = watchdog_event_path(event)
+                if path:
+                    on_path(path)
+
+        observer = Observer()
+        observer.schedule(Handler(), root, recursive=True)
+        observer.start()
+        return observer
+    if sys.platform.startswith('linux'):
+        watcher = InotifyWatcher(root, on_path)
+        watcher.start()
+        return watcher
+    raise ImportError("监视模式需要 watchdog：pip install watchdog")
+
+
+class Debouncer:
+    """
+    记录有事件的文件，pop_ready() 返回大小/修改时间已稳定 settle 秒且可以打开的文件
+    """
+
+    def __init__(self, settle=1.0):
+        self.settle = settle
+        self._pending = {}      # 路径 -> ((大小, 修改时间), 最近一次变化的时刻)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __contains__(self, path):
+        return path in self._pending
+
+    def touch(self, path, now=None):
+        # 已在等待的文件只有大小/修改时间确实变化时才重新计时，重复的事件不会推迟它
+        now = time.monotonic() if now is None else now
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        cur = (st.st_size, st.st_mtime_ns)
+        pending = self._pending.get(path)
+        if pending is None or pending[0] != cur:
+            self._pending[path] = (cur, now)
+
+    def retry(self, paths, delay, now=None):
+        # 处理失败的文件放回等待队列，delay 秒后再次就绪；期间文件有变化时照常重新计时
+        now = time.monotonic() if now is None else now
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            self._pending[path] = ((st.st_size, st.st_mtime_ns), now + delay - self.settle)
+
+    def pop_ready(self, now=None):
+        now = time.monotonic() if now is None else now
+        ready = []
+        for path, (sig, changed) in list(self._pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self._pending[path]     # 已删除或被改名（改名后的新路径会有自己的事件）
+                continue
+            cur = (st.st_size, st.st_mtime_ns)
+            if cur != sig:
+                self._pending[path] = (cur, now)
+                continue
+            if now - changed < self.settle:
+                continue
+            try:
+                # Windows 上写入中的文件通常被独占，打开失败说明还没写完
+                with open(path, 'rb'):
+                    pass
+            except OSError:
+                continue
+            del self._pending[path]
+            ready.append(path)
+        return ready
+
+
+class _BatchClassifier:
+    # 常驻的本地模型（服务不在运行时使用）；模型文件更新后下一批自动重新加载
+    _MODEL_FILES = ('rf_model.pkl', os.path.join('rf_model_bundle', 'meta.json'))
+
+    def __init__(self, dst_root, L, thresh, embed_store_dir):
+        self.dst_root = dst_root
+        self.L = L
+        self.thresh = thresh
+        self.embed_store_dir = embed_store_dir
+        self.model = self.labels = None
+        self._stamp = None
+
+    def _model_stamp(self):
+        return tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in self._MODEL_FILES)
+
+    def classify(self, fps):
+        t0 = time.perf_counter()
+        texts = extract_features_batch(fps, self.L)
+        client = connect_service()
+        if client is not None:
+            labels, P = client.classify_texts(texts)
+        else:
+            stamp = self._model_stamp()
+            if self.model is None or stamp != self._stamp:
+                self.model, self.labels = load_model_and_labels()
+                self._stamp = stamp
+            labels = self.labels
+            P = predict_proba(self.model, embed_texts(texts, self.embed_store_dir))
+        move_classified(fps, P, labels, self.dst_root, self.thresh)
+        print(f"已分类 {len(fps)} 个文件，用时 {time.perf_counter() - t0:.2f}s")
+
+
+def watch_inbox(src_dir, dst_root, L=50, thresh=0.5, settle=1.0, max_batch=32, tick=0.2,
+                embed_store_dir=EMBED_STORE_DIR, initial_scan=True, stop_event=None,
+                retry_delay=5.0, max_retry_delay=300.0):
+    """
+    监视 src_dir，文件写完后分批分类并移动到 dst_root/<标签>，Ctrl+C（或 stop_event 置位）结束
+
+    Args:
+        settle (float): 文件大小/修改时间保持不变多少秒后视为写完
+        max_batch (int): 每批最多分类的文件数
+        tick (float): 检查待处理文件的间隔（秒）
+        initial_scan (bool): 启动时先处理目录中已有的文件
+        retry_delay (float): 分类出错的批次多少秒后重试，连续失败时加倍
+        max_retry_delay (float): 重试间隔的上限（秒）
+    """
+    events = queue.Queue()
+    dst_abs = os.path.abspath(dst_root) + os.sep
+    debouncer = Debouncer(settle)
+    classifier = _BatchClassifier(dst_root, L, thresh, embed_store_dir)
+    n_failed = {}       # 路径 -> 连续分类出错的次数
+
+    def add(path):
+        if os.path.abspath(path).startswith(dst_abs) or is_temporary(os.path.basename(path).lower()):
+            return
+        if os.path.isdir(path):
+            for fp in iter_file_paths(path):
+                add(fp)
+        else:
+            debouncer.touch(path)
+
+    watcher = start_watcher(src_dir, events.put)
+    print(f"正在监视 {src_dir}，分类结果移动到 {dst_root}（Ctrl+C 结束）")
+    if initial_scan:
+        add(src_dir)
+    try:
+        while stop_event is None or not stop_event.is_set():
+            try:
+                add(events.get(timeout=tick))
+                while True:
+                    add(events.get_nowait())
+            except queue.Empty:
+                pass
+            ready = debouncer.pop_ready()
+            for i in range(0, len(ready), max_batch):
+                batch = ready[i:i + max_batch]
+                try:
+                    classifier.classify(batch)
+                except Exception as e:
+                    n = max(n_failed.get(fp, 0) for fp in batch) + 1
+                    delay = min(retry_delay * 2 ** (n - 1), max_retry_delay)
+                    for fp in batch:
+                        n_failed[fp] = n
+                    debouncer.retry(batch, delay)
+                    print(f"分类出错（{len(batch)} 个文件），{delay:.0f}s 后重试：{type(e).__name__}: {e}")
+                else:
+                    for fp in batch:
+                        n_failed.pop(fp, None)
+            # 已被删除/移走、不再等待重试的文件不再记录
+            for fp in [fp for fp in n_failed if fp not in debouncer]:
+                del n_failed[fp]
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+        print("已停止监视")
+
+
+if __name__ == '__main__':
+    src = r"C:\MyDocument\ToDoList\D20_ToDailyNotice"
+    dst = os.path.join(os.getcwd(), "DoneFileArchived")
+    os.makedirs(dst, exist_ok=True)
+    watch_inbox(src, dst, L=50, thresh=0.5)
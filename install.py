@@ -1,4 +1,7 @@
 # Windows: 下载并安装UnRAR，将unrar.exe添加到系统PATH。
-# pip install sentence-transformers==2.2.2 scikit-learn==1.2.2 nltk==3.9.1 python-docx==1.1.2 python-pptx==1.0.2 rarfile==4.2 pandas==1.5.3 numpy==1.24.2
-# 安装完成后，再运行：
-# python -m nltk.downloader stopwords
\ No newline at end of file
+# pip install sentence-transformers==2.2.2 scikit-learn==1.2.2 python-docx==1.1.2 python-pptx==1.0.2 rarfile==4.2 pandas==1.5.3 numpy==1.24.2 xlrd==2.0.1
+# 英文停用词已内置在 text_normalize.py 中，无需再下载 NLTK stopwords
+# xlsx 由 sheet_stream.py 直接流式解析；旧版 .xls 需要 xlrd
+# 可选：pip install numba —— forest_engine.py 用它编译森林推理核，未安装时自动改用纯 NumPy 实现
+# 可选：pip install onnxruntime —— embedder.py 首次使用时把 SBERT 导出为 ONNX（可选 int8 量化）在 CPU 上推理，未安装时使用 sentence-transformers
+# 可选：pip install watchdog —— inbox_watcher.py 的监视模式（Windows 必需；Linux 未安装时直接使用 inotify）
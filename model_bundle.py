@@ -0,0 +1,292 @@
+import os
+import json
+import shutil
+import numpy as np
+from forest_engine import ForestEngine
+from feature_reducer import FeatureReducer, get_reducer
+
+# ----- 紧凑模型包：把随机森林/线性模型导出为扁平 NumPy 数组，按标签惰性 mmap 加载 ----- #
+# 目录结构：
+#   rf_model_bundle/
+#     meta.json            {"format", "classes", "n_features", "labels": [...], "groups": {...}}
+#     g00/                 一个“组”= 一组共享结构的树（或一个线性模型），可覆盖多个标签
+#       feature.npy        int32   每个节点的分裂特征（叶子为 -2）
+#       threshold.npy      float64 分裂阈值，X[:, feature] <= threshold 走左子树
+#       left.npy right.npy int32   子节点的全局下标（所有树的节点拼接在一起），叶子为 -1
+#       value.npy          float64 (n_nodes, k) 每个节点上 k 个标签的正类概率
+#       roots.npy          int32   每棵树根节点的全局下标
+#     g01/  coef.npy (k, d)  intercept.npy (k,)   线性模型组
+#     reducer/  mean.npy components.npy [scale.npy]  可选的降维/量化器（feature_reducer），预测前先变换 X
+# - MultiOutputClassifier(随机森林)：每个标签一个组；原生多输出随机森林：所有标签共用一个组
+# - 只有一个取值的标签直接记为常数，不占用组
+# - 加载时只读 meta.json，某个标签第一次被预测时才 mmap 它所在的组，多个进程共享同一份页缓存
+# - 预测时所有森林组交给 forest_engine 一次批量遍历，不再逐标签、逐棵树调用 sklearn
+
+BUNDLE_DIR = 'rf_model_bundle'
+BUNDLE_FORMAT = 1
+
+_FOREST_ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'roots')
+_LINEAR_ARRAYS = ('coef', 'intercept')
+
+
+def _positive_index(classes):
+    classes = list(classes)
+    return classes.index(1) if 1 in classes else None
+
+
+def _pack_forest(trees, class_lists):
+    """
+    把若干棵树（可多输出）拼接成扁平数组；class_lists[c] 为第 c 个输出的类别列表
+    """
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        t = tree.tree_
+        n = t.node_count
+        roots.append(offset)
+        l = t.children_left.astype(np.int32)
+        r = t.children_right.astype(np.int32)
+        inner = l >= 0
+        l[inner] += offset
+        r[inner] += offset
+        feature.append(t.feature.astype(np.int32))
+        threshold.append(t.threshold.astype(np.float64))
+        left.append(l)
+        right.append(r)
+
+        # 与 DecisionTreeClassifier.predict_proba 一致：每个节点按类别计数（或比例）归一化
+        v = np.zeros((n, len(class_lists)))
+        for c, classes in enumerate(class_lists):
+            pos = _positive_index(classes)
+            if pos is None:
+                continue
+            counts = t.value[:, c, :len(classes)]
+            total = counts.sum(axis=1)
+            total[total == 0] = 1.0
+            v[:, c] = counts[:, pos] / total
+        value.append(v)
+        offset += n
+
+    return {
+        'feature': np.concatenate(feature),
+        'threshold': np.concatenate(threshold),
+        'left': np.concatenate(left),
+        'right': np.concatenate(right),
+        'value': np.concatenate(value),
+        'roots': np.asarray(roots, dtype=np.int32),
+    }
+
+
+def _pack_linear(estimators):
+    coef = np.vstack([np.asarray(e.coef_, dtype=np.float64).reshape(1, -1) for e in estimators])
+    intercept = np.asarray([float(np.ravel(e.intercept_)[0]) for e in estimators])
+    return {'coef': coef, 'intercept': intercept}
+
+
+def _export_label_estimator(est):
+    """
+    单标签模型 -> (kind, 数组或常数)
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+
+    if isinstance(est, float):
+        return 'const', est
+    if isinstance(est, RandomForestClassifier):
+        pos = _positive_index(est.classes_)
+        if pos is None or len(est.classes_) < 2:
+            return 'const', 0.0 if pos is None else 1.0
+        return 'forest', _pack_forest(est.estimators_, [est.classes_])
+    if isinstance(est, (LogisticRegression, SGDClassifier)) and list(est.classes_) == [0, 1]:
+        return 'linear', _pack_linear([est])
+    raise TypeError(f"模型包暂不支持该分类器：{type(est).__name__}")
+
+
+def _collect(model):
+    """
+    把已训练的多标签模型拆成若干组，返回 (groups, labels)
+    groups: {组名: (kind, arrays, n_trees)}；labels: 每个标签 {'kind', 'group', 'column'} 或常数
+    """
+    from sklearn.ensemble import RandomForestClassifier
+
+    groups = {}
+    labels = []
+    if isinstance(model, RandomForestClassifier) and getattr(model, 'n_outputs_', 1) > 1:
+        groups['g00'] = ('forest', _pack_forest(model.estimators_, model.classes_), len(model.estimators_))
+        for c, classes in enumerate(model.classes_):
+            pos = _positive_index(classes)
+            if pos is None or len(classes) < 2:
+                labels.append({'kind': 'const', 'value': 0.0 if pos is None else 1.0})
+            else:
+                labels.append({'kind': 'forest', 'group': 'g00', 'column': c})
+        return groups, labels
+
+    if not hasattr(model, 'estimators_'):
+        raise TypeError(f"模型包暂不支持该模型：{type(model).__name__}")
+    for j, est in enumerate(model.estimators_):
+        kind, payload = _export_label_estimator(est)
+        if kind == 'const':
+            labels.append({'kind': 'const', 'value': float(payload)})
+            continue
+        name = f'g{len(groups):02d}'
+        n_trees = len(payload['roots']) if kind == 'forest' else 0
+        groups[name] = (kind, payload, n_trees)
+        labels.append({'kind': kind, 'group': name, 'column': 0})
+    return groups, labels
+
+
+def export_bundle(model, classes, bundle_dir=BUNDLE_DIR, extra_meta=None):
+    """
+    导出模型包：先写入临时目录，完成后整体替换，读取方不会看到写了一半的模型包
+    """
+    groups, labels = _collect(model)
+    if len(labels) != len(classes):
+        raise ValueError(f"模型有 {len(labels)} 个输出，但标签有 {len(classes)} 个")
+    for meta_label, name in zip(labels, classes):
+        meta_label['label'] = name
+
+    tmp_dir = bundle_dir.rstrip('/\\') + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    group_meta = {}
+    for name, (kind, arrays, n_trees) in groups.items():
+        os.makedirs(os.path.join(tmp_dir, name))
+        for key, arr in arrays.items():
+            np.save(os.path.join(tmp_dir, name, f'{key}.npy'), np.ascontiguousarray(arr))
+        group_meta[name] = {'kind': kind, 'n_trees': n_trees,
+                            'n_nodes': int(len(arrays['feature'])) if kind == 'forest' else 0}
+
+    meta = {
+        'format': BUNDLE_FORMAT,
+        'classes': list(classes),
+        'n_features': int(getattr(model, 'n_features_in_', 0) or 0),
+        'labels': labels,
+        'groups': group_meta,
+    }
+    reducer = get_reducer(model)
+    if reducer is not None:
+        meta['reducer'], arrays = reducer.to_arrays()
+        os.makedirs(os.path.join(tmp_dir, 'reducer'))
+        for key, arr in arrays.items():
+            np.save(os.path.join(tmp_dir, 'reducer', f'{key}.npy'), arr)
+    meta.update(extra_meta or {})
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    old_dir = bundle_dir.rstrip('/\\') + '.old'
+    if os.path.exists(bundle_dir):
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.replace(bundle_dir, old_dir)
+    os.replace(tmp_dir, bundle_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return meta
+
+
+class ModelBundle:
+    """
+    只读模型包：predict_proba(X) 直接返回 (n_samples, n_labels) 的正类概率矩阵
+    """
+
+    def __init__(self, bundle_dir=BUNDLE_DIR):
+        self.bundle_dir = bundle_dir
+        with open(os.path.join(bundle_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('format') != BUNDLE_FORMAT:
+            raise ValueError(f"不支持的模型包格式：{self.meta.get('format')}")
+        self.classes_ = self.meta['classes']
+        self._groups = {}
+        self._engines = {}
+        self.reducer = None
+        if 'reducer' in self.meta:
+            folder = os.path.join(bundle_dir, 'reducer')
+            arrays = {name[:-4]: np.load(os.path.join(folder, name)) for name in os.listdir(folder)}
+            self.reducer = FeatureReducer.from_arrays(self.meta['reducer'], arrays)
+
+    @classmethod
+    def from_model(cls, model, classes):
+        """
+        不落盘，直接从内存中的已训练模型构造（数组不经 mmap），用于 P03 加载 pickle 模型时的批量推理
+        不支持的模型抛出 TypeError
+        """
+        groups, labels = _collect(model)
+        if len(labels) != len(classes):
+            raise ValueError(f"模型有 {len(labels)} 个输出，但标签有 {len(classes)} 个")
+        self = cls.__new__(cls)
+        self.bundle_dir = None
+        self.meta = {
+            'format': BUNDLE_FORMAT,
+            'classes': list(classes),
+            'labels': labels,
+            'groups': {name: {'kind': kind, 'n_trees': n_trees} for name, (kind, _, n_trees) in groups.items()},
+        }
+        self.classes_ = self.meta['classes']
+        self._groups = {name: arrays for name, (_, arrays, _) in groups.items()}
+        self._engines = {}
+        self.reducer = get_reducer(model)
+        return self
+
+    def group(self, name):
+        """
+        第一次用到时才 mmap 该组的数组
+        """
+        if name not in self._groups:
+            kind = self.meta['groups'][name]['kind']
+            keys = _FOREST_ARRAYS if kind == 'forest' else _LINEAR_ARRAYS
+            folder = os.path.join(self.bundle_dir, name)
+            self._groups[name] = {k: np.load(os.path.join(folder, f'{k}.npy'), mmap_mode='r') for k in keys}
+        return self._groups[name]
+
+    def engine(self, names):
+        """
+        覆盖给定森林组的批量推理引擎（forest_engine.ForestEngine），按组集合缓存
+        引擎会把这些组的节点表拼接复制到内存中，叶子概率仍直接读 mmap 数组
+        """
+        key = tuple(sorted(names))
+        if key not in self._engines:
+            self._engines[key] = ForestEngine({name: self.group(name) for name in key})
+        return self._engines[key]
+
+    def predict_proba(self, X, labels=None, batch_size=256):
+        """
+        树模型按 sklearn 的做法把 X 转换为 float32 再与 float64 阈值比较；线性模型按 float64 计算
+        labels 给出时只计算这些标签（下标列表），其余标签所在的组不会被加载
+        所有用到的森林组由同一个引擎一次遍历完成，batch_size 为每批样本数
+        模型带有降维器时 X 为原始嵌入，先按训练时的方式降维/量化
+        """
+        if self.reducer is not None:
+            X = self.reducer.transform(X)
+        X64 = np.asarray(X, dtype=np.float64)
+        X = np.asarray(X, dtype=np.float32)
+        idx = range(len(self.classes_)) if labels is None else labels
+        specs = [self.meta['labels'][j] for j in idx]
+        forest_names = {s['group'] for s in specs if s['kind'] == 'forest'}
+        cache = self.engine(forest_names).predict_proba(X, batch_size) if forest_names else {}
+
+        P = np.zeros((len(X), len(specs)))
+        for out_col, spec in enumerate(specs):
+            if spec['kind'] == 'const':
+                P[:, out_col] = spec['value']
+                continue
+            name = spec['group']
+            if name not in cache:
+                g = self.group(name)
+                z = X64 @ np.asarray(g['coef']).T + np.asarray(g['intercept'])
+                with np.errstate(over='ignore'):   # exp 溢出为 inf 时概率正好是 0
+                    cache[name] = 1.0 / (1.0 + np.exp(-z))
+            P[:, out_col] = cache[name][:, spec['column']]
+        return P
+
+
+def load_classifier(model_path='rf_model.pkl', bundle_dir=BUNDLE_DIR):
+    """
+    优先加载模型包（不比 model_path 旧时）；否则退回反序列化 pickle 模型
+    """
+    meta_path = os.path.join(bundle_dir, 'meta.json')
+    if os.path.exists(meta_path) and (not os.path.exists(model_path)
+                                      or os.path.getmtime(meta_path) >= os.path.getmtime(model_path)):
+        return ModelBundle(bundle_dir)
+    if os.path.exists(meta_path):
+        print(f"模型包 {bundle_dir} 比 {model_path} 旧，改为加载 pickle 模型")
+    import pickle
+    with open(model_path, 'rb') as f:
+        return pickle.load(f)
@@ -0,0 +1,53 @@
+import os
+import re
+import json
+import time
+import pickle
+
+# ----- 模型版本管理：每次训练/增量更新都保存一个新版本，并原子地替换当前模型文件 ----- #
+# model_versions/
+#   model_v0001.pkl  model_v0001.json   历史版本及其说明（后端、样本数、训练方式等）
+# rf_model.pkl                          当前模型（P03 读取），总是通过 os.replace 整体替换，
+#                                       读取方不会看到写了一半的文件
+
+MODEL_PATH = 'rf_model.pkl'
+VERSIONS_DIR = 'model_versions'
+
+_VERSION_RE = re.compile(r'^model_v(\d+)\.pkl$')
+
+
+def atomic_write_bytes(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def atomic_pickle(obj, path):
+    atomic_write_bytes(path, pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def latest_version(versions_dir=VERSIONS_DIR):
+    if not os.path.isdir(versions_dir):
+        return 0
+    numbers = [int(m.group(1)) for m in map(_VERSION_RE.match, os.listdir(versions_dir)) if m]
+    return max(numbers, default=0)
+
+
+def save_model_version(model, meta=None, model_path=MODEL_PATH, versions_dir=VERSIONS_DIR):
+    """
+    保存新版本（model_vNNNN.pkl + 说明 json），再原子替换 model_path，返回版本号
+    """
+    os.makedirs(versions_dir, exist_ok=True)
+    version = latest_version(versions_dir) + 1
+    data = pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+
+    info = {'version': version, 'saved_at': time.strftime('%Y-%m-%d %H:%M:%S')}
+    info.update(meta or {})
+    atomic_write_bytes(os.path.join(versions_dir, f'model_v{version:04d}.pkl'), data)
+    atomic_write_bytes(os.path.join(versions_dir, f'model_v{version:04d}.json'),
+                       json.dumps(info, ensure_ascii=False, indent=2).encode('utf-8'))
+    atomic_write_bytes(model_path, data)
+    return version
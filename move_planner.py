@@ -0,0 +1,432 @@
+import os
+import json
+import time
+import errno
+import shutil
+import numpy as np
+
+from file_lock import FileLock
+
+try:
+    import fcntl  # 仅类 Unix 系统：reflink 通过 FICLONE ioctl 实现
+except ImportError:
+    fcntl = None
+
+# ----- 分类结果的移动计划与执行：每个文件只改名/复制一次，多标签的其余目标用硬链接/reflink 生成 ----- #
+# - plan_moves 先算出完整计划：文件 -> [主目标, 其余标签的目标...]，目标重名时自动改为 "名称 (n).扩展名"
+# - execute_plan 执行计划：主目标同盘时 os.rename（不复制数据），跨盘时复制到临时文件再改名、最后删除源文件；
+#   其余目标默认硬链接到主目标（零拷贝），link='reflink' 时用写时复制克隆（btrfs/xfs），都不支持时退回复制
+# - 日志为只追加的 JSONL：每个操作执行前写 start、完成后写 done，每批以 begin/end 包围；
+#   进程中断后下次执行前自动恢复（删除残留的临时文件，跨盘复制已完成的补删源文件），rollback 按日志倒序撤销一批
+# - 日志由多个进程共用（P03 批量分类、inbox_watcher 等）：打开的 MoveJournal 在整个批次（begin…end）期间持有
+#   日志旁的独占锁文件，recover/rollback 同样在锁内进行，不会把另一个进程正在执行的批次当作中断批次处理
+# - 长时间运行的调用方（classify_files）每个流水线批单独成批、单独加锁，begin 记录带同一个 run，
+#   rollback 按 run 整体撤销
+# - dry_run 只打印计划和将要复制的字节数，不改动任何文件、不写日志
+
+MOVE_JOURNAL_PATH = os.path.join('file_embed_pkl_history', 'move_journal.jsonl')
+LINK_MODES = ('hardlink', 'reflink', 'copy')
+FICLONE = 0x40049409
+_TMP_SUFFIX = '.moving'
+
+
+def pick_labels(row, labels, thresh=0.5):
+    """
+    取所有不低于 thresh 的标签（按概率从高到低），没有时取概率最大的标签
+    """
+    idxs = np.where(row >= thresh)[0]
+    if not len(idxs):
+        idxs = [int(np.argmax(row))]
+    return [labels[i] for i in sorted(idxs, key=lambda i: -row[i])]
+
+
+def _unique_path(path, reserved):
+    # 目标已存在或已被本次计划占用时加序号
+    stem, ext = os.path.splitext(path)
+    candidate, n = path, 1
+    while candidate in reserved or os.path.lexists(candidate):
+        candidate = f"{stem} ({n}){ext}"
+        n += 1
+    reserved.add(candidate)
+    return candidate
+
+
+def plan_moves(fps, P, labels, dst_root, thresh=0.5):
+    """
+    返回移动计划 [{'src', 'labels', 'dsts'}]，dsts[0] 为主目标（概率最高的标签），其余为附加标签的目标
+    """
+    reserved = set()
+    plan = []
+    for fp, row in zip(fps, P):
+        picked = pick_labels(row, labels, thresh)
+        dsts = [_unique_path(os.path.join(dst_root, lbl, os.path.basename(fp)), reserved) for lbl in picked]
+        plan.append({'src': fp, 'labels': picked, 'dsts': dsts})
+    return plan
+
+
+def _existing_parent(path):
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def _same_device(src, dst):
+    try:
+        return os.stat(src).st_dev == os.stat(_existing_parent(os.path.dirname(dst))).st_dev
+    except OSError:
+        return False
+
+
+def _copy_atomic(src, dst):
+    # 先复制到临时文件再改名，中断时目标位置不会出现不完整的文件
+    tmp = dst + _TMP_SUFFIX
+    shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def _reflink(src, dst):
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "当前系统不支持 reflink")
+    with open(src, 'rb') as fs, open(dst, 'wb') as fd:
+        try:
+            fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+        except OSError:
+            fd.close()
+            os.remove(dst)
+            raise
+    shutil.copystat(src, dst)
+
+
+def journal_lock(path=MOVE_JOURNAL_PATH):
+    """
+    移动日志的跨进程锁（日志旁的 .lock 文件）
+    """
+    return FileLock(path + '.lock')
+
+
+def new_batch_id():
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{time.perf_counter_ns() % 10 ** 6:06d}"
+
+
+class MoveJournal:
+    """
+    只追加的移动日志；每条记录写入后立即 flush，批次结束时 fsync。
+    同一批次可以分多次调用 execute_plan 写入，序号继续递增（锁在整个期间持有，长时间运行的调用方改用 run 编号）。
+    打开时获取日志锁、close 时释放，其他进程的批次和恢复在此期间等待；lock=False 表示调用方已持有锁
+    """
+
+    def __init__(self, path=MOVE_JOURNAL_PATH, batch=None, seq=0, lock=True):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.path = path
+        self.batch = batch or new_batch_id()
+        self._lock = journal_lock(path).acquire() if lock else None
+        try:
+            self._f = open(path, 'a', encoding='utf-8')
+        except BaseException:
+            if self._lock is not None:
+                self._lock.release()
+            raise
+        self._seq = seq
+
+    def write(self, record):
+        self._f.write(json.dumps({'batch': self.batch, **record}, ensure_ascii=False) + '\n')
+        self._f.flush()
+
+    def start(self, op, src, dst):
+        self._seq += 1
+        self.write({'seq': self._seq, 'op': op, 'src': src, 'dst': dst, 'state': 'start'})
+        return self._seq
+
+    def done(self, seq, how):
+        self.write({'seq': seq, 'state': 'done', 'how': how})
+
+    def sync(self):
+        os.fsync(self._f.fileno())
+
+    def close(self):
+        try:
+            self.sync()
+            self._f.close()
+        finally:
+            if self._lock is not None:
+                self._lock.release()
+                self._lock = None
+
+
+def read_journal(path=MOVE_JOURNAL_PATH):
+    """
+    读取日志，返回 {批次: [记录...]}（按写入顺序）；末尾未写完的半行忽略
+    """
+    batches = {}
+    if not os.path.exists(path):
+        return batches
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n') or not line.strip():
+                continue
+            record = json.loads(line.decode('utf-8'))
+            batches.setdefault(record['batch'], []).append(record)
+    return batches
+
+
+def _last_line(path, block=4096):
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - block))
+        lines = f.read().splitlines()
+    return lines[-1] if lines else b''
+
+
+def _ops(records):
+    # 合并 start/done 记录：[(start 记录, done 记录或 None)]
+    done = {r['seq']: r for r in records if r.get('state') == 'done'}
+    return [(r, done.get(r['seq'])) for r in records if r.get('state') == 'start']
+
+
+def recover(journal_path=MOVE_JOURNAL_PATH, locked=False):
+    """
+    处理上次中断的批次：删除残留的临时文件；跨盘复制已完成但源文件未删的，核对大小后删除源文件。
+    最后一条记录是 end/rollback 时直接返回（只读日志末尾），返回处理的操作数。
+    在日志锁内进行；locked=True 表示调用方已持有锁（如刚打开的 MoveJournal）
+    """
+    if not locked:
+        with journal_lock(journal_path):
+            return recover(journal_path, locked=True)
+    if not os.path.exists(journal_path) or os.path.getsize(journal_path) == 0:
+        return 0
+    try:
+        last = json.loads(_last_line(journal_path).decode('utf-8'))
+        if last.get('op') in ('end', 'rollback'):
+            return 0
+    except ValueError:
+        pass
+    batches = read_journal(journal_path)
+    if not batches:
+        return 0
+    batch, records = list(batches.items())[-1]
+    journal = MoveJournal(journal_path, batch, seq=max((r.get('seq', 0) for r in records), default=0), lock=False)
+    fixed = 0
+    for start, done in _ops(records):
+        if done is not None:
+            continue
+        src, dst = start['src'], start['dst']
+        if os.path.exists(dst + _TMP_SUFFIX):
+            os.remove(dst + _TMP_SUFFIX)
+        if os.path.exists(dst):
+            how = 'recovered'
+            if start['op'] == 'move' and os.path.exists(src) and os.path.getsize(src) == os.path.getsize(dst):
+                os.remove(src)
+                how = 'recovered_copy'
+            journal.done(start['seq'], how)
+        fixed += 1
+    journal.write({'op': 'end', 'recovered': fixed})
+    journal.close()
+    print(f"已恢复上次中断的移动批次 {batch}（{fixed} 个未完成的操作）")
+    return fixed
+
+
+def execute_plan(plan, journal=MOVE_JOURNAL_PATH, link='hardlink', dry_run=False, verbose=True, run=None):
+    """
+    执行移动计划，返回统计 {'files', 'renamed', 'copied', 'linked', 'reflinked', 'extra_copies',
+    'bytes_copied', 'failed'}
+
+    Args:
+        plan (list): plan_moves 的结果
+        journal (str | MoveJournal): 日志路径（先恢复上次中断的批次，本次调用为一个新批次），
+            或已打开的 MoveJournal（多次调用记入同一批次，由调用方关闭）；None 表示不记录（无法恢复/撤销）
+        link (str): 附加标签的生成方式 'hardlink' / 'reflink' / 'copy'，前两者不支持时退回复制
+        dry_run (bool): 只打印计划和将要复制的字节数
+        run (str): 所属的运行编号（如 new_batch_id()），记在 begin 记录中；同一 run 的多个批次由 rollback 一起撤销
+    """
+    if link not in LINK_MODES:
+        raise ValueError(f"未知的链接方式：{link}")
+    stats = dict.fromkeys(('files', 'renamed', 'copied', 'linked', 'reflinked', 'extra_copies',
+                           'bytes_copied', 'failed'), 0)
+    if dry_run:
+        for item in plan:
+            src, dsts = item['src'], item['dsts']
+            size = os.path.getsize(src) if os.path.exists(src) else 0
+            same = _same_device(src, dsts[0])
+            stats['files'] += 1
+            stats['renamed' if same else 'copied'] += 1
+            stats['bytes_copied'] += 0 if same else size
+            print(f"[演练] {'移动' if same else '跨盘复制'} {src} 到 {dsts[0]} （分类：{item['labels'][0]}）")
+            for lbl, dst in zip(item['labels'][1:], dsts[1:]):
+                if link == 'copy':
+                    stats['extra_copies'] += 1
+                    stats['bytes_copied'] += size
+                else:
+                    stats['linked' if link == 'hardlink' else 'reflinked'] += 1
+                print(f"[演练] {'复制' if link == 'copy' else link} {dsts[0]} 到 {dst} （分类：{lbl}）")
+        return stats
+
+    owned = isinstance(journal, str)
+    if owned:
+        # 先拿到日志锁再恢复，恢复与本批次之间不会插入其他进程的批次
+        journal = MoveJournal(journal)
+        try:
+            recover(journal.path, locked=True)
+        except BaseException:
+            journal.close()
+            raise
+    if journal is not None:
+        begin = {'op': 'begin', 'files': len(plan), 'at': time.strftime('%Y-%m-%d %H:%M:%S')}
+        if run is not None:
+            begin['run'] = run
+        journal.write(begin)
+    made = set()
+
+    def makedirs(path):
+        folder = os.path.dirname(path)
+        if folder not in made:
+            os.makedirs(folder, exist_ok=True)
+            made.add(folder)
+
+    def start(op, src, dst):
+        return journal.start(op, src, dst) if journal is not None else None
+
+    def done(seq, how):
+        if journal is not None:
+            journal.done(seq, how)
+
+    try:
+        for item in plan:
+            src, dsts, picked = item['src'], item['dsts'], item['labels']
+            primary = dsts[0]
+            try:
+                makedirs(primary)
+                seq = start('move', src, primary)
+                try:
+                    os.rename(src, primary)
+                    how = 'rename'
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    _copy_atomic(src, primary)
+                    os.remove(src)
+                    how = 'copy'
+                    stats['bytes_copied'] += os.path.getsize(primary)
+                done(seq, how)
+                stats['renamed' if how == 'rename' else 'copied'] += 1
+                stats['files'] += 1
+                if verbose:
+                    print(f"移动文件 {src} 到 {primary} （分类：{picked[0]}）")
+            except OSError as e:
+                stats['failed'] += 1
+                print(f"移动失败 {src} -> {primary}：{e}")
+                continue
+
+            for lbl, dst in zip(picked[1:], dsts[1:]):
+                try:
+                    makedirs(dst)
+                    seq = start('extra', primary, dst)
+                    how = 'copy'
+                    if link == 'hardlink':
+                        try:
+                            os.link(primary, dst)
+                            how = 'hardlink'
+                        except OSError:
+                            pass
+                    elif link == 'reflink':
+                        try:
+                            _reflink(primary, dst)
+                            how = 'reflink'
+                        except OSError:
+                            pass
+                    if how == 'copy':
+                        _copy_atomic(primary, dst)
+                        stats['extra_copies'] += 1
+                        stats['bytes_copied'] += os.path.getsize(dst)
+                    else:
+                        stats['linked' if how == 'hardlink' else 'reflinked'] += 1
+                    done(seq, how)
+                    if verbose:
+                        print(f"{'复制' if how == 'copy' else how} {primary} 到 {dst} （分类：{lbl}）")
+                except OSError as e:
+                    stats['failed'] += 1
+                    print(f"附加标签失败 {primary} -> {dst}：{e}")
+    finally:
+        if journal is not None:
+            journal.write({'op': 'end', **stats})
+            if owned:
+                journal.close()
+            else:
+                journal.sync()
+    return stats
+
+
+def _run_of(records):
+    return next((r['run'] for r in records if r.get('op') == 'begin' and 'run' in r), None)
+
+
+def rollback(batch=None, journal_path=MOVE_JOURNAL_PATH, dry_run=False, run=None):
+    """
+    按日志倒序撤销一个批次，或一次运行（run）的所有批次：删除附加标签的链接/副本，把文件移回原位置。
+    默认撤销最近一个移动批次，该批次属于某次运行（如 classify_files）时撤销整次运行。
+    目标已被后续步骤（如 P04 归档）移走的文件跳过；返回撤销的操作数
+    """
+    with journal_lock(journal_path):
+        batches = read_journal(journal_path)
+        movable = [b for b, records in batches.items()
+                   if any(r.get('state') == 'start' for r in records)
+                   and not any(r.get('op') == 'rollback' for r in records)]
+        if batch is None and run is None:
+            if not movable:
+                print("没有可以撤销的移动批次")
+                return 0
+            run = _run_of(batches[movable[-1]])
+            if run is None:
+                batch = movable[-1]
+        if batch is not None:
+            if not batches.get(batch):
+                print(f"日志中没有批次 {batch}")
+                return 0
+            targets = [batch]
+        else:
+            targets = [b for b in movable if _run_of(batches[b]) == run]
+            if not targets:
+                print(f"日志中没有运行 {run} 的可撤销批次")
+                return 0
+        # 后执行的批次先撤销
+        undone = sum(_rollback_batch(b, batches[b], journal_path, dry_run) for b in reversed(targets))
+    if run is not None and batch is None:
+        print(f"运行 {run}：{'将' if dry_run else '已'}撤销 {len(targets)} 个批次共 {undone} 个操作")
+    return undone
+
+
+def _rollback_batch(batch, records, journal_path, dry_run):
+    undone = 0
+    for start, done in reversed(_ops(records)):
+        if done is None:
+            continue
+        src, dst = start['src'], start['dst']
+        if not os.path.exists(dst):
+            print(f"跳过（目标已不存在）：{dst}")
+            continue
+        if start['op'] == 'extra':
+            print(f"{'[演练] ' if dry_run else ''}删除附加标签 {dst}")
+            if not dry_run:
+                os.remove(dst)
+        else:
+            if os.path.exists(src):
+                print(f"跳过（原位置已有文件）：{src}")
+                continue
+            print(f"{'[演练] ' if dry_run else ''}移回 {dst} 到 {src}")
+            if not dry_run:
+                os.makedirs(os.path.dirname(src) or '.', exist_ok=True)
+                shutil.move(dst, src)
+        undone += 1
+
+    if not dry_run:
+        journal = MoveJournal(journal_path, batch, lock=False)
+        journal.write({'op': 'rollback', 'undone': undone, 'at': time.strftime('%Y-%m-%d %H:%M:%S')})
+        journal.close()
+    print(f"批次 {batch}：{'将' if dry_run else '已'}撤销 {undone} 个操作")
+    return undone
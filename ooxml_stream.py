@@ -0,0 +1,148 @@
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+# ----- docx/pptx 流式文本提取：按顺序解析 XML 部件，字符数够了就立即停止 ----- #
+# 输出与 python-docx 的 doc.paragraphs / python-pptx 的 slide.shapes[*].text 拼接结果一致，
+# 但不构建完整对象模型，也不会解析预算之外的段落和幻灯片
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+R = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+MC = '{http://schemas.openxmlformats.org/markup-compatibility/2006}'
+
+# run 内嵌的图形/文本框不属于段落正文（python-docx 的 paragraph.text 同样忽略）
+_DOCX_SKIP_TAGS = {W + 'drawing', W + 'pict', W + 'object', MC + 'AlternateContent'}
+_DOCX_CHAR_TAGS = {W + 'tab': '\t', W + 'br': '\n', W + 'cr': '\n', W + 'noBreakHyphen': '-'}
+
+
+def join_until(parts, limit):
+    """
+    以换行拼接 parts，累计长度达到 limit 后立即停止迭代（生成器随之关闭）
+    """
+    out = []
+    total = 0
+    for i, part in enumerate(parts):
+        if i:
+            out.append('\n')
+            total += 1
+        out.append(part)
+        total += len(part)
+        if total >= limit:
+            break
+    return ''.join(out)[:limit]
+
+
+def iter_docx_paragraphs(source):
+    """
+    逐个产出 word/document.xml 中正文（body 直属）段落的文本
+    source 可以是文件路径，也可以是可 seek 的文件对象
+    """
+    with zipfile.ZipFile(source) as z, z.open('word/document.xml') as f:
+        stack = []
+        body = None
+        buf = None
+        skip = 0
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            tag = elem.tag
+            if event == 'start':
+                if tag == W + 'body':
+                    body = elem
+                elif tag == W + 'p' and stack and stack[-1] == W + 'body':
+                    buf = []
+                elif tag in _DOCX_SKIP_TAGS:
+                    skip += 1
+                stack.append(tag)
+                continue
+
+            stack.pop()
+            if tag in _DOCX_SKIP_TAGS:
+                skip -= 1
+            elif buf is not None and not skip:
+                if tag == W + 't':
+                    buf.append(elem.text or '')
+                elif tag in _DOCX_CHAR_TAGS:
+                    buf.append(_DOCX_CHAR_TAGS[tag])
+
+            if stack and stack[-1] == W + 'body':
+                # body 的直属子元素处理完毕，释放其子树
+                if tag == W + 'p' and buf is not None:
+                    yield ''.join(buf)
+                    buf = None
+                body.remove(elem)
+
+
+def _slide_part_names(z):
+    """
+    按 presentation.xml 中 sldIdLst 的顺序返回幻灯片部件名；解析失败时退回按编号排序
+    """
+    try:
+        rels = {}
+        with z.open('ppt/_rels/presentation.xml.rels') as f:
+            for rel in ET.parse(f).getroot().iter(PKG_REL + 'Relationship'):
+                rels[rel.get('Id')] = rel.get('Target')
+        names = []
+        with z.open('ppt/presentation.xml') as f:
+            for sld in ET.parse(f).getroot().iter(P + 'sldId'):
+                target = rels[sld.get(R + 'id')]
+                if target.startswith('/'):
+                    names.append(target.lstrip('/'))
+                else:
+                    names.append(posixpath.normpath(posixpath.join('ppt', target)))
+        return names
+    except (KeyError, ET.ParseError):
+        pattern = re.compile(r'^ppt/slides/slide(\d+)\.xml$')
+        found = [(int(m.group(1)), n) for n in z.namelist() for m in [pattern.match(n)] if m]
+        return [n for _, n in sorted(found)]
+
+
+def iter_pptx_shape_texts(source):
+    """
+    按幻灯片顺序逐个产出顶层形状（p:sp）的文本，段落之间以换行连接
+    """
+    with zipfile.ZipFile(source) as z:
+        for name in _slide_part_names(z):
+            with z.open(name) as f:
+                stack = []
+                paras = None
+                buf = None
+                for event, elem in ET.iterparse(f, events=('start', 'end')):
+                    tag = elem.tag
+                    if event == 'start':
+                        if tag == P + 'sp' and stack[-2:] == [P + 'cSld', P + 'spTree']:
+                            paras = []
+                        elif tag == A + 'p' and paras is not None:
+                            buf = []
+                        stack.append(tag)
+                        continue
+
+                    stack.pop()
+                    if buf is not None:
+                        if tag == A + 't':
+                            buf.append(elem.text or '')
+                        elif tag == A + 'br':
+                            buf.append('\v')
+                        elif tag == A + 'p':
+                            paras.append(''.join(buf))
+                            buf = None
+                    if tag == P + 'sp' and paras is not None and stack[-2:] == [P + 'cSld', P + 'spTree']:
+                        yield '\n'.join(paras)
+                        paras = None
+                        elem.clear()
+
+
+def extract_text_from_docx_stream(source, len_doc):
+    """
+    读取 docx 正文前 len_doc 个字符；出错时抛出异常，由调用方处理
+    """
+    return join_until(iter_docx_paragraphs(source), len_doc)
+
+
+def extract_text_from_pptx_stream(source, len_doc):
+    """
+    读取 pptx 各幻灯片形状文本的前 len_doc 个字符；出错时抛出异常，由调用方处理
+    """
+    return join_until(iter_pptx_shape_texts(source), len_doc)
@@ -0,0 +1,242 @@
+import os
+import time
+import multiprocessing as mp
+from collections import deque
+from multiprocessing.connection import wait
+
+try:
+    import psutil  # 可选：Windows 下没有 resource 模块，用 psutil 轮询子进程内存
+except ImportError:
+    psutil = None
+
+from extract_profiler import ExtractionProfiler
+
+# ----- 多进程并行特征提取：保持输出顺序，单文件超时/内存上限，失败记录而不是卡死 ----- #
+
+def _limit_memory(max_memory_mb):
+    """
+    在子进程内设置地址空间上限（仅类 Unix 系统有效）
+    """
+    if not max_memory_mb:
+        return
+    try:
+        import resource
+    except ImportError:
+        return
+    limit = int(max_memory_mb) * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError) as e:
+        print(f"设置内存上限失败：{e}")
+
+
+def _worker_main(conn, extract_func, len_doc, max_memory_mb, profile=False):
+    """
+    子进程主循环：每次从管道接收一个 (序号, 路径)，返回 (序号, 文本, 状态, 剖析记录)
+    profile=True 时以 extract_func(path, len_doc, profiler=...) 调用，并把本次的剖析记录一并发回
+    """
+    _limit_memory(max_memory_mb)
+    profiler = ExtractionProfiler(top_n=0, keep_records=True) if profile else None
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+        idx, path = task
+        try:
+            if profiler is not None:
+                text = extract_func(path, len_doc, profiler=profiler)
+            else:
+                text = extract_func(path, len_doc)
+            status = 'ok'
+        except MemoryError:
+            text, status = "", 'memory'
+        except Exception as e:
+            text, status = "", f'error: {e}'
+        conn.send((idx, text, status, profiler.pop_records() if profiler is not None else None))
+    conn.close()
+
+
+def _spawn_worker(ctx, extract_func, len_doc, max_memory_mb, profile=False):
+    parent_conn, child_conn = ctx.Pipe()
+    proc = ctx.Process(target=_worker_main,
+                       args=(child_conn, extract_func, len_doc, max_memory_mb, profile),
+                       daemon=True)
+    proc.start()
+    child_conn.close()
+    return parent_conn, proc
+
+
+def _over_memory(proc, max_memory_mb):
+    if psutil is None or not max_memory_mb:
+        return False
+    try:
+        return psutil.Process(proc.pid).memory_info().rss > max_memory_mb * 1024 * 1024
+    except psutil.Error:
+        return False
+
+
+def pool_start_method():
+    """
+    不从当前进程直接 fork 的启动方式：类 Unix 系统为 'forkserver'，Windows 为默认的 'spawn'
+    """
+    return 'forkserver' if 'forkserver' in mp.get_all_start_methods() else None
+
+
+def iter_extract_parallel(file_paths, len_doc, extract_func, n_workers=None, timeout=120,
+                          max_memory_mb=None, poll_interval=0.5, profiler=None, start_method=None):
+    """
+    用进程池并行调用 extract_func(path, len_doc)，返回按完成顺序产出 (序号, 路径, 文本, 状态) 的生成器
+
+    file_paths 可以是任意可迭代对象，按需逐个取用（如另一线程正在填充的队列），
+    其中的 None 表示“暂时没有新文件”：空闲进程稍后再取，已完成的结果照常产出。
+    状态为 ok / timeout / memory / crashed / error: ...，失败时文本为空串；参数含义见 extract_features_parallel
+    进程池在调用时立即启动：调用方可以先建好进程池再启动自己的线程，避免在多线程进程中 fork 子进程；
+    start_method 为 multiprocessing 的启动方式，None 为系统默认。已初始化 numba/TBB 线程池的进程再 fork 会在退出时挂起，
+    这类长驻或多次调用的场景在类 Unix 系统上传 'forkserver'（见 pool_start_method）
+    """
+    n_workers = max(1, n_workers or os.cpu_count() or 1)
+    ctx = mp.get_context(start_method)
+    if start_method == 'forkserver':
+        # 提取函数所在模块在 forkserver 中导入一次，子进程 fork 自它，不必各自重新导入；
+        # forkserver 只按当前目录/PYTHONPATH 查找该模块（在仓库目录下运行时即可），找不到时由各子进程自行导入
+        ctx.set_forkserver_preload([extract_func.__module__])
+    profile = profiler is not None
+    # conn -> [进程, 当前任务 (序号, 路径, 开始时间) 或 None]
+    workers = {}
+    for _ in range(n_workers):
+        conn, proc = _spawn_worker(ctx, extract_func, len_doc, max_memory_mb, profile)
+        workers[conn] = [proc, None]
+    return _iter_results(workers, iter(file_paths), ctx, extract_func, len_doc, timeout, max_memory_mb,
+                         poll_interval, profiler)
+
+
+def _iter_results(workers, source, ctx, extract_func, len_doc, timeout, max_memory_mb, poll_interval, profiler):
+    exhausted = False
+    starved = False
+    n_taken = 0
+    profile = profiler is not None
+    results = deque()
+
+    def dispatch(conn):
+        nonlocal exhausted, starved, n_taken
+        workers[conn][1] = None
+        if exhausted or starved:
+            return
+        try:
+            path = next(source)
+        except StopIteration:
+            exhausted = True
+            return
+        if path is None:
+            starved = True
+            return
+        conn.send((n_taken, path))
+        workers[conn][1] = (n_taken, path, time.monotonic())
+        n_taken += 1
+
+    def replace(conn, reason):
+        proc, task = workers.pop(conn)
+        if proc.is_alive():
+            proc.kill()
+        proc.join()
+        conn.close()
+        if task is not None:
+            idx, path, started = task
+            results.append((idx, path, "", reason))
+            print(f"提取失败（{reason}）：{path}")
+            if profiler is not None:
+                try:
+                    file_bytes = os.path.getsize(path)
+                except OSError:
+                    file_bytes = 0
+                profiler.record(path, os.path.splitext(path)[1].lower(), reason,
+                                time.monotonic() - started, file_bytes, failed=True)
+        new_conn, new_proc = _spawn_worker(ctx, extract_func, len_doc, max_memory_mb, profile)
+        workers[new_conn] = [new_proc, None]
+        dispatch(new_conn)
+
+    try:
+        while True:
+            # 空闲进程取新任务；上一轮源头暂时没有文件时再试一次
+            starved = False
+            for conn in [conn for conn, (_, task) in workers.items() if task is None]:
+                dispatch(conn)
+            busy = [conn for conn, (_, task) in workers.items() if task is not None]
+            if not busy and exhausted:
+                break
+            if not busy:
+                time.sleep(0.05)    # 源头暂时没有文件，所有进程空闲
+            # 有空闲进程在等新文件时缩短等待，新文件尽快派发
+            for conn in wait(busy, timeout=0.05 if starved else poll_interval) if busy else ():
+                task = workers[conn][1]
+                try:
+                    idx, text, status, records = conn.recv()
+                except (EOFError, OSError):
+                    # 子进程异常退出（如被系统因内存不足杀掉）
+                    replace(conn, 'crashed')
+                    continue
+                if records:
+                    profiler.merge(records)
+                results.append((idx, task[1], text, status))
+                dispatch(conn)
+
+            now = time.monotonic()
+            for conn in list(workers):
+                proc, task = workers[conn]
+                if task is None:
+                    continue
+                if now - task[2] > timeout:
+                    replace(conn, 'timeout')
+                elif _over_memory(proc, max_memory_mb):
+                    replace(conn, 'memory')
+
+            while results:
+                yield results.popleft()
+    finally:
+        for conn, (proc, _) in workers.items():
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for conn, (proc, _) in workers.items():
+            proc.join(timeout=1)
+            if proc.is_alive():
+                proc.kill()
+            conn.close()
+    while results:
+        yield results.popleft()
+
+
+def extract_features_parallel(file_paths, len_doc, extract_func, n_workers=None,
+                              timeout=120, max_memory_mb=None, poll_interval=0.5, profiler=None):
+    """
+    用进程池并行调用 extract_func(path, len_doc)
+
+    Args:
+        file_paths (list): 待提取的文件路径
+        len_doc (int): 每个文件保留的字符数
+        extract_func (callable): 模块级提取函数（需可被 pickle）
+        n_workers (int): 进程数，默认等于 CPU 核数
+        timeout (float): 单个文件的墙钟超时秒数，超时后杀掉该子进程并补一个新的
+        max_memory_mb (int): 单个子进程的内存上限（MB），None 表示不限制
+        poll_interval (float): 检查超时/内存的间隔秒数
+        profiler (ExtractionProfiler): 可选，子进程的剖析记录会合并进来，被杀掉的任务记为失败
+
+    Returns:
+        (texts, failures): texts 与 file_paths 一一对应（失败为空串），
+        failures 为 [(路径, 原因)] 列表，原因为 timeout / memory / crashed / error: ...
+    """
+    texts = [""] * len(file_paths)
+    failures = []
+    if not file_paths:
+        return texts, failures
+    n_workers = min(n_workers or os.cpu_count() or 1, len(file_paths))
+    for idx, path, text, status in iter_extract_parallel(file_paths, len_doc, extract_func, n_workers, timeout,
+                                                         max_memory_mb, poll_interval, profiler):
+        texts[idx] = text
+        if status != 'ok':
+            failures.append((path, status))
+    return texts, failures
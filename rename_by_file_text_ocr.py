@@ -10,6 +10,7 @@ import jieba
 from collections import Counter
 import pytesseract
 from PIL import Image, ImageOps
+from fs_walker import iter_file_paths
 import fitz  # PyMuPDF
 from docx import Document
 from pptx import Presentation
@@ -254,27 +255,26 @@ def rename_files_with_keywords(root_dir: str):
     with open(log_path, "w", newline="", encoding="utf-8-sig") as f:
         writer = csv.writer(f)
         writer.writerow(["original_path","new_path","extracted_keywords","text_preview"])
-        for dirpath, _, filenames in os.walk(root_path):
-            for fn in filenames:
-                p = Path(dirpath) / fn
-                if not should_process(p):
-                    continue
-                try:
-                    text = extract_text(p)
-                except Exception as e:
-                    writer.writerow([p, "", "", f"READ_ERROR:{e}"])
-                    continue
-                keywords = extract_keywords(text, min_n=5, max_n=7)
-                if not keywords:
-                    keywords = ["ocr"]
-                basename = sanitize_filename("_".join(keywords))[:MAX_BASENAME_LEN]
-                dst = unique_path_in_dir(p.parent, basename, p.suffix.lower())
-                try:
-                    p.rename(dst)
-                    print(f"[OK] {p.name} → {dst.name}")
-                    writer.writerow([p, dst, "_".join(keywords), text[:120]])
-                except Exception as e:
-                    writer.writerow([p, "", "_".join(keywords), f"RENAME_ERROR:{e}"])
+        for file_path in iter_file_paths(root_path):
+            p = Path(file_path)
+            if not should_process(p):
+                continue
+            try:
+                text = extract_text(p)
+            except Exception as e:
+                writer.writerow([p, "", "", f"READ_ERROR:{e}"])
+                continue
+            keywords = extract_keywords(text, min_n=5, max_n=7)
+            if not keywords:
+                keywords = ["ocr"]
+            basename = sanitize_filename("_".join(keywords))[:MAX_BASENAME_LEN]
+            dst = unique_path_in_dir(p.parent, basename, p.suffix.lower())
+            try:
+                p.rename(dst)
+                print(f"[OK] {p.name} → {dst.name}")
+                writer.writerow([p, dst, "_".join(keywords), text[:120]])
+            except Exception as e:
+                writer.writerow([p, "", "_".join(keywords), f"RENAME_ERROR:{e}"])
     print(f"完成，日志已保存：{log_path}")
 
 # 调用示例
@@ -1,5 +1,6 @@
 import os
 import re
+from fs_walker import scan_tree
 
 def sanitize_name(name, is_file=False):
     """
@@ -41,14 +42,8 @@ def rename_files_and_folders(directory):
     """
     遍历目录树，自下而上重命名所有文件和文件夹。
     """
-    for root, dirs, files in os.walk(directory, topdown=False):
-        for filename in files:
-            file_path = os.path.join(root, filename)
-            rename_path(file_path)
-
-        for dirname in dirs:
-            dir_path = os.path.join(root, dirname)
-            rename_path(dir_path)
+    for entry, _ in scan_tree(directory, topdown=False):
+        rename_path(entry.path)
 
     rename_path(directory)
 
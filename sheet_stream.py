@@ -0,0 +1,233 @@
+import re
+import datetime
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+
+from ooxml_stream import R, PKG_REL
+
+try:
+    import xlrd
+except ImportError:
+    xlrd = None
+
+# ----- 表格文件的流式文本提取：逐行读取，字符数或单元格数达到上限立即停止 ----- #
+# - xlsx：与 ooxml_stream 相同，直接 iterparse 工作表 XML；共享字符串表按需增量解析，
+#   只解析到当前用到的最大下标为止，不构建 DataFrame，也不依赖工作表的 dimension 信息
+# - xls：xlrd 直接读取 BIFF 格式（on_demand 按需加载工作表），无需转换成 xlsx
+# - 格式按文件头判断（PK 开头为 xlsx），扩展名写错的文件同样能读
+# - max_cells 限制扫描的单元格总数（含空单元格），防止稀疏大表空转
+# - xlsx 中的日期保持 Excel 序列号（不解析样式表），对文本特征没有影响
+
+S = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+MAX_CELLS = 20000
+
+
+def _cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value).strip()
+
+
+def _join_rows(rows, len_doc, max_cells):
+    """
+    rows 为逐行产出的单元格值序列；同行单元格以空格连接、行间以换行连接，够 len_doc 个字符即停止
+    """
+    parts = []
+    total = 0
+    cells = 0
+    for row in rows:
+        texts = []
+        for value in row:
+            cells += 1
+            text = _cell_text(value)
+            if text:
+                texts.append(text)
+            if cells >= max_cells:
+                break
+        if texts:
+            line = " ".join(texts)
+            parts.append(line)
+            total += len(line) + 1
+            if total >= len_doc:
+                break
+        if cells >= max_cells:
+            break
+    return "\n".join(parts)[:len_doc]
+
+
+def _is_zip(source):
+    if hasattr(source, 'read'):
+        pos = source.tell()
+        head = source.read(4)
+        source.seek(pos)
+    else:
+        with open(source, 'rb') as f:
+            head = f.read(4)
+    return head[:2] == b'PK'
+
+
+def _sheet_part_names(z):
+    """
+    按 workbook.xml 中 sheets 的顺序返回工作表部件名；解析失败时退回按编号排序
+    """
+    try:
+        rels = {}
+        with z.open('xl/_rels/workbook.xml.rels') as f:
+            for rel in ET.parse(f).getroot().iter(PKG_REL + 'Relationship'):
+                rels[rel.get('Id')] = rel.get('Target')
+        names = []
+        with z.open('xl/workbook.xml') as f:
+            for sheet in ET.parse(f).getroot().iter(S + 'sheet'):
+                target = rels[sheet.get(R + 'id')]
+                if target.startswith('/'):
+                    names.append(target.lstrip('/'))
+                else:
+                    names.append(posixpath.normpath(posixpath.join('xl', target)))
+        return names
+    except (KeyError, ET.ParseError):
+        pattern = re.compile(r'^xl/worksheets/sheet(\d+)\.xml$')
+        found = [(int(m.group(1)), n) for n in z.namelist() for m in [pattern.match(n)] if m]
+        return [n for _, n in sorted(found)]
+
+
+class _SharedStrings:
+    """
+    共享字符串表的惰性读取：访问第 i 项时才把 sharedStrings.xml 解析到第 i 项为止
+    """
+
+    def __init__(self, z):
+        self.items = []
+        self._file = None
+        self._events = None
+        if 'xl/sharedStrings.xml' in z.namelist():
+            self._file = z.open('xl/sharedStrings.xml')
+            self._events = ET.iterparse(self._file, events=('start', 'end'))
+
+    def __getitem__(self, i):
+        while i >= len(self.items) and self._events is not None:
+            self._parse_next()
+        return self.items[i] if i < len(self.items) else ""
+
+    def _parse_next(self):
+        # si 内所有 t 的文本（跳过拼音注音 rPh）拼成一项
+        buf = None
+        phonetic = 0
+        for event, elem in self._events:
+            tag = elem.tag
+            if event == 'start':
+                if tag == S + 'si':
+                    buf = []
+                elif tag == S + 'rPh':
+                    phonetic += 1
+                continue
+            if tag == S + 'rPh':
+                phonetic -= 1
+            elif tag == S + 't' and buf is not None and not phonetic:
+                buf.append(elem.text or '')
+            elif tag == S + 'si':
+                self.items.append(''.join(buf))
+                elem.clear()
+                return
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._events = None
+
+
+def _iter_sheet_rows(f, shared):
+    """
+    逐行产出工作表中的单元格文本列表
+    """
+    row = None
+    value = None
+    inline = None
+    for event, elem in ET.iterparse(f, events=('start', 'end')):
+        tag = elem.tag
+        if event == 'start':
+            if tag == S + 'row':
+                row = []
+            elif tag == S + 'c':
+                value, inline = None, None
+            elif tag == S + 'is':
+                inline = []
+            continue
+        if tag == S + 'v':
+            value = elem.text
+        elif tag == S + 't' and inline is not None:
+            inline.append(elem.text or '')
+        elif tag == S + 'c':
+            kind = elem.get('t')
+            if kind == 's' and value is not None:
+                text = shared[int(value)]
+            elif kind == 'inlineStr':
+                text = ''.join(inline or ())
+            elif kind == 'b' and value is not None:
+                text = 'TRUE' if value == '1' else 'FALSE'
+            else:
+                text = value
+            if row is not None:
+                row.append(text)
+        elif tag == S + 'row':
+            yield row
+            row = None
+            elem.clear()
+
+
+def _iter_xlsx_rows(z):
+    shared = _SharedStrings(z)
+    try:
+        for name in _sheet_part_names(z):
+            with z.open(name) as f:
+                yield from _iter_sheet_rows(f, shared)
+    finally:
+        shared.close()
+
+
+def _iter_xls_rows(book):
+    for i in range(book.nsheets):
+        sheet = book.sheet_by_index(i)
+        try:
+            for r in range(sheet.nrows):
+                row = sheet.row_values(r)
+                # xlrd 的日期是浮点序列号，按单元格类型转换
+                types = sheet.row_types(r)
+                yield [xlrd.xldate_as_datetime(v, book.datemode) if t == xlrd.XL_CELL_DATE else v
+                       for v, t in zip(row, types)]
+        finally:
+            book.unload_sheet(i)
+
+
+def extract_text_from_xlsx_stream(source, len_doc, max_cells=MAX_CELLS):
+    with zipfile.ZipFile(source) as z:
+        return _join_rows(_iter_xlsx_rows(z), len_doc, max_cells)
+
+
+def extract_text_from_xls_stream(source, len_doc, max_cells=MAX_CELLS):
+    if xlrd is None:
+        raise ImportError("未安装 xlrd，无法读取 xls 文件")
+    if hasattr(source, 'read'):
+        book = xlrd.open_workbook(file_contents=source.read(), on_demand=True)
+    else:
+        book = xlrd.open_workbook(source, on_demand=True)
+    try:
+        return _join_rows(_iter_xls_rows(book), len_doc, max_cells)
+    finally:
+        book.release_resources()
+
+
+def extract_text_from_sheet_stream(source, len_doc, max_cells=MAX_CELLS):
+    """
+    提取 xls/xlsx 表格的前 len_doc 个字符，source 为路径或可 seek 的二进制文件对象；出错时抛出异常
+    """
+    if _is_zip(source):
+        return extract_text_from_xlsx_stream(source, len_doc, max_cells)
+    return extract_text_from_xls_stream(source, len_doc, max_cells)
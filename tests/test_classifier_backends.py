@@ -0,0 +1,25 @@
+import numpy as np
+
+from classifier_backends import make_classifier, add_label_trees, predict_label_proba
+from model_bundle import ModelBundle
+
+
+def test_add_label_trees_extends_label_forests():
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((200, 8)).astype(np.float32)
+    Y = np.column_stack([X[:, 0] > 0, X[:, 1] > 0, np.zeros(200)]).astype(np.int64)
+    model = make_classifier('multioutput_rf', n_jobs=1, params={'n_estimators': 10})
+    model.fit(X[:150], Y[:150])
+
+    # 第三个标签全量训练时没有正样本：新样本中有正样本也不能追加
+    Y_new = Y[150:].copy()
+    Y_new[:5, 2] = 1
+    assert add_label_trees(model, X[150:], Y_new, n_new=5, random_state=1) == 2
+    assert [len(est.estimators_) for est in model.estimators_] == [15, 15, 10]
+    assert [est.n_estimators for est in model.estimators_] == [15, 15, 10]
+
+    P = predict_label_proba(model, X)
+    assert P.shape == (200, 3) and np.all(P[:, 2] == 0)
+    # P03 使用的模型包与 sklearn 的概率一致
+    bundle = ModelBundle.from_model(model, ['a', 'b', 'c'])
+    np.testing.assert_allclose(bundle.predict_proba(X), P, atol=1e-6)
@@ -0,0 +1,24 @@
+import os
+
+import content_hash
+from content_hash import get_digest, file_digest
+from feature_cache import open_feature_cache, stat_key
+
+
+def test_large_archives_hash_only_head_and_tail(tmp_path, monkeypatch):
+    # 大压缩包只哈希大小和首尾：中间不同的两个文件摘要相同，首尾不同时摘要不同；小文件仍整体哈希
+    monkeypatch.setattr(content_hash, 'SAMPLE_ABOVE', 1000)
+    monkeypatch.setattr(content_hash, 'SAMPLE_BYTES', 100)
+    head, tail = os.urandom(100), os.urandom(100)
+    paths = {}
+    for name, middle, end in (('a.zip', b'x' * 900, tail), ('b.zip', b'y' * 900, tail),
+                              ('c.zip', b'x' * 900, os.urandom(100)), ('small.zip', b'x' * 100, tail)):
+        paths[name] = str(tmp_path / name)
+        with open(paths[name], 'wb') as f:
+            f.write(head + middle + end)
+    conn = open_feature_cache(str(tmp_path / 'cache.sqlite'))
+    digests = {name: get_digest(conn, path, stat_key(path)) for name, path in paths.items()}
+    conn.close()
+    assert digests['a.zip'] == digests['b.zip']
+    assert digests['a.zip'] != digests['c.zip']
+    assert digests['small.zip'] == file_digest(paths['small.zip'])
@@ -0,0 +1,27 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from classifier_backends import BACKENDS
+from hparam_search import run_halving_search
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_halving_search_multilabel(backend, tmp_path):
+    # 默认的 resource='n_samples' 在多标签 Y 上对每个后端都能跑完
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(240, 8)).astype(np.float32)
+    Y = (X[:, :4] + rng.normal(scale=0.5, size=(240, 4)) > 0.5).astype(np.int64)
+    labels = ['甲_一', '甲_二', '乙_一', '乙_二']
+    space = {'max_depth': [4, 8]} if backend in ('multioutput_rf', 'native_rf', 'hier_rf') else None
+    with warnings.catch_warnings():
+        # 候选训练失败时 sklearn 只给出警告并记为 NaN，这里当作错误
+        warnings.filterwarnings('error', message='.*scores are non-finite')
+        best = run_halving_search(X, Y, backend, space=space, n_candidates=4, factor=2, cv=2, n_jobs=1,
+                                  best_path=str(tmp_path / 'best.json'),
+                                  leaderboard_path=str(tmp_path / 'leaderboard.csv'), label_names=labels)
+    assert best['backend'] == backend
+    assert 0.0 < best['best_micro_f1'] <= 1.0
+    assert best['n_iterations'] >= 1
+    assert (tmp_path / 'best.json').exists()
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+import inbox_watcher
+from inbox_watcher import Debouncer, watchdog_event_path, watch_inbox
+
+
+def test_debouncer_steady_stream(tmp_path):
+    # 每 0.5 秒落下一个文件，每一拍都把所有已有文件再报一遍（相当于目录事件触发的重复通知）：
+    # 每个文件只输出一次，且在落下 settle 秒之后、下一拍之内输出
+    settle, step, n = 1.0, 0.5, 10
+    debouncer = Debouncer(settle)
+    created, emitted = {}, {}
+    t = 0.0
+    while len(emitted) < n:
+        i = int(round(t / step))
+        if i < n:
+            path = str(tmp_path / f'{i:02d}.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('x' * (i + 1))
+            created[path] = t
+        for path in created:
+            if path not in emitted:
+                debouncer.touch(path, now=t)
+        for path in debouncer.pop_ready(now=t):
+            assert path not in emitted
+            emitted[path] = t
+        t += step
+        assert t < 20, "文件持续到达时没有输出"
+    for path, at in emitted.items():
+        assert settle <= at - created[path] <= settle + step
+
+
+def test_debouncer_restarts_on_change(tmp_path):
+    path = str(tmp_path / 'a.txt')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('a')
+    debouncer = Debouncer(1.0)
+    debouncer.touch(path, now=0.0)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('bb')
+    debouncer.touch(path, now=0.8)
+    assert debouncer.pop_ready(now=1.2) == []
+    assert debouncer.pop_ready(now=1.9) == [path]
+
+
+def test_directory_modified_events_ignored():
+    events = pytest.importorskip('watchdog.events')
+    assert watchdog_event_path(events.DirModifiedEvent('/inbox')) is None
+    assert watchdog_event_path(events.DirCreatedEvent('/inbox/new')) == '/inbox/new'
+    assert watchdog_event_path(events.DirMovedEvent('/tmp/d', '/inbox/d')) == '/inbox/d'
+    assert watchdog_event_path(events.FileModifiedEvent('/inbox/a.txt')) == '/inbox/a.txt'
+    assert watchdog_event_path(events.FileMovedEvent('/inbox/a.part', '/inbox/a.pdf')) == '/inbox/a.pdf'
+
+
+def test_debouncer_retry_waits_delay(tmp_path):
+    path = str(tmp_path / 'a.txt')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('a')
+    debouncer = Debouncer(1.0)
+    debouncer.touch(path, now=0.0)
+    assert debouncer.pop_ready(now=1.0) == [path]
+    debouncer.retry([path], 5.0, now=1.0)
+    debouncer.touch(path, now=2.0)      # 重复事件不会提前或推迟重试
+    assert debouncer.pop_ready(now=5.9) == []
+    assert debouncer.pop_ready(now=6.0) == [path]
+
+
+def test_watch_inbox_retries_failed_batch(tmp_path, monkeypatch):
+    # 第一次分类出错的批次在 retry_delay 后重试，不需要新的文件事件
+    inbox, dst = tmp_path / 'inbox', tmp_path / 'out'
+    inbox.mkdir()
+    (inbox / 'a.txt').write_text('a', encoding='utf-8')
+    calls = []
+
+    def classify(self, fps):
+        calls.append((time.monotonic(), list(fps)))
+        if len(calls) == 1:
+            raise OSError("模型文件正在更新")
+
+    monkeypatch.setattr(inbox_watcher._BatchClassifier, 'classify', classify)
+    stop = threading.Event()
+    thread = threading.Thread(target=watch_inbox, args=(str(inbox), str(dst)),
+                              kwargs={'settle': 0.1, 'tick': 0.05, 'retry_delay': 0.5, 'stop_event': stop})
+    thread.start()
+    try:
+        deadline = time.monotonic() + 10
+        while len(calls) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        thread.join(5)
+    assert [fps for _, fps in calls] == [[str(inbox / 'a.txt')]] * 2
+    assert calls[1][0] - calls[0][0] >= 0.5
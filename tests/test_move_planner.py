@@ -0,0 +1,77 @@
+import os
+import threading
+
+from move_planner import MoveJournal, recover, read_journal, execute_plan, rollback
+
+
+def test_recover_waits_for_open_batch(tmp_path):
+    # 另一个批次正在执行（日志已打开、操作只写了 start、临时文件还在）：
+    # recover 要等该批次结束，不能删掉它的临时文件或替它写 end
+    journal_path = str(tmp_path / 'move_journal.jsonl')
+    src, dst = str(tmp_path / 'a.txt'), str(tmp_path / 'out' / 'a.txt')
+    with open(src, 'w', encoding='utf-8') as f:
+        f.write('abc')
+    os.makedirs(os.path.dirname(dst))
+    with open(dst + '.moving', 'w', encoding='utf-8') as f:
+        f.write('ab')
+
+    journal = MoveJournal(journal_path)
+    journal.write({'op': 'begin', 'files': 1})
+    seq = journal.start('move', src, dst)
+    result = []
+    thread = threading.Thread(target=lambda: result.append(recover(journal_path)))
+    thread.start()
+    thread.join(0.5)
+    assert thread.is_alive(), "批次未结束时 recover 没有等待日志锁"
+    assert os.path.exists(dst + '.moving')
+
+    os.replace(dst + '.moving', dst)
+    os.remove(src)
+    journal.done(seq, 'copy')
+    journal.write({'op': 'end'})
+    journal.close()
+    thread.join(5)
+    assert result == [0]
+    records = read_journal(journal_path)[journal.batch]
+    assert [r.get('op') for r in records].count('end') == 1
+
+
+def test_execute_plan_recovers_interrupted_batch(tmp_path):
+    # 上次批次中断在跨盘复制的中途：下次执行时清理临时文件并补写 end，本批次照常执行
+    journal_path = str(tmp_path / 'move_journal.jsonl')
+    src, dst = str(tmp_path / 'a.txt'), str(tmp_path / 'out' / 'a.txt')
+    with open(src, 'w', encoding='utf-8') as f:
+        f.write('abc')
+    os.makedirs(os.path.dirname(dst))
+    with open(dst + '.moving', 'w', encoding='utf-8') as f:
+        f.write('ab')
+    journal = MoveJournal(journal_path)
+    journal.start('move', src, dst)
+    journal.close()
+
+    stats = execute_plan([{'src': src, 'labels': ['out'], 'dsts': [dst]}], journal_path, verbose=False)
+    assert stats['files'] == 1 and not os.path.exists(dst + '.moving')
+    batches = list(read_journal(journal_path).values())
+    assert len(batches) == 2
+    assert all(records[-1]['op'] == 'end' for records in batches)
+
+
+def test_rollback_undoes_whole_run(tmp_path):
+    # 同一 run 的各批次分别加锁执行；默认 rollback 撤销整次运行，其他进程插入的批次不受影响
+    journal_path = str(tmp_path / 'move_journal.jsonl')
+    srcs = []
+    for name in ('a.txt', 'b.txt', 'c.txt'):
+        srcs.append(str(tmp_path / name))
+        with open(srcs[-1], 'w', encoding='utf-8') as f:
+            f.write(name)
+    dsts = [str(tmp_path / 'out' / os.path.basename(src)) for src in srcs]
+    plans = [[{'src': src, 'labels': ['out'], 'dsts': [dst]}] for src, dst in zip(srcs, dsts)]
+    execute_plan(plans[0], journal_path, verbose=False, run='r1')
+    execute_plan(plans[1], journal_path, verbose=False)
+    execute_plan(plans[2], journal_path, verbose=False, run='r1')
+
+    assert rollback(journal_path=journal_path) == 2
+    assert os.path.exists(srcs[0]) and os.path.exists(srcs[2])
+    assert os.path.exists(dsts[1]) and not os.path.exists(srcs[1])
+    assert rollback(journal_path=journal_path) == 1
+    assert os.path.exists(srcs[1])
@@ -0,0 +1,66 @@
+import string
+import unicodedata
+
+# ----- 文本规范化：小写、去标点（ASCII + 中文/全角）、去英文停用词 ----- #
+# 停用词随代码内置（与 NLTK english 停用词表一致），启动时无需联网下载
+
+STOPWORDS = frozenset("""
+i me my myself we our ours ourselves you you're you've you'll you'd your yours yourself
+yourselves he him his himself she she's her hers herself it it's its itself they them their
+theirs themselves what which who whom this that that'll these those am is are was were be
+been being have has had having do does did doing a an the and but if or because as until
+while of at by for with about against between into through during before after above below
+to from up down in out on off over under again further then once here there when where why
+how all any both each few more most other some such no nor not only own same so than too
+very s t can will just don don't should should've now d ll m o re ve y ain aren aren't
+couldn couldn't didn didn't doesn doesn't hadn hadn't hasn hasn't haven haven't isn isn't
+ma mightn mightn't mustn mustn't needn needn't shan shan't shouldn shouldn't wasn wasn't
+weren weren't won won't wouldn wouldn't
+""".split())
+
+
+def _build_punctuation_table():
+    """
+    预编译去标点的 translate 表：
+    - string.punctuation 直接删除（与旧 preprocess_text 行为一致，如 don't -> dont）
+    - 其余 Unicode 标点（中文标点、全角符号、破折号/省略号等）和全角空格替换为空格，
+      避免中文标点两侧的词被粘连在一起
+    """
+    table = dict.fromkeys(map(ord, string.punctuation))
+    for code in range(0x80, 0x10000):
+        if unicodedata.category(chr(code)).startswith('P'):
+            table[code] = ' '
+    # 全角符号区中的非标点符号（＄＋＜＝＞＾｀｜～ 等）与 ASCII 对应符号一样处理
+    for code in range(0xFF01, 0xFF5F):
+        if not chr(code).isalnum():
+            table[code] = ' '
+    table[0x3000] = ' '
+    return table
+
+
+PUNCTUATION_TABLE = _build_punctuation_table()
+# 纯 ASCII 文本走 CPython 的 ASCII 快速路径，小表即可
+ASCII_PUNCTUATION_TABLE = {k: v for k, v in PUNCTUATION_TABLE.items() if k < 0x80}
+
+
+def strip_punctuation(text):
+    return text.translate(ASCII_PUNCTUATION_TABLE if text.isascii() else PUNCTUATION_TABLE)
+
+
+def normalize_text(text):
+    """
+    单条文本规范化，等价于旧的 preprocess_text（额外去除中文/全角标点）
+    """
+    return ' '.join([w for w in strip_punctuation(text.lower()).split() if w not in STOPWORDS])
+
+
+def normalize_many(texts):
+    """
+    批量文本规范化，返回与输入等长的列表
+    """
+    table = PUNCTUATION_TABLE
+    ascii_table = ASCII_PUNCTUATION_TABLE
+    stops = STOPWORDS
+    return [' '.join([w for w in t.lower().translate(ascii_table if t.isascii() else table).split()
+                      if w not in stops])
+            if t else '' for t in texts]